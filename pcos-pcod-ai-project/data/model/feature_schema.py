@@ -0,0 +1,227 @@
+import json
+import re
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Version of the saved schema format; load() refuses other versions
+FEATURE_SCHEMA_VERSION = 1
+
+# Engineered feature operations over their source columns
+ENGINEERED_OPERATIONS = {
+    'sum': lambda values: values.sum(axis=1),
+    'mean': lambda values: values.mean(axis=1)
+}
+
+def normalize_column_name(name):
+    """
+    Normalized form of a raw column name: stripped, punctuation removed and
+    whitespace runs replaced by '_' (e.g. 'AMH(ng/mL)' -> 'AMHngmL')
+    """
+    name = re.sub(r'[^\w\s]', '', name.strip())
+    return re.sub(r'\s+', '_', name)
+
+class InvalidRecordError(ValueError):
+    """
+    Raised for a raw record with keys the schema does not know or without
+    any feature
+    """
+    pass
+
+class FeatureSchema:
+    """
+    Versioned description of how raw PCOS records become model features,
+    fitted once on the training data and saved next to the model so that
+    training and inference apply exactly the same transform.
+
+    transform() runs the stages in order:
+    - prepare: rename raw columns (column_mapping), keep the known columns
+      (missing ones become NaN), make every column float64 and turn the
+      sentinel values of each column into NaN
+    - fill_missing: fill NaNs with the fitted fill values
+    - engineer: add the engineered features and cast the categorical
+      columns to text
+    and returns the features (plus the target when the input has it).
+    """
+    def __init__(self, target, column_mapping, columns, sentinels, fill_values,
+                 engineered_features, categorical_columns, features):
+        self.target = target
+        self.column_mapping = dict(column_mapping)
+        self.columns = list(columns)
+        self.sentinels = {col: list(values) for col, values in sentinels.items()}
+        self.fill_values = dict(fill_values)
+        self.engineered_features = {name: dict(spec) for name, spec in engineered_features.items()}
+        self.categorical_columns = list(categorical_columns)
+        self.features = list(features)
+
+    @classmethod
+    def fit(cls, df, target, renames=None, drop_columns=(), sentinels=None, median_columns=(),
+            mode_columns=(), engineered_features=None, categorical_columns=()):
+        """
+        Fit a schema to raw training data. Column names are normalized
+        (see normalize_column_name) and then renamed with renames; the rules
+        are given in normalized names and skipped for absent columns. The
+        fill values are the medians of median_columns and the modes of
+        mode_columns, after the sentinels are removed; a column without any
+        value left gets no fill value and keeps its NaNs.
+        """
+        renames = renames or {}
+        column_mapping = {}
+        for raw in df.columns:
+            name = normalize_column_name(raw)
+            column_mapping[raw] = renames.get(name, name)
+        columns = [col for col in column_mapping.values() if col not in drop_columns]
+
+        schema = cls(
+            target=target,
+            column_mapping=column_mapping,
+            columns=columns,
+            sentinels={col: values for col, values in (sentinels or {}).items() if col in columns},
+            fill_values={},
+            engineered_features={
+                name: spec for name, spec in (engineered_features or {}).items()
+                if all(col in columns for col in spec['columns'])
+            },
+            categorical_columns=[col for col in categorical_columns if col in columns],
+            features=[]
+        )
+
+        prepared = schema.prepare(df)
+        median_cols = [col for col in median_columns if col in columns]
+        mode_cols = [col for col in mode_columns if col in columns]
+        # NaN-aware medians a column at a time, so only one column is copied
+        # at once, and all modes in one reduction
+        with warnings.catch_warnings():
+            # All-NaN columns have a NaN median, dropped below
+            warnings.simplefilter('ignore', RuntimeWarning)
+            medians = [np.nanmedian(prepared[col].to_numpy()) for col in median_cols]
+        modes = prepared[mode_cols].mode()
+        modes = modes.iloc[0] if len(modes) else pd.Series(np.nan, index=mode_cols)
+        fill_values = {
+            **{col: float(value) for col, value in zip(median_cols, medians)},
+            **{col: float(value) for col, value in modes.items()}
+        }
+        # NaN is no fill value, and save() could not write it as JSON
+        empty = [col for col, value in fill_values.items() if np.isnan(value)]
+        if empty:
+            print(f"Warning: no values to impute {', '.join(empty)} from; leaving them missing")
+        schema.fill_values = {col: value for col, value in fill_values.items() if col not in empty}
+
+        schema.features = [col for col in columns if col != target] + list(schema.engineered_features)
+        return schema
+
+    def records_to_frame(self, records):
+        """
+        Frame of raw records (dicts) whose keys may be raw or normalized
+        column names, mixed freely within and across records; every key is
+        mapped to its schema column before the frame is built.
+
+        Raises InvalidRecordError for a record with a key that maps to no
+        column of the training data, or without any feature key, instead of
+        silently scoring it on fill values alone
+        """
+        known = set(self.column_mapping.values())
+        features = set(self.columns) - {self.target}
+        names = {}
+        for i, record in enumerate(records):
+            for key in record:
+                if key not in names:
+                    names[key] = self.column_mapping.get(key) or normalize_column_name(key)
+            unknown = [key for key in record if names[key] not in known]
+            if unknown:
+                raise InvalidRecordError(f"Record {i} has unknown fields: {', '.join(unknown)}")
+            if not any(names[key] in features for key in record):
+                raise InvalidRecordError(f"Record {i} has none of the model features: {', '.join(sorted(features))}")
+        return pd.DataFrame.from_records([{names[key]: value for key, value in record.items()} for record in records])
+
+    def prepare(self, df):
+        """
+        Rename, select and type the raw columns and mark sentinel values as missing
+        """
+        df = df.rename(columns=self.column_mapping).reindex(columns=self.columns)
+
+        # Explicit dtypes: every column is numeric, stray text entries become NaN
+        text_columns = df.columns[[not pd.api.types.is_numeric_dtype(dtype) for dtype in df.dtypes]]
+        if len(text_columns):
+            df[text_columns] = df[text_columns].apply(pd.to_numeric, errors='coerce')
+        df = df.astype('float64')
+
+        for col, values in self.sentinels.items():
+            df[col] = df[col].mask(df[col].isin(values))
+        return df
+
+    def fill_missing(self, df):
+        """
+        Fill missing values of prepared data with the fill values. Only the
+        columns with a fill value are copied, into one array that is filled
+        a column at a time, so no frame-sized mask is allocated
+        """
+        columns = [col for col in df.columns if col in self.fill_values]
+        values = df[columns].to_numpy(dtype='float64', copy=True)
+        for j, col in enumerate(columns):
+            np.copyto(values[:, j], self.fill_values[col], where=np.isnan(values[:, j]))
+        filled = pd.DataFrame(values, index=df.index, columns=columns, copy=False)
+        if len(columns) == len(df.columns):
+            return filled
+        return pd.concat([filled, df.drop(columns=columns)], axis=1)[df.columns]
+
+    def engineer(self, df):
+        """
+        Add the engineered features and cast the categorical columns to text
+        """
+        df = df.assign(**{
+            name: ENGINEERED_OPERATIONS[spec['operation']](df[spec['columns']])
+            for name, spec in self.engineered_features.items()
+        })
+        return df.assign(**{col: df[col].astype(str) for col in self.categorical_columns})
+
+    def transform(self, df, include_target=True):
+        """
+        Raw records to model features, followed by the target as an integer
+        column when include_target is set and the input has it
+        """
+        has_target = self.target in {self.column_mapping.get(col, col) for col in df.columns}
+        df = self.engineer(self.fill_missing(self.prepare(df)))
+
+        if not (include_target and has_target):
+            return df[self.features]
+        df = df[self.features + [self.target]]
+        df[self.target] = df[self.target].astype(int)
+        return df
+
+    def to_dict(self):
+        return {
+            'schema_version': FEATURE_SCHEMA_VERSION,
+            'target': self.target,
+            'column_mapping': self.column_mapping,
+            'columns': self.columns,
+            'sentinels': self.sentinels,
+            'fill_values': self.fill_values,
+            'engineered_features': self.engineered_features,
+            'categorical_columns': self.categorical_columns,
+            'features': self.features
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get('schema_version') != FEATURE_SCHEMA_VERSION:
+            raise ValueError(f"Unsupported feature schema version {data.get('schema_version')}, "
+                             f"expected {FEATURE_SCHEMA_VERSION}")
+        data = {key: value for key, value in data.items() if key != 'schema_version'}
+        return cls(**data)
+
+    def save(self, path):
+        """
+        Save the schema as JSON
+        """
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2, allow_nan=False)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a schema saved with save()
+        """
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
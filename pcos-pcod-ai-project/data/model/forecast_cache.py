@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import OrderedDict
+
+class ForecastCache:
+    """
+    Thread-safe LRU cache of computed forecasts, grouped by user.
+
+    Entries are stored under (user_id, key), where the key identifies
+    everything the forecast was computed from. An entry expires ttl seconds
+    after it was stored, and the least recently used entries are evicted
+    beyond max_entries. invalidate() drops every entry of one user, e.g.
+    when new cycle data is fitted. Cached values are shared between
+    callers and must be treated as read-only.
+    """
+    def __init__(self, max_entries=10000, ttl=3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._entries = OrderedDict()
+        self._user_keys = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, user_id, key):
+        """
+        Return the cached value, or None when it is missing or expired
+        """
+        entry_key = (user_id, key)
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                self._remove(entry_key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(entry_key)
+            self.hits += 1
+            return value
+
+    def put(self, user_id, key, value):
+        """
+        Store a value, evicting the least recently used entries over max_entries
+        """
+        entry_key = (user_id, key)
+        with self._lock:
+            self._entries[entry_key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(entry_key)
+            self._user_keys.setdefault(user_id, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, user_id):
+        """
+        Drop every cached value of one user
+        """
+        with self._lock:
+            keys = self._user_keys.pop(user_id, ())
+            for key in keys:
+                del self._entries[(user_id, key)]
+            self.invalidations += len(keys)
+
+    def clear(self):
+        """
+        Drop every cached value
+        """
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._user_keys.clear()
+
+    def _remove(self, entry_key):
+        """
+        Remove one entry; must be called with the lock held
+        """
+        del self._entries[entry_key]
+        user_id, key = entry_key
+        keys = self._user_keys[user_id]
+        keys.discard(key)
+        if not keys:
+            del self._user_keys[user_id]
+
+    def stats(self):
+        """
+        Hit/miss counters and size, for monitoring
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'users': len(self._user_keys),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else None,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
@@ -0,0 +1,104 @@
+import glob
+import hashlib
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+    feather = None
+
+# Directory of cached preprocessed frames
+FRAME_CACHE_DIR = '.frame_cache'
+
+def file_digest(*paths, salt=''):
+    """
+    Content hash of one or more files, plus a salt such as the version of
+    the code that processes them
+    """
+    digest = hashlib.blake2b(salt.encode(), digest_size=16)
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+class FrameCache:
+    """
+    Content-addressed cache of preprocessed DataFrames on disk.
+
+    A frame is stored under its name and a key, normally the file_digest of
+    the raw inputs it was built from, as an uncompressed Feather (Arrow IPC)
+    file of one record batch. Column dtypes round-trip exactly, and the
+    numeric columns of a cached frame are memory-mapped without copying;
+    only text columns are converted. Storing a frame replaces any older
+    version of the same name. Without pyarrow the cache is disabled and
+    every frame is rebuilt.
+    """
+    def __init__(self, cache_dir=FRAME_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.enabled = feather is not None
+
+    def path(self, name, key):
+        """
+        File of one cached frame version
+        """
+        return os.path.join(self.cache_dir, f"{name}-{key}.feather")
+
+    def load(self, name, key):
+        """
+        The cached frame, or None when it is missing. Every column becomes
+        its own block, so numeric columns stay zero-copy views of the
+        memory-mapped file
+        """
+        path = self.path(name, key)
+        if not self.enabled or not os.path.exists(path):
+            return None
+        return feather.read_table(path, memory_map=True).to_pandas(split_blocks=True)
+
+    def store(self, name, key, df):
+        """
+        Write a frame, replacing the older versions of the same name
+        """
+        if not self.enabled:
+            return None
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path(name, key)
+
+        # Write on the side and rename, so readers never see a partial file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        table = pa.Table.from_pandas(df.reset_index(drop=True), preserve_index=False)
+        # One record batch, so each column is one buffer that load() can map
+        # as is; several batches would have to be concatenated into a copy
+        feather.write_feather(table, tmp_path, compression='uncompressed', chunksize=max(len(df), 1))
+        os.replace(tmp_path, path)
+
+        for old_path in glob.glob(self.path(name, '*')):
+            if old_path != path:
+                os.remove(old_path)
+        return path
+
+    def invalidate(self, name):
+        """
+        Drop every cached version of a frame
+        """
+        for path in glob.glob(self.path(name, '*')):
+            os.remove(path)
+
+    def get_or_build(self, name, key, build):
+        """
+        The cached frame of name and key, or build() it and cache the result
+        """
+        df = self.load(name, key)
+        if df is not None:
+            print(f"Loaded cached {name} frame from {self.path(name, key)}")
+            return df
+
+        df = build()
+        path = self.store(name, key, df)
+        if path is not None:
+            print(f"Cached {name} frame to {path}")
+        else:
+            print("Install pyarrow to cache preprocessed frames")
+        return df
@@ -1,35 +1,104 @@
 import os
 import json
 import joblib
-import pandas as pd
-from flask import Flask, request, jsonify
+import numpy as np
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 
+from model_registry import ModelRegistry, ModelUnavailableError
+from serving import register_health_endpoints, run_production_server
+from lifestyle_recommendation_model import (
+    LIFESTYLE_FACTORS,
+    build_neighbor_scores,
+    build_recommendation_table,
+    encode_lifestyle_profile,
+    get_scored_recommendations
+)
+
 # Load the model and recommendations database
 MODEL_PATH = 'lifestyle_recommendation_model.joblib'
 RECOMMENDATIONS_DB_PATH = 'lifestyle_recommendations_db.json'
 
+# Seconds between checks of the artifact files for a newer version
+MODEL_RELOAD_CHECK_INTERVAL = float(os.environ.get('MODEL_RELOAD_CHECK_INTERVAL', 2.0))
+
+# Number of payloads mapped together when a batch is streamed as NDJSON
+BATCH_CHUNK_SIZE = 5000
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+# 'category' picks recommendations by the user's own factors; 'neighbors'
+# ranks them by the outcomes of similar users and predicts improvement
+SCORING_MODES = ('category', 'neighbors')
+
+# Levels of the numeric inputs (stress and sleep ratings, BMI and symptom
+# count): (lower bound, level) pairs from the highest bound down. A value
+# gets the level of the first bound it reaches; non-numeric values and NaN
+# keep the factor's default. Shared by the single and batch mappings.
+FACTOR_LEVELS = {
+    'stress': [(7, 'high'), (4, 'medium'), (-np.inf, 'low')],
+    'sleep': [(7, 'good'), (4, 'average'), (-np.inf, 'poor')],
+    'weight_status': [(30, 'obese'), (25, 'overweight'), (18.5, 'normal'), (-np.inf, 'underweight')],
+    'pcos_severity': [(6, 'severe'), (3, 'moderate'), (-np.inf, 'mild')]
+}
+
+class ScoringUnavailableError(RuntimeError):
+    """
+    Raised when the requested scoring mode is not supported by the loaded model
+    """
+
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
 # Load model and recommendations database
 def load_model_and_data():
-    try:
-        # Load the model
-        model_data = joblib.load(MODEL_PATH)
-        model = model_data['model']
-        features = model_data['features']
-        
-        # Load recommendations database
-        with open(RECOMMENDATIONS_DB_PATH, 'r') as f:
-            recommendations_db = json.load(f)
-            
-        return model, features, recommendations_db
-    except Exception as e:
-        print(f"Error loading model or recommendations: {e}")
-        return None, None, None
+    """
+    Load the model and recommendations database and precompute the served
+    responses; raises if any artifact cannot be loaded
+    """
+    # Load the model
+    model_data = joblib.load(MODEL_PATH)
+    model = model_data['model']
+    features = model_data['features']
+    
+    # Load recommendations database
+    with open(RECOMMENDATIONS_DB_PATH, 'r') as f:
+        recommendations_db = json.load(f)
+    
+    # Neighbour outcome aggregates, for models saved with their training outcomes
+    neighbor_scores = None
+    if 'outcomes' in model_data:
+        neighbor_scores = build_neighbor_scores(model, model_data['training_codes'], model_data['outcomes'])
+    
+    # Precompute the response for every lifestyle factor combination
+    recommendation_table = build_recommendation_table(recommendations_db, neighbor_scores)
+    
+    return {
+        'model': model,
+        'features': features,
+        'recommendations_db': recommendations_db,
+        'recommendation_table': recommendation_table
+    }
 
-model, features, recommendations_db = load_model_and_data()
+# Artifacts are loaded on first use and reloaded when either file changes
+registry = ModelRegistry(
+    'lifestyle recommendation',
+    [MODEL_PATH, RECOMMENDATIONS_DB_PATH],
+    load_model_and_data,
+    check_interval=MODEL_RELOAD_CHECK_INTERVAL
+)
+
+# /healthz and /readyz for the process manager and load balancer
+register_health_endpoints(app, [registry])
+
+def _factor_level(factor, value, default):
+    """
+    Level of one numeric input from FACTOR_LEVELS, or default when it is not numeric
+    """
+    if isinstance(value, (int, float)):
+        for bound, level in FACTOR_LEVELS[factor]:
+            if value >= bound:
+                return level
+    return default
 
 # Map frontend lifestyle factors to model factors
 def map_lifestyle_factors(user_data):
@@ -62,45 +131,20 @@ def map_lifestyle_factors(user_data):
     # Map stress level
     if 'lifestyleFactors' in user_data:
         stress_level = user_data.get('lifestyleFactors', {}).get('stress', 5)
-        if isinstance(stress_level, (int, float)):
-            if stress_level >= 7:
-                mapped_data['stress'] = 'high'
-            elif stress_level >= 4:
-                mapped_data['stress'] = 'medium'
-            else:
-                mapped_data['stress'] = 'low'
+        mapped_data['stress'] = _factor_level('stress', stress_level, mapped_data['stress'])
     
     # Map sleep quality
     if 'lifestyleFactors' in user_data:
         sleep_quality = user_data.get('lifestyleFactors', {}).get('sleep', 5)
-        if isinstance(sleep_quality, (int, float)):
-            if sleep_quality >= 7:
-                mapped_data['sleep'] = 'good'
-            elif sleep_quality >= 4:
-                mapped_data['sleep'] = 'average'
-            else:
-                mapped_data['sleep'] = 'poor'
+        mapped_data['sleep'] = _factor_level('sleep', sleep_quality, mapped_data['sleep'])
     
     # Map weight status based on BMI
     bmi = user_data.get('bmi', 22)
-    if isinstance(bmi, (int, float)):
-        if bmi < 18.5:
-            mapped_data['weight_status'] = 'underweight'
-        elif bmi < 25:
-            mapped_data['weight_status'] = 'normal'
-        elif bmi < 30:
-            mapped_data['weight_status'] = 'overweight'
-        else:
-            mapped_data['weight_status'] = 'obese'
+    mapped_data['weight_status'] = _factor_level('weight_status', bmi, mapped_data['weight_status'])
     
     # Map PCOS severity based on symptoms count
     symptoms = user_data.get('symptoms', [])
-    if len(symptoms) <= 2:
-        mapped_data['pcos_severity'] = 'mild'
-    elif len(symptoms) <= 5:
-        mapped_data['pcos_severity'] = 'moderate'
-    else:
-        mapped_data['pcos_severity'] = 'severe'
+    mapped_data['pcos_severity'] = _factor_level('pcos_severity', len(symptoms), mapped_data['pcos_severity'])
     
     return mapped_data
 
@@ -108,41 +152,214 @@ def get_recommendations(user_profile):
     """
     Get personalized lifestyle recommendations for a user
     """
-    if model is None or recommendations_db is None:
-        return {"error": "Model or recommendations database not loaded"}
+    recommendation_table = registry.get()['recommendation_table']
+    return recommendation_table['recommendations'][encode_lifestyle_profile(user_profile)]
+
+def get_formatted_recommendations(user_profile, scoring='category', min_score=None, artifacts=None):
+    """
+    Get the frontend-formatted recommendations for a user profile.
+    
+    Returns a dict with the recommendation list, plus the predicted symptom
+    improvement when scoring by neighbours.
+    """
+    if artifacts is None:
+        artifacts = registry.get()
+    recommendation_table = artifacts['recommendation_table']
+    
+    if scoring == 'neighbors':
+        _check_scoring_available(scoring, recommendation_table)
+        return get_scored_recommendations(user_profile, recommendation_table, min_score)
+    
+    return {'recommendations': recommendation_table['formatted'][encode_lifestyle_profile(user_profile)]}
+
+def _check_scoring_available(scoring, recommendation_table):
+    """
+    Raise ScoringUnavailableError when the loaded model cannot score this way
+    """
+    if scoring == 'neighbors' and 'scored' not in recommendation_table:
+        raise ScoringUnavailableError("Neighbour scoring needs a model saved with its training outcomes; "
+                                      "retrain it with lifestyle_recommendation_model.py")
+
+def _scoring_options():
+    """
+    Read the scoring mode and minimum category score from the query string,
+    checking that the loaded model supports the mode
+    """
+    scoring = request.args.get('scoring', 'category')
+    if scoring not in SCORING_MODES:
+        raise ValueError(f"Unknown scoring mode '{scoring}', expected one of {', '.join(SCORING_MODES)}")
+    _check_scoring_available(scoring, registry.get()['recommendation_table'])
+    min_score = request.args.get('min_score', type=float)
+    return scoring, min_score
+
+def _extract_lifestyle_inputs(user_data):
+    """
+    Pull out the raw values map_lifestyle_factors looks at, in the same order
+    and with the same lookups, so malformed payloads fail the same way
+    """
+    exercise_active = False
+    sedentary = False
+    stress_level = None
+    sleep_quality = None
+    
+    if 'lifestyleFactors' in user_data:
+        exercise_active = user_data.get('lifestyleFactors', {}).get('exercise') == True
+        sedentary = 'Sedentary lifestyle' in user_data.get('lifestyleFactors', [])
+    
+    high_sugar = 'High sugar diet' in user_data.get('lifestyleFactors', [])
+    
+    if 'lifestyleFactors' in user_data:
+        stress_level = user_data.get('lifestyleFactors', {}).get('stress', 5)
+        sleep_quality = user_data.get('lifestyleFactors', {}).get('sleep', 5)
+    
+    bmi = user_data.get('bmi', 22)
+    symptom_count = len(user_data.get('symptoms', []))
+    
+    return exercise_active, sedentary, high_sugar, stress_level, sleep_quality, bmi, symptom_count
+
+def _numeric_column(values):
+    """
+    Convert raw values to a float array plus a mask of entries that were numeric
+    """
+    is_numeric = np.fromiter((isinstance(v, (int, float)) for v in values), dtype=bool, count=len(values))
+    numbers = np.array([v if ok else np.nan for v, ok in zip(values, is_numeric)], dtype=float)
+    return numbers, is_numeric
+
+def _select_levels(factor, values, is_numeric, default):
+    """
+    Levels of numeric values from FACTOR_LEVELS, keeping the default otherwise
+    """
+    bounds = FACTOR_LEVELS[factor]
+    return np.select([is_numeric & (values >= bound) for bound, _ in bounds], [level for _, level in bounds], default)
+
+def map_lifestyle_factors_batch(user_data_list):
+    """
+    Map many frontend payloads to model factors in one vectorized pass.
+    
+    Returns a list of mapped profiles (None for items that failed) and a list
+    of per-item error messages (None for items that succeeded), both in input order.
+    """
+    profiles = [None] * len(user_data_list)
+    errors = [None] * len(user_data_list)
     
-    # Convert user profile to DataFrame format
-    user_df = pd.DataFrame([user_profile])
+    # Extract raw inputs; anything malformed is reported against its own item
+    positions = []
+    rows = []
+    for i, user_data in enumerate(user_data_list):
+        try:
+            if not isinstance(user_data, dict):
+                raise TypeError("User payload must be a JSON object")
+            rows.append(_extract_lifestyle_inputs(user_data))
+            positions.append(i)
+        except Exception as e:
+            errors[i] = str(e)
     
-    # Get personalized recommendations based on user profile
-    personalized_recommendations = {}
+    if not rows:
+        return profiles, errors
     
-    # Diet recommendations based on current diet
-    diet_key = user_profile['diet']
-    personalized_recommendations['diet'] = recommendations_db['diet'][diet_key]
+    exercise_active, sedentary, high_sugar, stress_level, sleep_quality, bmi, symptom_count = zip(*rows)
+    exercise_active = np.array(exercise_active, dtype=bool)
+    sedentary = np.array(sedentary, dtype=bool)
+    high_sugar = np.array(high_sugar, dtype=bool)
+    symptom_count = np.array(symptom_count, dtype=float)
+    stress_values, stress_numeric = _numeric_column(stress_level)
+    sleep_values, sleep_numeric = _numeric_column(sleep_quality)
+    bmi_values, bmi_numeric = _numeric_column(bmi)
     
-    # Exercise recommendations based on current exercise level
-    exercise_key = user_profile['exercise']
-    personalized_recommendations['exercise'] = recommendations_db['exercise'][exercise_key]
+    columns = {
+        'exercise': np.where(exercise_active & ~sedentary, 'moderate', 'none'),
+        'diet': np.where(high_sugar, 'high_carb', 'balanced'),
+        'stress': _select_levels('stress', stress_values, stress_numeric, 'medium'),
+        'sleep': _select_levels('sleep', sleep_values, sleep_numeric, 'average'),
+        'weight_status': _select_levels('weight_status', bmi_values, bmi_numeric, 'normal'),
+        'pcos_severity': _select_levels('pcos_severity', symptom_count, np.ones(len(symptom_count), dtype=bool), 'moderate')
+    }
     
-    # Stress management recommendations based on stress level
-    stress_key = user_profile['stress']
-    personalized_recommendations['stress_management'] = recommendations_db['stress_management'][stress_key]
+    mapped_rows = zip(*(columns[factor].tolist() for factor in LIFESTYLE_FACTORS))
+    for i, row in zip(positions, mapped_rows):
+        profiles[i] = dict(zip(LIFESTYLE_FACTORS, row))
+    
+    return profiles, errors
+
+def get_recommendations_batch(user_data_list, scoring='category', min_score=None):
+    """
+    Get formatted lifestyle recommendations for many users at once.
     
-    # Sleep recommendations based on sleep quality
-    sleep_key = user_profile['sleep']
-    personalized_recommendations['sleep'] = recommendations_db['sleep'][sleep_key]
+    Results are returned in input order; each item either carries its
+    recommendations or its own error message.
+    """
+    # Serve the whole batch from one snapshot of the artifacts
+    artifacts = registry.get()
+    profiles, errors = map_lifestyle_factors_batch(user_data_list)
     
-    # Supplement recommendations based on PCOS severity
-    severity_key = user_profile['pcos_severity']
-    personalized_recommendations['supplements'] = recommendations_db['supplements'][severity_key]
+    results = []
+    for profile, error in zip(profiles, errors):
+        if error is not None:
+            results.append({'success': False, 'error': error})
+            continue
+        
+        try:
+            response = get_formatted_recommendations(profile, scoring, min_score, artifacts)
+        except Exception as e:
+            results.append({'success': False, 'error': str(e)})
+            continue
+        
+        results.append({
+            'success': True,
+            **response,
+            'user_profile': profile
+        })
     
-    return personalized_recommendations
+    return results
+
+def _iter_ndjson_payloads(lines):
+    """
+    Parse NDJSON lines, yielding either a payload or the parse error for that line
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line), None
+        except ValueError as e:
+            yield None, f"Invalid JSON: {e}"
+
+def _stream_ndjson_results(lines, scoring, min_score):
+    """
+    Map an NDJSON request body chunk by chunk and stream the results back as
+    NDJSON. The status is already sent when a chunk fails, so the failure
+    ends the stream with a final error line instead of a cut-off body
+    """
+    try:
+        chunk = []
+        for payload in _iter_ndjson_payloads(lines):
+            chunk.append(payload)
+            if len(chunk) >= BATCH_CHUNK_SIZE:
+                yield from _ndjson_chunk_results(chunk, scoring, min_score)
+                chunk = []
+        if chunk:
+            yield from _ndjson_chunk_results(chunk, scoring, min_score)
+    except Exception as e:
+        yield json.dumps({'success': False, 'error': str(e), 'aborted': True}) + '\n'
+
+def _ndjson_chunk_results(chunk, scoring, min_score):
+    """
+    Run one chunk of parsed NDJSON lines through the batch path
+    """
+    valid = [payload for payload, error in chunk if error is None]
+    valid_results = iter(get_recommendations_batch(valid, scoring, min_score))
+    for payload, error in chunk:
+        result = {'success': False, 'error': error} if error is not None else next(valid_results)
+        yield json.dumps(result) + '\n'
 
 @app.route('/api/lifestyle-recommendations', methods=['POST'])
 def get_lifestyle_recommendations():
     """
-    API endpoint to get lifestyle recommendations
+    API endpoint to get lifestyle recommendations.
+    
+    Pass ?scoring=neighbors to rank recommendations by the outcomes of similar
+    users and get a predicted improvement score (optionally with ?min_score=).
     """
     try:
         # Get user data from request
@@ -151,25 +368,75 @@ def get_lifestyle_recommendations():
         # Map user data to model format
         mapped_data = map_lifestyle_factors(user_data)
         
-        # Get recommendations
-        recommendations = get_recommendations(mapped_data)
-        
-        # Format recommendations for frontend
-        formatted_recommendations = []
-        for category, recs in recommendations.items():
-            for rec in recs:
-                formatted_recommendations.append({
-                    'category': category.replace('_', ' ').title(),
-                    'text': rec,
-                    'priority': 'high' if category in ['diet', 'exercise'] else 'medium'
-                })
+        # Get precomputed recommendations, already formatted for frontend
+        scoring, min_score = _scoring_options()
+        response = get_formatted_recommendations(mapped_data, scoring, min_score)
         
         return jsonify({
             'success': True,
-            'recommendations': formatted_recommendations,
+            **response,
             'user_profile': mapped_data
         })
     
+    except ModelUnavailableError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503
+    except ScoringUnavailableError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 501
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/lifestyle-recommendations/batch', methods=['POST'])
+def get_lifestyle_recommendations_batch():
+    """
+    API endpoint to get lifestyle recommendations for many users in one request.
+    
+    Accepts a JSON list of user payloads (or {"users": [...]}), or an NDJSON
+    body with one payload per line. NDJSON requests are answered with NDJSON,
+    one result per line in input order; a failure while streaming ends the
+    response with an error line marked "aborted": true.
+    """
+    try:
+        scoring, min_score = _scoring_options()
+        
+        if request.mimetype in NDJSON_MIMETYPES:
+            # The body is read while the response streams, so keep the request context
+            lines = (line.decode('utf-8') for line in request.stream)
+            return Response(stream_with_context(_stream_ndjson_results(lines, scoring, min_score)),
+                            mimetype='application/x-ndjson')
+        
+        payload = request.get_json()
+        if isinstance(payload, dict):
+            payload = payload.get('users')
+        if not isinstance(payload, list):
+            return jsonify({
+                'success': False,
+                'error': 'Expected a JSON list of users or an object with a "users" list'
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'results': get_recommendations_batch(payload, scoring, min_score)
+        })
+    
+    except ModelUnavailableError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503
+    except ScoringUnavailableError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 501
     except Exception as e:
         return jsonify({
             'success': False,
@@ -178,4 +445,8 @@ def get_lifestyle_recommendations():
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port, debug=True)
\ No newline at end of file
+    if os.environ.get('FLASK_DEBUG') == '1':
+        # Single-process development server with the reloader
+        app.run(host='0.0.0.0', port=port, debug=True)
+    else:
+        run_production_server(app, [registry], default_port=port)
\ No newline at end of file
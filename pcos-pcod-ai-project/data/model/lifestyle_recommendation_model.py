@@ -4,7 +4,10 @@ from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 from sklearn.neighbors import NearestNeighbors
+from sklearn.base import BaseEstimator
 from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
+from scipy import sparse
 import joblib
 import os
 import matplotlib.pyplot as plt
@@ -26,39 +29,12 @@ LIFESTYLE_FACTORS = {
     'pcos_severity': ['mild', 'moderate', 'severe']
 }
 
-# Define the recommendation categories
-RECOMMENDATION_CATEGORIES = ['diet', 'exercise', 'stress_management', 'sleep', 'supplements']
-
-def create_synthetic_dataset(num_samples=500):
-    """
-    Create a synthetic dataset for lifestyle recommendations
-    """
-    print("Creating synthetic dataset...")
-    
-    np.random.seed(42)
-    
-    # Generate random lifestyle factors
-    data = {
-        'user_id': range(1, num_samples + 1),
-        'exercise': np.random.choice(LIFESTYLE_FACTORS['exercise'], num_samples),
-        'diet': np.random.choice(LIFESTYLE_FACTORS['diet'], num_samples),
-        'stress': np.random.choice(LIFESTYLE_FACTORS['stress'], num_samples),
-        'sleep': np.random.choice(LIFESTYLE_FACTORS['sleep'], num_samples),
-        'weight_status': np.random.choice(LIFESTYLE_FACTORS['weight_status'], num_samples),
-        'pcos_severity': np.random.choice(LIFESTYLE_FACTORS['pcos_severity'], num_samples)
-    }
-    
-    # Generate synthetic health outcomes based on lifestyle factors
-    # Higher score is better
-    data['symptom_improvement'] = np.zeros(num_samples)
-    
-    # Exercise impact (more exercise = better outcomes)
-    exercise_impact = {'none': 0, 'light': 1, 'moderate': 2, 'intense': 2.5}
-    for i in range(num_samples):
-        data['symptom_improvement'][i] += exercise_impact[data['exercise'][i]]
-    
-    # Diet impact
-    diet_impact = {
+# Contribution of every factor value to the synthetic symptom improvement
+# score (higher is better), before noise and scaling to 0-10
+FACTOR_IMPACTS = {
+    # More exercise = better outcomes
+    'exercise': {'none': 0, 'light': 1, 'moderate': 2, 'intense': 2.5},
+    'diet': {
         'balanced': 2.5, 
         'vegetarian': 2, 
         'vegan': 2, 
@@ -66,44 +42,328 @@ def create_synthetic_dataset(num_samples=500):
         'high_carb': 0.5, 
         'high_protein': 1.5, 
         'low_fat': 1
-    }
-    for i in range(num_samples):
-        data['symptom_improvement'][i] += diet_impact[data['diet'][i]]
+    },
+    # Less stress = better outcomes
+    'stress': {'low': 2, 'medium': 1, 'high': 0},
+    # Better sleep = better outcomes
+    'sleep': {'poor': 0, 'average': 1, 'good': 2},
+    # Normal weight = better outcomes
+    'weight_status': {'underweight': 1, 'normal': 2, 'overweight': 0.5, 'obese': 0},
+    # More severe = harder to improve
+    'pcos_severity': {'mild': 1, 'moderate': 0.5, 'severe': 0}
+}
+SYNTHETIC_NOISE_STD = 0.5
+
+# Rows generated at a time by the synthetic dataset generator
+SYNTHETIC_CHUNK_SIZE = 1000000
+# Rows drawn from one random stream; chunks are cut from these blocks, so
+# the data does not depend on the chunk size
+SYNTHETIC_BLOCK_SIZE = 65536
+
+# Define the recommendation categories
+RECOMMENDATION_CATEGORIES = ['diet', 'exercise', 'stress_management', 'sleep', 'supplements']
+
+# Lifestyle factor that selects the recommendations of each category
+CATEGORY_FACTORS = {
+    'diet': 'diet',
+    'exercise': 'exercise',
+    'stress_management': 'stress',
+    'sleep': 'sleep',
+    'supplements': 'pcos_severity'
+}
+
+# Categories whose recommendations are marked as high priority
+HIGH_PRIORITY_CATEGORIES = ['diet', 'exercise']
+
+# Neighbours whose outcomes score the recommendations of a profile, and the
+# expected improvement gain (on the 0-10 scale) that makes a category high priority
+SCORING_NEIGHBORS = 25
+HIGH_PRIORITY_GAIN = 0.5
+
+# Position of every factor value, and the mixed-radix stride of every factor,
+# used to encode a full factor tuple as a single integer
+FACTOR_VALUE_INDEX = {
+    factor: {value: i for i, value in enumerate(values)}
+    for factor, values in LIFESTYLE_FACTORS.items()
+}
+
+def _factor_strides():
+    strides = {}
+    stride = 1
+    for factor in reversed(list(LIFESTYLE_FACTORS)):
+        strides[factor] = stride
+        stride *= len(LIFESTYLE_FACTORS[factor])
+    return {factor: strides[factor] for factor in LIFESTYLE_FACTORS}, stride
+
+FACTOR_STRIDES, NUM_FACTOR_COMBINATIONS = _factor_strides()
+
+class LifestyleNeighborIndex(BaseEstimator):
+    """
+    Exact cosine k-NN index over one-hot lifestyle rows.
+    
+    Every row has one active column per factor, so the cosine distance between
+    two users only depends on how many factors they share. Users are grouped
+    by factor tuple and the shared-factor counts between groups are
+    precomputed, so a lookup costs O(number of distinct tuples + k) no matter
+    how many users were fitted, and answers are cached per query tuple.
     
-    # Stress impact (less stress = better outcomes)
-    stress_impact = {'low': 2, 'medium': 1, 'high': 0}
-    for i in range(num_samples):
-        data['symptom_improvement'][i] += stress_impact[data['stress'][i]]
+    Distances are identical to NearestNeighbors(metric='cosine'). Among users
+    at exactly the same distance the lowest row indices are returned, which is
+    a deterministic choice where brute force picks an arbitrary tie.
+    """
+    def __init__(self, n_neighbors=5):
+        self.n_neighbors = n_neighbors
+    
+    def fit(self, X, y=None):
+        """
+        Group the one-hot rows of X by their set of active columns
+        """
+        X = sparse.csr_matrix(X)
+        X.eliminate_zeros()
+        X.sort_indices()
+        row_nnz = np.diff(X.indptr)
+        
+        if X.shape[1] < 63:
+            # Bit mask of the active columns of every row as the row's group key
+            bits = np.concatenate([[0], np.cumsum(np.left_shift(np.int64(1), X.indices.astype(np.int64)))])
+            keys = bits[X.indptr[1:]] - bits[X.indptr[:-1]]
+        else:
+            # Active columns of every row, padded with -1, as the row's group key
+            keys = np.full((X.shape[0], max(int(row_nnz.max(initial=0)), 1)), -1, dtype=np.int32)
+            row_positions = np.arange(X.nnz) - np.repeat(X.indptr[:-1], row_nnz)
+            keys[np.repeat(np.arange(X.shape[0]), row_nnz), row_positions] = X.indices
+        group_keys, row_groups = np.unique(keys, axis=0, return_inverse=True)
+        row_groups = row_groups.ravel()
+        
+        # Members of every group in ascending row order
+        self.members_ = np.argsort(row_groups, kind='stable')
+        self.group_starts_ = np.concatenate([[0], np.cumsum(np.bincount(row_groups, minlength=len(group_keys)))])
+        
+        if group_keys.ndim == 1:
+            self.group_presence_ = ((group_keys[:, np.newaxis] >> np.arange(X.shape[1])) & 1).astype(np.int8)
+        else:
+            self.group_presence_ = np.zeros((len(group_keys), X.shape[1]), dtype=np.int8)
+            for position in range(group_keys.shape[1]):
+                active = group_keys[:, position] >= 0
+                self.group_presence_[np.flatnonzero(active), group_keys[active, position]] = 1
+        self.group_nnz_values_, self.group_nnz_code_ = np.unique(self.group_presence_.sum(axis=1), return_inverse=True)
+        
+        # Shared-column counts between every pair of groups
+        self.group_overlap_ = self.group_presence_.astype(np.int16) @ self.group_presence_.T.astype(np.int16)
+        self.group_index_ = {tuple(np.flatnonzero(presence).tolist()): g for g, presence in enumerate(self.group_presence_)}
+        
+        self.n_features_in_ = X.shape[1]
+        self.n_samples_fit_ = X.shape[0]
+        self._cache = {}
+        return self
+    
+    def kneighbors_columns(self, columns, n_neighbors=None):
+        """
+        Neighbours of one query given the indices of its active one-hot columns.
+        
+        Returns read-only (distances, indices) arrays that are shared between
+        calls for the same query.
+        """
+        if n_neighbors is None:
+            n_neighbors = self.n_neighbors
+        if n_neighbors > self.n_samples_fit_:
+            raise ValueError(
+                f"Expected n_neighbors <= n_samples_fit, but n_neighbors = {n_neighbors}, "
+                f"n_samples_fit = {self.n_samples_fit_}"
+            )
+        
+        key = tuple(sorted(int(c) for c in columns))
+        cached = self._cache.get((key, n_neighbors))
+        if cached is not None:
+            return cached
+        
+        group = self.group_index_.get(key)
+        if group is not None:
+            shared = self.group_overlap_[group]
+        else:
+            shared = self.group_presence_[:, list(key)].sum(axis=1)
+        
+        similarities = _overlap_similarities(len(key), self.group_nnz_values_)
+        group_distances = np.clip(-similarities[self.group_nnz_code_, shared] + 1, 0.0, 2.0)
+        
+        # Walk distance tiers from nearest to farthest, taking the lowest row
+        # indices within a tier
+        distances = np.empty(n_neighbors)
+        indices = np.empty(n_neighbors, dtype=np.intp)
+        filled = 0
+        for distance in np.unique(group_distances):
+            tier = np.flatnonzero(group_distances == distance)
+            remaining = n_neighbors - filled
+            candidates = np.concatenate([
+                self.members_[self.group_starts_[g]:min(self.group_starts_[g + 1], self.group_starts_[g] + remaining)]
+                for g in tier
+            ])
+            chosen = np.sort(candidates)[:remaining]
+            distances[filled:filled + len(chosen)] = distance
+            indices[filled:filled + len(chosen)] = chosen
+            filled += len(chosen)
+            if filled == n_neighbors:
+                break
+        
+        distances.flags.writeable = False
+        indices.flags.writeable = False
+        self._cache[(key, n_neighbors)] = (distances, indices)
+        return distances, indices
     
-    # Sleep impact (better sleep = better outcomes)
-    sleep_impact = {'poor': 0, 'average': 1, 'good': 2}
-    for i in range(num_samples):
-        data['symptom_improvement'][i] += sleep_impact[data['sleep'][i]]
+    def kneighbors(self, X, n_neighbors=None, return_distance=True):
+        """
+        Find the K-neighbors of each row of a one-hot matrix
+        """
+        if n_neighbors is None:
+            n_neighbors = self.n_neighbors
+        X = sparse.csr_matrix(X)
+        
+        neigh_dist = np.empty((X.shape[0], n_neighbors))
+        neigh_ind = np.empty((X.shape[0], n_neighbors), dtype=np.intp)
+        for i in range(X.shape[0]):
+            row = X.indices[X.indptr[i]:X.indptr[i + 1]][X.data[X.indptr[i]:X.indptr[i + 1]] != 0]
+            neigh_dist[i], neigh_ind[i] = self.kneighbors_columns(row, n_neighbors)
+        
+        if return_distance:
+            return neigh_dist, neigh_ind
+        return neigh_ind
+
+# Impacts indexed by factor value code, in LIFESTYLE_FACTORS order
+FACTOR_IMPACT_ARRAYS = {
+    factor: np.array([FACTOR_IMPACTS[factor][value] for value in values], dtype=np.float64)
+    for factor, values in LIFESTYLE_FACTORS.items()
+}
+FACTOR_VALUE_ARRAYS = {factor: np.array(values) for factor, values in LIFESTYLE_FACTORS.items()}
+
+def _synthetic_raw_blocks(num_samples, seed):
+    """
+    Yield (factor codes, unscaled symptom improvement) per block of
+    SYNTHETIC_BLOCK_SIZE rows, every block from its own random stream.
     
-    # Weight status impact (normal weight = better outcomes)
-    weight_impact = {'underweight': 1, 'normal': 2, 'overweight': 0.5, 'obese': 0}
-    for i in range(num_samples):
-        data['symptom_improvement'][i] += weight_impact[data['weight_status'][i]]
+    The first block is drawn from RandomState(seed) with randint, which is
+    what np.random.choice does with a list of values, so a dataset of up to
+    one block reproduces the original generator's draws exactly. Block i > 0
+    draws from a stream spawned from the seed for index i.
+    """
+    for block, start in enumerate(range(0, num_samples, SYNTHETIC_BLOCK_SIZE)):
+        size = min(SYNTHETIC_BLOCK_SIZE, num_samples - start)
+        if block == 0:
+            rng = np.random.RandomState(seed)
+        else:
+            rng = np.random.RandomState(np.random.MT19937(np.random.SeedSequence(seed, spawn_key=(block,))))
+        codes = {factor: rng.randint(0, len(values), size) for factor, values in LIFESTYLE_FACTORS.items()}
+        
+        # Same summation order as adding the impacts factor by factor
+        score = np.zeros(size)
+        for factor in LIFESTYLE_FACTORS:
+            score += FACTOR_IMPACT_ARRAYS[factor][codes[factor]]
+        score += rng.normal(0, SYNTHETIC_NOISE_STD, size)
+        
+        yield codes, score
+
+def _synthetic_raw_chunks(num_samples, chunk_size, seed):
+    """
+    Yield (start, factor codes, unscaled symptom improvement) per chunk of
+    chunk_size rows, cut from the blocks of _synthetic_raw_blocks
+    """
+    codes, score = {factor: np.empty(0, dtype=np.int64) for factor in LIFESTYLE_FACTORS}, np.empty(0)
+    start = 0
+    for block_codes, block_score in _synthetic_raw_blocks(num_samples, seed):
+        if len(score):
+            codes = {factor: np.concatenate([codes[factor], block_codes[factor]]) for factor in LIFESTYLE_FACTORS}
+            score = np.concatenate([score, block_score])
+        else:
+            codes, score = block_codes, block_score
+        
+        # Emit full chunks, and the rest once the last block is in
+        while len(score) >= chunk_size or (len(score) and start + len(score) == num_samples):
+            size = min(chunk_size, len(score))
+            yield start, {factor: values[:size] for factor, values in codes.items()}, score[:size]
+            codes = {factor: values[size:] for factor, values in codes.items()}
+            score = score[size:]
+            start += size
+
+def _synthetic_chunk_frame(start, codes, score, min_val, max_val, categorical=False):
+    """
+    Build the DataFrame of one generated chunk, scaling the outcome to 0-10
+    """
+    chunk = {'user_id': np.arange(start + 1, start + len(score) + 1)}
+    for factor, values in LIFESTYLE_FACTORS.items():
+        if categorical:
+            chunk[factor] = pd.Categorical.from_codes(codes[factor], values)
+        else:
+            chunk[factor] = FACTOR_VALUE_ARRAYS[factor][codes[factor]]
+    chunk['symptom_improvement'] = 10 * (score - min_val) / (max_val - min_val)
+    return pd.DataFrame(chunk)
+
+def iter_synthetic_dataset(num_samples, chunk_size=SYNTHETIC_CHUNK_SIZE, seed=42, categorical=False):
+    """
+    Generate the synthetic lifestyle dataset as a sequence of DataFrames of
+    at most chunk_size rows, in constant memory.
     
-    # PCOS severity impact (more severe = harder to improve)
-    severity_impact = {'mild': 1, 'moderate': 0.5, 'severe': 0}
-    for i in range(num_samples):
-        data['symptom_improvement'][i] += severity_impact[data['pcos_severity'][i]]
+    The outcome is min-max scaled over the whole dataset, so the chunks are
+    generated twice: once to find the range, then again to scale and emit
+    them. Output depends only on the seed, not on chunk_size.
     
-    # Add some random variation
-    data['symptom_improvement'] += np.random.normal(0, 0.5, num_samples)
+    With categorical=True the factor columns are pandas Categoricals built
+    straight from the codes, which is about ten times faster and much
+    smaller than string columns.
+    """
+    min_val, max_val = np.inf, -np.inf
+    single_chunk = None
+    for chunk in _synthetic_raw_chunks(num_samples, chunk_size, seed):
+        min_val = min(min_val, chunk[2].min())
+        max_val = max(max_val, chunk[2].max())
+        # A dataset that fits in one chunk doesn't need regenerating
+        single_chunk = chunk if num_samples <= chunk_size else None
     
-    # Scale to 0-10 range
-    min_val = min(data['symptom_improvement'])
-    max_val = max(data['symptom_improvement'])
-    data['symptom_improvement'] = 10 * (data['symptom_improvement'] - min_val) / (max_val - min_val)
+    chunks = [single_chunk] if single_chunk is not None else _synthetic_raw_chunks(num_samples, chunk_size, seed)
+    for start, codes, score in chunks:
+        yield _synthetic_chunk_frame(start, codes, score, min_val, max_val, categorical)
+
+def create_synthetic_dataset(num_samples=500, seed=42, chunk_size=SYNTHETIC_CHUNK_SIZE, categorical=False):
+    """
+    Create a synthetic dataset for lifestyle recommendations
+    """
+    print("Creating synthetic dataset...")
     
-    # Create DataFrame
-    df = pd.DataFrame(data)
+    df = pd.concat(iter_synthetic_dataset(num_samples, chunk_size, seed, categorical), ignore_index=True)
     
     print(f"Synthetic dataset created with {num_samples} samples")
     return df
 
+def write_synthetic_dataset(path, num_samples, chunk_size=SYNTHETIC_CHUNK_SIZE, seed=42, categorical=True):
+    """
+    Stream a synthetic dataset too large for memory to a .parquet or .csv
+    file, one chunk at a time
+    """
+    print(f"Writing synthetic dataset of {num_samples} samples to {path}...")
+    
+    if path.endswith('.parquet'):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Writing Parquet needs pyarrow installed; use a .csv path instead")
+        
+        writer = None
+        try:
+            for df in iter_synthetic_dataset(num_samples, chunk_size, seed, categorical):
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+    elif path.endswith('.csv'):
+        for i, df in enumerate(iter_synthetic_dataset(num_samples, chunk_size, seed, categorical)):
+            df.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    else:
+        raise ValueError(f"Unsupported synthetic dataset format: {path} (use .parquet or .csv)")
+    
+    print(f"Synthetic dataset written to {path}")
+
 def create_recommendation_database():
     """
     Create a database of lifestyle recommendations for PCOS/PCOD
@@ -228,9 +488,12 @@ def create_recommendation_database():
     print(f"Recommendation database created and saved to {RECOMMENDATIONS_DB_PATH}")
     return recommendations
 
-def build_recommendation_model(df):
+def build_recommendation_model(df, neighbor_index='brute'):
     """
-    Build a recommendation model based on nearest neighbors
+    Build a recommendation model based on nearest neighbors.
+    
+    neighbor_index='grouped' swaps the brute-force NearestNeighbors step for a
+    LifestyleNeighborIndex, which scales to millions of users.
     """
     print("Building recommendation model...")
     
@@ -248,9 +511,16 @@ def build_recommendation_model(df):
         ])
     
     # Create pipeline with nearest neighbors model
+    if neighbor_index == 'grouped':
+        neighbors = LifestyleNeighborIndex(n_neighbors=5)
+    elif neighbor_index == 'brute':
+        neighbors = NearestNeighbors(n_neighbors=5, metric='cosine')
+    else:
+        raise ValueError(f"Unknown neighbor_index '{neighbor_index}', expected 'brute' or 'grouped'")
+    
     pipeline = Pipeline(steps=[
         ('preprocessor', preprocessor),
-        ('model', NearestNeighbors(n_neighbors=5, metric='cosine'))
+        ('model', neighbors)
     ])
     
     # Fit the model
@@ -259,14 +529,14 @@ def build_recommendation_model(df):
     print("Recommendation model built successfully")
     return pipeline, X
 
-def evaluate_model(model, X, df):
+def evaluate_model(model, X, df, seed=42):
     """
-    Evaluate the recommendation model
+    Evaluate the recommendation model on a reproducible sample of users
     """
     print("Evaluating recommendation model...")
     
     # Sample a few test cases
-    test_indices = np.random.choice(X.shape[0], 5, replace=False)
+    test_indices = np.random.RandomState(seed).choice(X.shape[0], 5, replace=False)
     
     results = []
     
@@ -309,49 +579,400 @@ def evaluate_model(model, X, df):
     print(f"Evaluation results saved to {RESULTS_PATH}")
     return results
 
-def get_recommendations(user_profile, model, X, recommendations_db):
+def build_fast_encoder(model, X):
     """
-    Get personalized lifestyle recommendations for a user
+    Precompute what a fitted recommendation pipeline needs to encode one
+    profile and find its neighbours without pandas or sklearn; X is the
+    frame of lifestyle factors the pipeline was fitted on.
+    
+    Category-to-column offsets are taken from the fitted OneHotEncoder, so a
+    profile maps straight to the indices of its one-hot columns.
     """
-    # Convert user profile to DataFrame format
-    user_df = pd.DataFrame([user_profile])
+    preprocessor = model.named_steps['preprocessor']
+    neighbors = model.named_steps['model']
+    
+    if len(preprocessor.transformers_) != 1 or not isinstance(preprocessor.transformers_[0][1], OneHotEncoder):
+        raise ValueError("Fast path expects a single OneHotEncoder preprocessing step")
+    _, encoder, columns = preprocessor.transformers_[0]
+    
+    # Column of every (factor, value) pair in the transformed matrix
+    column_index = {}
+    offset = 0
+    for factor, categories in zip(columns, encoder.categories_):
+        column_index[factor] = {value: offset + i for i, value in enumerate(categories)}
+        offset += len(categories)
+    
+    fast_encoder = {
+        'column_index': column_index,
+        'n_columns': offset,
+        'n_neighbors': neighbors.n_neighbors
+    }
+    
+    if isinstance(neighbors, LifestyleNeighborIndex):
+        # The grouped index already answers queries from column indices
+        fast_encoder['index'] = neighbors
+        return fast_encoder
+    
+    # The matrix the neighbour search was fitted on, re-encoded by the fitted preprocessor
+    fit_X = preprocessor.transform(X)
+    if sparse.issparse(fit_X):
+        # With a sparse fit the similarity of two rows is a sequential sum of
+        # identical terms, so it only depends on the number of shared columns
+        # and on the number of active columns of each row
+        presence = (fit_X != 0).astype(np.int8).toarray()
+        row_nnz = presence.sum(axis=1)
+        fast_encoder['presence'] = presence
+        fast_encoder['row_nnz_values'], fast_encoder['row_nnz_code'] = np.unique(row_nnz, return_inverse=True)
+    else:
+        # With a dense fit, reuse the same normalized matrix product sklearn computes
+        fast_encoder['normalized_fit_X'] = normalize(fit_X)
     
-    # Get nearest neighbors
+    return fast_encoder
+
+def encode_profile_columns(user_profile, fast_encoder):
+    """
+    Map a profile to the indices of its one-hot columns; unknown values are
+    ignored, as with the pipeline's handle_unknown='ignore'
+    """
+    columns = []
+    for factor, value_columns in fast_encoder['column_index'].items():
+        column = value_columns.get(user_profile[factor])
+        if column is not None:
+            columns.append(column)
+    return np.array(columns, dtype=np.intp)
+
+def _overlap_similarities(query_nnz, row_nnz_values):
+    """
+    Cosine similarity for every (row size, number of shared columns) pair,
+    accumulated the same way as the sparse product in sklearn
+    """
+    table = np.zeros((len(row_nnz_values), query_nnz + 1))
+    query_value = 1.0 / np.sqrt(float(query_nnz)) if query_nnz else 0.0
+    for r, nnz in enumerate(row_nnz_values):
+        term = query_value * (1.0 / np.sqrt(float(nnz)) if nnz else 0.0)
+        total = 0.0
+        for shared in range(1, query_nnz + 1):
+            total += term
+            table[r, shared] = total
+    return table
+
+def fast_kneighbors(user_profile, fast_encoder, n_neighbors=None):
+    """
+    Find the nearest neighbours of one profile with plain NumPy.
+    
+    Returns (distances, indices) shaped like NearestNeighbors.kneighbors for a
+    single query, with identical values and ordering.
+    """
+    if n_neighbors is None:
+        n_neighbors = fast_encoder['n_neighbors']
+    columns = encode_profile_columns(user_profile, fast_encoder)
+    
+    if 'index' in fast_encoder:
+        distances, indices = fast_encoder['index'].kneighbors_columns(columns, n_neighbors)
+        return distances[np.newaxis, :], indices[np.newaxis, :]
+    
+    if 'presence' in fast_encoder:
+        shared = fast_encoder['presence'][:, columns].sum(axis=1)
+        similarities = _overlap_similarities(len(columns), fast_encoder['row_nnz_values'])
+        similarity = similarities[fast_encoder['row_nnz_code'], shared]
+    else:
+        query = np.zeros((1, fast_encoder['n_columns']))
+        query[0, columns] = 1.0
+        query = normalize(query)
+        similarity = (query @ fast_encoder['normalized_fit_X'].T)[0]
+    
+    # Same distance arithmetic and neighbour selection as sklearn's brute search
+    dist = (-similarity + 1)[np.newaxis, :]
+    dist = np.clip(dist, 0.0, 2.0)
+    sample_range = np.arange(1)[:, None]
+    neigh_ind = np.argpartition(dist, n_neighbors - 1, axis=1)[:, :n_neighbors]
+    neigh_ind = neigh_ind[sample_range, np.argsort(dist[sample_range, neigh_ind])]
+    
+    return dist[sample_range, neigh_ind], neigh_ind
+
+def verify_fast_path_parity(model, fast_encoder, num_profiles=200):
+    """
+    Check that the fast path returns exactly the pipeline's neighbours for a
+    sample of lifestyle factor combinations (all of them when num_profiles is
+    None), plus profiles with unknown values
+    """
+    print("Verifying fast neighbour search against the pipeline...")
+    
+    codes = np.arange(NUM_FACTOR_COMBINATIONS)
+    if num_profiles is not None and num_profiles < NUM_FACTOR_COMBINATIONS:
+        codes = np.random.RandomState(0).choice(codes, num_profiles, replace=False)
+    profiles = [decode_lifestyle_profile(int(code)) for code in codes]
+    profiles.append(dict(profiles[0], diet='unknown'))
+    profiles.append({factor: 'unknown' for factor in LIFESTYLE_FACTORS})
+    
+    # Compare single-profile queries, as served; with a dense fit the BLAS
+    # kernel used for a batch of queries can round differently
+    mismatches = 0
+    for profile in profiles:
+        pipeline_distances, pipeline_indices = find_similar_users(profile, model)
+        distances, indices = fast_kneighbors(profile, fast_encoder)
+        if not (np.array_equal(indices, pipeline_indices) and np.array_equal(distances, pipeline_distances)):
+            mismatches += 1
+    
+    print(f"Fast path parity: {len(profiles) - mismatches}/{len(profiles)} profiles match")
+    return mismatches == 0
+
+def build_personalized_recommendations(user_profile, recommendations_db):
+    """
+    Select the recommendations of every category for a user profile
+    """
+    # Each category is picked by one factor, e.g. diet recommendations by the
+    # current diet and supplement recommendations by PCOS severity
+    return {
+        category: recommendations_db[category][user_profile[CATEGORY_FACTORS[category]]]
+        for category in RECOMMENDATION_CATEGORIES
+    }
+
+def format_recommendations(recommendations):
+    """
+    Flatten categorized recommendations into the list shape used by the frontend
+    """
+    formatted_recommendations = []
+    for category, recs in recommendations.items():
+        for rec in recs:
+            formatted_recommendations.append({
+                'category': category.replace('_', ' ').title(),
+                'text': rec,
+                'priority': 'high' if category in HIGH_PRIORITY_CATEGORIES else 'medium'
+            })
+    return formatted_recommendations
+
+def encode_lifestyle_profile(user_profile):
+    """
+    Encode a full lifestyle factor tuple as an integer in [0, NUM_FACTOR_COMBINATIONS)
+    """
+    code = 0
+    for factor, stride in FACTOR_STRIDES.items():
+        code += FACTOR_VALUE_INDEX[factor][user_profile[factor]] * stride
+    return code
+
+def factor_code_matrix(profiles):
+    """
+    Encode the factors of many profiles as an (n_profiles, n_factors) matrix
+    of value positions; accepts a DataFrame or a dict of factor columns
+    """
+    columns = []
+    for factor, values in LIFESTYLE_FACTORS.items():
+        raw = np.asarray(profiles[factor])
+        codes = pd.Categorical(raw, categories=values).codes
+        if (codes < 0).any():
+            raise KeyError(raw[codes < 0][0])
+        columns.append(codes.astype(np.int64))
+    return np.column_stack(columns)
+
+def encode_lifestyle_profiles(profiles):
+    """
+    Encode many profiles at once; accepts a DataFrame or a dict of factor columns
+    """
+    return factor_code_matrix(profiles) @ np.array(list(FACTOR_STRIDES.values()))
+
+def decode_lifestyle_profile(code):
+    """
+    Turn an encoded factor tuple back into a user profile dict
+    """
+    profile = {}
+    for factor, stride in FACTOR_STRIDES.items():
+        values = LIFESTYLE_FACTORS[factor]
+        profile[factor] = values[(code // stride) % len(values)]
+    return profile
+
+def build_neighbor_scores(model, training_codes, outcomes, n_neighbors=SCORING_NEIGHBORS):
+    """
+    Aggregate the outcomes of the nearest neighbours of every lifestyle factor
+    combination.
+    
+    The predicted improvement is the similarity-weighted mean symptom
+    improvement of the neighbours. The score of a category is how much better
+    the neighbours who differ from the profile in that category's factor did
+    than the ones who share it, so a positive score means changing that habit
+    is associated with better outcomes.
+    
+    On large cohorts the nearest neighbours often all share the profile, so
+    they say nothing about a factor. A category is then scored on the
+    training users instead: those who differ from the profile in that factor
+    only, against those with exactly the profile. Without either group the
+    score is 0, which keeps the category order.
+    """
+    outcomes = np.asarray(outcomes, dtype=float)
+    n_neighbors = min(n_neighbors, len(outcomes))
+    
+    # Query every combination in one batch
+    combination_codes = np.column_stack(np.unravel_index(
+        np.arange(NUM_FACTOR_COMBINATIONS), [len(values) for values in LIFESTYLE_FACTORS.values()]
+    ))
+    combinations = pd.DataFrame({
+        factor: np.array(values)[combination_codes[:, j]]
+        for j, (factor, values) in enumerate(LIFESTYLE_FACTORS.items())
+    })
     distances, indices = model.named_steps['model'].kneighbors(
-        model.named_steps['preprocessor'].transform(user_df)
+        model.named_steps['preprocessor'].transform(combinations), n_neighbors=n_neighbors
     )
     
-    # Get personalized recommendations based on user profile
-    personalized_recommendations = {}
+    # Weight neighbours by cosine similarity
+    weights = np.clip(1 - distances, 0, None)
+    weights[weights.sum(axis=1) == 0] = 1
+    neighbor_outcomes = outcomes[indices]
+    predicted_improvement = (weights * neighbor_outcomes).sum(axis=1) / weights.sum(axis=1)
     
-    # Diet recommendations based on current diet and PCOS severity
-    diet_key = user_profile['diet']
-    personalized_recommendations['diet'] = recommendations_db['diet'][diet_key]
+    # Users and outcome totals of every factor combination in the training data
+    combination_ids = np.arange(NUM_FACTOR_COMBINATIONS)
+    training_ids = np.asarray(training_codes, dtype=np.int64) @ np.array(list(FACTOR_STRIDES.values()))
+    cohort_counts = np.bincount(training_ids, minlength=NUM_FACTOR_COMBINATIONS)
+    cohort_sums = np.bincount(training_ids, weights=outcomes, minlength=NUM_FACTOR_COMBINATIONS)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cohort_means = cohort_sums / cohort_counts
     
-    # Exercise recommendations based on current exercise level
-    exercise_key = user_profile['exercise']
-    personalized_recommendations['exercise'] = recommendations_db['exercise'][exercise_key]
+    factor_positions = {factor: j for j, factor in enumerate(LIFESTYLE_FACTORS)}
+    category_scores = np.zeros((NUM_FACTOR_COMBINATIONS, len(RECOMMENDATION_CATEGORIES)))
+    for c, category in enumerate(RECOMMENDATION_CATEGORIES):
+        factor = CATEGORY_FACTORS[category]
+        j = factor_positions[factor]
+        same = training_codes[indices, j] == combination_codes[:, j][:, np.newaxis]
+        same_weights = weights * same
+        differ_weights = weights * ~same
+        with np.errstate(invalid='ignore', divide='ignore'):
+            same_mean = (same_weights * neighbor_outcomes).sum(axis=1) / same_weights.sum(axis=1)
+            differ_mean = (differ_weights * neighbor_outcomes).sum(axis=1) / differ_weights.sum(axis=1)
+        neighbor_score = differ_mean - same_mean
+        
+        # Cohort score: users differing in this factor only, against users with the profile
+        stride = FACTOR_STRIDES[factor]
+        base = combination_ids - combination_codes[:, j] * stride
+        variants = base[:, np.newaxis] + np.arange(len(LIFESTYLE_FACTORS[factor])) * stride
+        differ_counts = cohort_counts[variants].sum(axis=1) - cohort_counts
+        differ_sums = cohort_sums[variants].sum(axis=1) - cohort_sums
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cohort_score = differ_sums / differ_counts - cohort_means
+        
+        # Neighbours first; no score when neither has both groups
+        category_scores[:, c] = np.nan_to_num(np.where(np.isnan(neighbor_score), cohort_score, neighbor_score))
     
-    # Stress management recommendations based on stress level
-    stress_key = user_profile['stress']
-    personalized_recommendations['stress_management'] = recommendations_db['stress_management'][stress_key]
+    return {
+        'n_neighbors': n_neighbors,
+        'predicted_improvement': predicted_improvement,
+        'category_scores': category_scores
+    }
+
+def format_scored_recommendations(recommendations, category_scores):
+    """
+    Flatten categorized recommendations ranked by neighbour score, most
+    promising category first
+    """
+    scores = dict(zip(RECOMMENDATION_CATEGORIES, category_scores))
+    ranked_categories = sorted(recommendations, key=lambda category: -scores[category])
+    
+    formatted_recommendations = []
+    for category in ranked_categories:
+        score = round(float(scores[category]), 2)
+        for rec in recommendations[category]:
+            formatted_recommendations.append({
+                'category': category.replace('_', ' ').title(),
+                'text': rec,
+                'priority': 'high' if score >= HIGH_PRIORITY_GAIN else 'medium',
+                'score': score
+            })
+    return formatted_recommendations
+
+def build_recommendation_table(recommendations_db, neighbor_scores=None):
+    """
+    Precompute the recommendations for every lifestyle factor combination.
+    
+    The table is indexed by encode_lifestyle_profile, so serving a profile is a
+    single integer encode and list lookup. Combinations that select the same
+    recommendations share one entry, which keeps the table small. When
+    neighbour scores are given, the neighbour-ranked response of every
+    combination is precomputed as well.
+    """
+    recommendations = [None] * NUM_FACTOR_COMBINATIONS
+    formatted = [None] * NUM_FACTOR_COMBINATIONS
+    shared_entries = {}
+    
+    for code in range(NUM_FACTOR_COMBINATIONS):
+        profile = decode_lifestyle_profile(code)
+        content_key = tuple(profile[CATEGORY_FACTORS[category]] for category in RECOMMENDATION_CATEGORIES)
+        if content_key not in shared_entries:
+            personalized_recommendations = build_personalized_recommendations(profile, recommendations_db)
+            shared_entries[content_key] = (personalized_recommendations, format_recommendations(personalized_recommendations))
+        recommendations[code], formatted[code] = shared_entries[content_key]
     
-    # Sleep recommendations based on sleep quality
-    sleep_key = user_profile['sleep']
-    personalized_recommendations['sleep'] = recommendations_db['sleep'][sleep_key]
+    table = {
+        'recommendations': recommendations,
+        'formatted': formatted
+    }
     
-    # Supplement recommendations based on PCOS severity
-    severity_key = user_profile['pcos_severity']
-    personalized_recommendations['supplements'] = recommendations_db['supplements'][severity_key]
+    if neighbor_scores is not None:
+        table['scored'] = [
+            {
+                'predicted_improvement': round(float(neighbor_scores['predicted_improvement'][code]), 2),
+                'recommendations': format_scored_recommendations(
+                    recommendations[code], neighbor_scores['category_scores'][code]
+                )
+            }
+            for code in range(NUM_FACTOR_COMBINATIONS)
+        ]
     
-    return personalized_recommendations
+    return table
 
-def save_model(model, X):
+def get_scored_recommendations(user_profile, recommendation_table, min_score=None):
+    """
+    Get neighbour-ranked recommendations and the predicted improvement for a
+    user, optionally dropping categories scored below min_score
+    """
+    if 'scored' not in recommendation_table:
+        raise ValueError("Recommendation table was built without neighbour scores")
+    
+    scored = recommendation_table['scored'][encode_lifestyle_profile(user_profile)]
+    if min_score is None:
+        return scored
+    
+    return {
+        'predicted_improvement': scored['predicted_improvement'],
+        'recommendations': [rec for rec in scored['recommendations'] if rec['score'] >= min_score]
+    }
+
+def find_similar_users(user_profile, model, fast_encoder=None):
+    """
+    Get the distances and indices of the users most similar to a profile
+    """
+    if fast_encoder is not None:
+        return fast_kneighbors(user_profile, fast_encoder)
+    
+    # Convert user profile to DataFrame format
+    user_df = pd.DataFrame([user_profile])
+    
+    return model.named_steps['model'].kneighbors(
+        model.named_steps['preprocessor'].transform(user_df)
+    )
+
+def get_recommendations(user_profile, model, X, recommendations_db, recommendation_table=None):
+    """
+    Get personalized lifestyle recommendations for a user.
+    
+    They only depend on the user's own factors, so no neighbour search is
+    run; model and X are kept for the callers of the original signature.
+    """
+    # Serve from the precomputed table when one is available
+    if recommendation_table is not None:
+        return recommendation_table['recommendations'][encode_lifestyle_profile(user_profile)]
+    
+    return build_personalized_recommendations(user_profile, recommendations_db)
+
+def save_model(model, X, outcomes=None):
     """
     Save the trained model to disk
     """
-    # Save the model and the feature set
-    joblib.dump({'model': model, 'features': X.columns.tolist()}, MODEL_OUTPUT_PATH)
+    # Save the model and the feature set, plus the training factors and
+    # outcomes used for neighbour-weighted scoring
+    model_data = {'model': model, 'features': X.columns.tolist()}
+    if outcomes is not None:
+        model_data['training_codes'] = factor_code_matrix(X).astype(np.int8)
+        model_data['outcomes'] = np.asarray(outcomes, dtype=float)
+    joblib.dump(model_data, MODEL_OUTPUT_PATH)
     print(f"Model saved to {MODEL_OUTPUT_PATH}")
 
 def main():
@@ -372,8 +993,13 @@ def main():
     # Evaluate model
     evaluate_model(model, X, df)
     
+    # Check the fast single-profile path against the pipeline
+    fast_encoder = build_fast_encoder(model, X)
+    if not verify_fast_path_parity(model, fast_encoder):
+        raise RuntimeError("Fast neighbour search does not match the pipeline; not saving the model")
+    
     # Save model
-    save_model(model, X)
+    save_model(model, X, df['symptom_improvement'])
     
     # Test with a sample user
     sample_user = {
@@ -385,7 +1011,9 @@ def main():
         'pcos_severity': 'moderate'
     }
     
-    recommendations = get_recommendations(sample_user, model, X, recommendations_db)
+    neighbor_scores = build_neighbor_scores(model, factor_code_matrix(X), df['symptom_improvement'])
+    recommendation_table = build_recommendation_table(recommendations_db, neighbor_scores)
+    recommendations = get_recommendations(sample_user, model, X, recommendations_db, recommendation_table)
     
     print("\nSample Recommendations for Test User:")
     for category, recs in recommendations.items():
@@ -393,6 +1021,12 @@ def main():
         for rec in recs:
             print(f"- {rec}")
     
+    scored = get_scored_recommendations(sample_user, recommendation_table)
+    print(f"\nPredicted Symptom Improvement: {scored['predicted_improvement']:.2f}/10")
+    print("Categories ranked by neighbour outcomes:")
+    for category, score in dict.fromkeys((rec['category'], rec['score']) for rec in scored['recommendations']):
+        print(f"- {category}: {score:+.2f}")
+    
     print("\nLifestyle Recommendation Model Development Complete")
 
 if __name__ == "__main__":
@@ -0,0 +1,738 @@
+import os
+import sys
+import tempfile
+import time
+import json
+import tracemalloc
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+import joblib
+import numpy as np
+import pandas as pd
+
+from lifestyle_recommendation_model import (
+    FACTOR_IMPACTS,
+    LIFESTYLE_FACTORS,
+    NUM_FACTOR_COMBINATIONS,
+    build_fast_encoder,
+    build_personalized_recommendations,
+    build_recommendation_model,
+    build_recommendation_table,
+    create_synthetic_dataset,
+    decode_lifestyle_profile,
+    encode_lifestyle_profile,
+    find_similar_users,
+    format_recommendations
+)
+from pcos_early_detection_model import (
+    COMPILED_MAX_BATCH_ROWS,
+    DATASET_PATH,
+    FEATURE_SCHEMA_PATH,
+    MODEL_OUTPUT_PATH,
+    SEARCH_STRATEGIES,
+    compile_model,
+    compiled_predict_proba,
+    load_and_prepare_data,
+    peak_memory_mb,
+    profile_search,
+    train_chunked_model
+)
+from feature_schema import FeatureSchema
+from forecast_cache import ForecastCache
+from pcos_ml_pipeline import (
+    MEDIAN_IMPUTATION_COLUMNS,
+    MODE_IMPUTATION_COLUMNS,
+    fit_feature_schema
+)
+from period_predictor_service import PeriodPredictorService
+from period_tracking_model import (
+    AR1_MAX_MEAN_GAP_DAYS,
+    AR1_MIN_AGREEMENT,
+    AR1_PARITY_MIN_HISTORY,
+    AR1_TOLERANCE_DAYS,
+    RESPONSE_MODES,
+    CycleState,
+    PeriodTrackingModel,
+    fit_ar1,
+    forecast_ar1,
+    pad_series,
+    weighted_average_forecast
+)
+from sklearn.model_selection import train_test_split
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Configuration
+RECOMMENDATIONS_DB_PATH = 'lifestyle_recommendations_db.json'
+LATENCY_SAMPLES = 20000
+
+def _latency_percentiles(fn, inputs):
+    """
+    Call fn once per input and return the p50/p99 latency in microseconds
+    """
+    timings = np.empty(len(inputs))
+    for i, item in enumerate(inputs):
+        start = time.perf_counter()
+        fn(item)
+        timings[i] = time.perf_counter() - start
+    return np.percentile(timings, 50) * 1e6, np.percentile(timings, 99) * 1e6
+
+def _time_call(fn, item):
+    """
+    Wall-clock seconds of a single call
+    """
+    start = time.perf_counter()
+    fn(item)
+    return time.perf_counter() - start
+
+def _print_latency_table(title, rows):
+    """
+    Print p50/p99 latencies for a set of named code paths
+    """
+    print(f"\n{title}")
+    print(f"{'path':<28}{'p50 (us)':>12}{'p99 (us)':>12}")
+    for name, (p50, p99) in rows:
+        print(f"{name:<28}{p50:>12.2f}{p99:>12.2f}")
+
+def benchmark_recommendation_lookup(num_requests=LATENCY_SAMPLES):
+    """
+    Compare building recommendations per request against the precomputed table
+    """
+    print("Benchmarking recommendation lookup...")
+
+    with open(RECOMMENDATIONS_DB_PATH, 'r') as f:
+        recommendations_db = json.load(f)
+
+    rng = np.random.default_rng(42)
+    profiles = [decode_lifestyle_profile(int(code)) for code in rng.integers(0, NUM_FACTOR_COMBINATIONS, num_requests)]
+
+    # Previous serving path: unused DataFrame, nested dict rebuild, then formatting
+    def current_path(profile):
+        pd.DataFrame([profile])
+        return format_recommendations(build_personalized_recommendations(profile, recommendations_db))
+
+    start = time.perf_counter()
+    recommendation_table = build_recommendation_table(recommendations_db)
+    build_seconds = time.perf_counter() - start
+
+    def table_path(profile):
+        return recommendation_table['formatted'][encode_lifestyle_profile(profile)]
+
+    # Both paths must serve the same response
+    for profile in profiles[:1000]:
+        assert current_path(profile) == table_path(profile)
+
+    _print_latency_table(f"Recommendation lookup ({num_requests} requests)", [
+        ('per-request build', _latency_percentiles(current_path, profiles)),
+        ('precomputed table', _latency_percentiles(table_path, profiles))
+    ])
+    print(f"Table build time: {build_seconds * 1000:.1f} ms for {NUM_FACTOR_COMBINATIONS} combinations")
+
+def benchmark_neighbor_search(num_users=5000, num_requests=2000):
+    """
+    Compare single-profile neighbour search through the sklearn pipeline
+    against the NumPy fast path
+    """
+    print("Benchmarking neighbour search...")
+
+    model, X = build_recommendation_model(create_synthetic_dataset(num_users))
+    fast_encoder = build_fast_encoder(model, X)
+
+    rng = np.random.default_rng(42)
+    profiles = [decode_lifestyle_profile(int(code)) for code in rng.integers(0, NUM_FACTOR_COMBINATIONS, num_requests)]
+
+    _print_latency_table(f"Neighbour search ({num_users} users, {num_requests} requests)", [
+        ('pipeline kneighbors', _latency_percentiles(lambda profile: find_similar_users(profile, model), profiles)),
+        ('fast path', _latency_percentiles(lambda profile: find_similar_users(profile, model, fast_encoder), profiles))
+    ])
+
+def benchmark_neighbor_index_scaling(user_counts=(10000, 100000, 1000000), brute_force_limit=100000, num_requests=500):
+    """
+    Compare fit time and query latency of the brute-force and grouped
+    neighbour indexes as the number of fitted users grows
+    """
+    print("Benchmarking neighbour index scaling...")
+
+    rng = np.random.default_rng(42)
+    profiles = [decode_lifestyle_profile(int(code)) for code in rng.integers(0, NUM_FACTOR_COMBINATIONS, num_requests)]
+
+    print(f"\n{'users':>10}{'index':>10}{'fit (s)':>12}{'p50 (us)':>12}{'p99 (us)':>12}")
+    for num_users in user_counts:
+        df = pd.DataFrame({factor: np.array(values)[rng.integers(0, len(values), num_users)]
+                           for factor, values in LIFESTYLE_FACTORS.items()})
+        df.insert(0, 'user_id', np.arange(1, num_users + 1))
+        df['symptom_improvement'] = rng.uniform(0, 10, num_users)
+
+        for neighbor_index in ('brute', 'grouped'):
+            if neighbor_index == 'brute' and num_users > brute_force_limit:
+                continue
+            start = time.perf_counter()
+            model, X = build_recommendation_model(df, neighbor_index=neighbor_index)
+            fit_seconds = time.perf_counter() - start
+            fast_encoder = build_fast_encoder(model, X)
+            p50, p99 = _latency_percentiles(lambda profile: find_similar_users(profile, model, fast_encoder), profiles)
+            print(f"{num_users:>10}{neighbor_index:>10}{fit_seconds:>12.2f}{p50:>12.2f}{p99:>12.2f}")
+
+def benchmark_detection_inference(batch_sizes=(1, 64, 512, 2048, 10000), max_batches=200, min_rows=20000):
+    """
+    Compare predict_proba of the saved detection pipeline against the
+    compiled flat-array forest at several batch sizes, and show which one
+    the API serves each batch size with (COMPILED_MAX_BATCH_ROWS)
+    """
+    print("Benchmarking detection inference...")
+    
+    model = joblib.load(MODEL_OUTPUT_PATH)
+    compiled = compile_model(model)
+    X = FeatureSchema.load(FEATURE_SCHEMA_PATH).transform(pd.read_csv(DATASET_PATH), include_target=False)
+    
+    print(f"\n{'batch':>8}{'pipeline (ms)':>16}{'compiled (ms)':>16}{'speedup':>10}{'served':>10}")
+    for batch_size in batch_sizes:
+        # Enough batches to score about min_rows rows, within 3..max_batches
+        num_batches = max(3, min(max_batches, min_rows // batch_size))
+        batches = [X.sample(batch_size, replace=True, random_state=i) for i in range(num_batches)]
+        
+        # Both paths must give the same probabilities
+        assert np.array_equal(compiled_predict_proba(compiled, batches[0]), model.predict_proba(batches[0]))
+        
+        pipeline_ms = np.median([_time_call(model.predict_proba, batch) for batch in batches]) * 1000
+        compiled_ms = np.median([_time_call(lambda batch: compiled_predict_proba(compiled, batch), batch) for batch in batches]) * 1000
+        served = 'compiled' if batch_size <= COMPILED_MAX_BATCH_ROWS else 'pipeline'
+        print(f"{batch_size:>8}{pipeline_ms:>16.3f}{compiled_ms:>16.3f}{pipeline_ms / compiled_ms:>9.1f}x{served:>10}")
+
+def _run_search_strategy(strategy, n_jobs):
+    """
+    Run one detection search strategy on the trainer's training split
+    """
+    X, y = load_and_prepare_data()
+    X_train, _, y_train, _ = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    _, stats = profile_search(X_train, y_train, strategy, n_jobs=n_jobs)
+    return stats
+
+def benchmark_detection_search(strategies=SEARCH_STRATEGIES, n_jobs=1):
+    """
+    Compare wall-clock time and peak memory of the detection model's
+    hyperparameter search strategies.
+    
+    Each strategy runs in a fresh process so peak memory is its own; with
+    n_jobs=1 all of its work happens in that process.
+    """
+    print("Benchmarking detection hyperparameter search...")
+    
+    results = []
+    for strategy in strategies:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            results.append(executor.submit(_run_search_strategy, strategy, n_jobs).result())
+    
+    print(f"\n{'strategy':<12}{'time (s)':>10}{'peak (MB)':>11}{'CV F1':>8}  best parameters")
+    for stats in results:
+        peak = f"{stats['peak_memory_mb']:.0f}" if stats['peak_memory_mb'] is not None else 'n/a'
+        params = {name.replace('classifier__', ''): value for name, value in stats['best_params'].items()}
+        print(f"{stats['strategy']:<12}{stats['seconds']:>10.1f}{peak:>11}{stats['best_score']:>8.4f}  {params}")
+
+def _run_chunked_training(path, chunk_rows, schema_path):
+    """
+    Train the out-of-core detection model on one file with one chunk size
+    """
+    _, stats = train_chunked_model(path, chunk_rows, schema_path=schema_path)
+    return stats
+
+def benchmark_chunked_training(num_rows=1000000, chunk_sizes=(10000, 100000, None)):
+    """
+    Throughput and peak memory of out-of-core detection training on a
+    replicated PCOS_infertility.csv for several chunk sizes; None reads the
+    whole file as one chunk, like loading it into memory.
+    
+    Each run is a fresh process so peak memory is its own.
+    """
+    print("Benchmarking chunked detection training...")
+    
+    with tempfile.TemporaryDirectory(prefix='pcos_chunked_') as tmp_dir:
+        path = os.path.join(tmp_dir, 'pcos_cohort.csv')
+        pd.read_csv(DATASET_PATH).sample(num_rows, replace=True, random_state=42).to_csv(path, index=False)
+        print(f"{num_rows} rows, {os.path.getsize(path) / 1024 ** 2:.0f} MB of CSV")
+        
+        results = []
+        for chunk_rows in chunk_sizes:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                results.append(executor.submit(_run_chunked_training, path, chunk_rows or num_rows,
+                                               os.path.join(tmp_dir, 'schema.json')).result())
+    
+    print(f"\n{'chunk rows':>12}{'time (s)':>10}{'train rows/s':>13}{'peak (MB)':>11}{'ROC AUC':>9}")
+    for stats in results:
+        peak = f"{stats['peak_memory_mb']:.0f}" if stats['peak_memory_mb'] is not None else 'n/a'
+        print(f"{stats['chunk_rows']:>12}{stats['seconds']:>10.1f}{stats['rows_per_second']:>13,.0f}{peak:>11}{stats['roc_auc']:>9.4f}")
+
+def _legacy_imputation(df):
+    """
+    clean_data's imputation before the imputation stage, one fill and one
+    copy per column, as the baseline
+    """
+    for col in MEDIAN_IMPUTATION_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].fillna(df[col].median())
+    for col in MODE_IMPUTATION_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].fillna(df[col].mode()[0])
+    return df
+
+def _imputation_stage(df):
+    """
+    clean_data's imputation stage: fit the fill values, then fill in one pass
+    """
+    return fit_feature_schema(df).fill_missing(df)
+
+def benchmark_imputation(base_rows=541, replications=(1, 100), missing_rate=0.05):
+    """
+    Compare time and peak traced memory of the per-column imputation loop
+    with the single-pass imputation stage on a replicated PCOS-shaped frame
+    """
+    print("Benchmarking PCOS data imputation...")
+    
+    rng = np.random.default_rng(42)
+    base = pd.DataFrame({col: rng.normal(20, 5, base_rows) for col in MEDIAN_IMPUTATION_COLUMNS})
+    for col in MODE_IMPUTATION_COLUMNS:
+        base[col] = rng.integers(0, 2, base_rows).astype(np.float64)
+    base = base.mask(rng.random(base.shape) < missing_rate)
+    
+    print(f"\n{'rows':>10}{'path':>14}{'time (ms)':>11}{'peak (MB)':>11}")
+    for replication in replications:
+        df = pd.concat([base] * replication, ignore_index=True)
+        results = []
+        for name, impute in (('per column', _legacy_imputation), ('single pass', _imputation_stage)):
+            data = df.copy()
+            tracemalloc.start()
+            start = time.perf_counter()
+            results.append(impute(data))
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{len(df):>10}{name:>14}{seconds * 1000:>11.1f}{peak / 1024 ** 2:>11.1f}")
+        pd.testing.assert_frame_equal(results[0], results[1])
+    print(f"Frame size: {df.memory_usage().sum() / 1024 ** 2:.1f} MB at {len(df)} rows")
+
+def benchmark_synthetic_generation(sample_counts=(100000, 1000000, 10000000), loop_limit=100000):
+    """
+    Compare the throughput of the original per-row synthetic lifestyle
+    generator against the vectorized chunked one
+    """
+    print("Benchmarking synthetic lifestyle data generation...")
+    
+    # Original generator: np.random.choice per factor, then one Python loop
+    # of dict lookups per factor
+    def loop_generator(num_samples):
+        np.random.seed(42)
+        data = {factor: np.random.choice(values, num_samples) for factor, values in LIFESTYLE_FACTORS.items()}
+        score = np.zeros(num_samples)
+        for factor in LIFESTYLE_FACTORS:
+            for i in range(num_samples):
+                score[i] += FACTOR_IMPACTS[factor][data[factor][i]]
+        score += np.random.normal(0, 0.5, num_samples)
+        return 10 * (score - score.min()) / (score.max() - score.min())
+    
+    # Same data for the same seed
+    assert np.array_equal(loop_generator(1000), create_synthetic_dataset(1000)['symptom_improvement'].to_numpy())
+    
+    print(f"\n{'rows':>10}{'generator':>24}{'time (s)':>10}{'rows/s':>14}")
+    for num_samples in sample_counts:
+        paths = [
+            ('vectorized, strings', lambda: create_synthetic_dataset(num_samples)),
+            ('vectorized, categorical', lambda: create_synthetic_dataset(num_samples, categorical=True))
+        ]
+        if num_samples <= loop_limit:
+            paths.insert(0, ('per-row loops', lambda: loop_generator(num_samples)))
+        for name, generate in paths:
+            start = time.perf_counter()
+            generate()
+            seconds = time.perf_counter() - start
+            print(f"{num_samples:>10}{name:>24}{seconds:>10.2f}{num_samples / seconds:>14,.0f}")
+
+def benchmark_synthetic_cycles(user_counts=(2000, 100000, 1000000), loop_limit=2000, cycles_per_user=12):
+    """
+    Compare the throughput and peak memory of the per-cycle synthetic period
+    generator against the streaming vectorized one
+    """
+    print("Benchmarking synthetic cycle generation...")
+    
+    model = PeriodTrackingModel()
+    print(f"\n{'users':>10}{'generator':>14}{'rows':>12}{'time (s)':>10}{'rows/s':>12}{'peak (MB)':>11}")
+    for num_users in user_counts:
+        paths = [('streaming', lambda: sum(len(df) for df in model.iter_synthetic_dataset(num_users, cycles_per_user)))]
+        if num_users <= loop_limit:
+            paths.insert(0, ('per-cycle', lambda: len(model.create_synthetic_dataset(num_users, cycles_per_user))))
+        for name, generate in paths:
+            start = time.perf_counter()
+            num_rows = generate()
+            seconds = time.perf_counter() - start
+            print(f"{num_users:>10}{name:>14}{num_rows:>12}{seconds:>10.2f}{num_rows / seconds:>12,.0f}{peak_memory_mb():>11.0f}")
+
+def _forecast_users_one_by_one(model, df, n_cycles=3):
+    """
+    Per-user forecasting, filtering the frame for every user with
+    prepare_data_for_user, as the baseline for forecast_users
+    """
+    num_forecasts = 0
+    for user_id in df['user_id'].unique():
+        cycle_lengths, cycle_stats, period_stats, regularity_score = model.prepare_data_for_user(df, user_id)
+        if cycle_lengths is None:
+            continue
+        model.predict_next_cycles(model.train_model(cycle_lengths), cycle_lengths, period_stats, n_cycles)
+        num_forecasts += 1
+    return num_forecasts
+
+def benchmark_bulk_forecasting(num_users=10000, loop_limit=2000, users_per_chunk=250, job_counts=(1, -1), estimators=('arima', 'ar1')):
+    """
+    Compare forecasting users one at a time with ARIMA against
+    forecast_users with each estimator, on one process and on a process pool
+    """
+    print("Benchmarking bulk cycle forecasting...")
+    
+    df = pd.concat(PeriodTrackingModel().iter_synthetic_dataset(num_users), ignore_index=True)
+    
+    rows = []
+    baseline = df[df['user_id'] <= loop_limit]
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        start = time.perf_counter()
+        num_forecasts = _forecast_users_one_by_one(PeriodTrackingModel('arima'), baseline)
+        rows.append(('one by one', 'arima', 1, num_forecasts, time.perf_counter() - start, None))
+    
+    for estimator in estimators:
+        model = PeriodTrackingModel(estimator)
+        for n_jobs in job_counts:
+            start = time.perf_counter()
+            forecast = model.forecast_users(df, users_per_chunk=users_per_chunk, n_jobs=n_jobs)
+            seconds = time.perf_counter() - start
+            per_user = forecast.drop_duplicates('user_id')
+            rows.append(('forecast_users', estimator, n_jobs, len(per_user), seconds, (per_user['fit_seconds'] + per_user['predict_seconds']).median()))
+    
+    print(f"\n{'path':>16}{'estimator':>11}{'n_jobs':>8}{'users':>8}{'time (s)':>10}{'users/s':>10}{'median user (ms)':>18}")
+    for name, estimator, n_jobs, users, seconds, median in rows:
+        median = f"{median * 1000:.2f}" if median is not None else '-'
+        print(f"{name:>16}{estimator:>11}{n_jobs:>8}{users:>8}{seconds:>10.2f}{users / seconds:>10,.0f}{median:>18}")
+
+def _backtest_one_by_one(model, df, horizon=3):
+    """
+    The former evaluate_model loop, filtering the frame for every user and
+    holding out their last horizon cycles, as the baseline for backtest
+    """
+    num_forecasts = 0
+    for user_id in df['user_id'].unique():
+        user_data = df[df['user_id'] == user_id].sort_values('cycle_number')
+        cycle_lengths = user_data['cycle_length'].iloc[:-horizon].dropna().tolist()
+        if len(cycle_lengths) < 3:
+            continue
+        model.forecast_cycle_lengths(model.train_model(cycle_lengths), cycle_lengths, horizon)
+        num_forecasts += 1
+    return num_forecasts
+
+def benchmark_backtest(user_counts=(10000, 100000), loop_limit=1000, n_jobs=1):
+    """
+    Compare the former per-user evaluation loop with the rolling-origin
+    backtest of every user
+    """
+    print("Benchmarking the period model backtest...")
+    
+    model = PeriodTrackingModel('ar1')
+    rows = []
+    for num_users in user_counts:
+        df = pd.concat(model.iter_synthetic_dataset(num_users), ignore_index=True)
+        
+        if num_users <= loop_limit * 10:
+            start = time.perf_counter()
+            num_forecasts = _backtest_one_by_one(model, df[df['user_id'] <= loop_limit])
+            rows.append(('one by one', num_users, loop_limit, num_forecasts, time.perf_counter() - start))
+        
+        start = time.perf_counter()
+        results = model.backtest(df, n_jobs=n_jobs)
+        rows.append(('backtest', num_users, num_users, int((results['step'] == 1).sum()), time.perf_counter() - start))
+    
+    print(f"\n{'path':>12}{'frame users':>13}{'users':>9}{'forecasts':>11}{'time (s)':>10}{'users/s':>11}{'forecasts/s':>13}")
+    for name, frame_users, users, forecasts, seconds in rows:
+        print(f"{name:>12}{frame_users:>13}{users:>9}{forecasts:>11}{seconds:>10.2f}{users / seconds:>11,.0f}{forecasts / seconds:>13,.0f}")
+    print()
+    print(model.summarize_backtest(results).round(2).to_string())
+
+def benchmark_cycle_estimators(num_users=1000, history_lengths=(3, 5, 8), n_cycles=3):
+    """
+    Compare the fit time, forecasts and forecast error on the following
+    n_cycles cycles of the closed-form AR(1) estimator against statsmodels
+    ARIMA(1,0,0) on synthetic cycle histories of several lengths, and check
+    that AR(1) stays within its stated tolerance of ARIMA
+    """
+    print("Benchmarking cycle length estimators...")
+    
+    df = pd.concat(PeriodTrackingModel().iter_synthetic_dataset(num_users), ignore_index=True)
+    histories = [
+        lengths[~np.isnan(lengths)]
+        for lengths in np.split(df['cycle_length'].to_numpy(dtype=np.float64), num_users)
+    ]
+    arima = PeriodTrackingModel('arima')
+    ar1 = PeriodTrackingModel('ar1')
+    
+    print(f"\n{'history':>8}{'ARIMA (ms/user)':>17}{'AR(1) (ms/user)':>17}{'AR(1) batch (us/user)':>23}"
+          f"{'mean |diff|':>13}{'p95 |diff|':>12}{'same day':>10}{'within 1 day':>14}{'ARIMA MAE':>11}{'AR(1) MAE':>11}")
+    for length in history_lengths:
+        series = [history[:length].tolist() for history in histories]
+        actual = np.array([history[length:length + n_cycles] for history in histories])
+        
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            start = time.perf_counter()
+            arima_forecasts = np.array([arima.train_model(s).forecast(n_cycles) for s in series])
+            arima_seconds = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        ar1_forecasts = np.array([ar1.train_model(s).forecast(n_cycles) for s in series])
+        ar1_seconds = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        batch_forecasts = forecast_ar1(*fit_ar1(pad_series(series)), n_cycles)
+        batch_seconds = time.perf_counter() - start
+        assert np.allclose(batch_forecasts, ar1_forecasts)
+        
+        # Forecast lengths as predict_next_cycles reports them: whole days in [21, 45]
+        difference = np.abs(ar1_forecasts - arima_forecasts)
+        arima_days = np.clip(np.round(arima_forecasts), 21, 45)
+        ar1_days = np.clip(np.round(ar1_forecasts), 21, 45)
+        days = np.abs(ar1_days - arima_days)
+        arima_mae = np.abs(arima_days - actual).mean()
+        ar1_mae = np.abs(ar1_days - actual).mean()
+        print(f"{length:>8}{arima_seconds / num_users * 1000:>17.2f}{ar1_seconds / num_users * 1000:>17.3f}"
+              f"{batch_seconds / num_users * 1e6:>23.2f}{difference.mean():>13.2f}{np.percentile(difference, 95):>12.2f}"
+              f"{(days == 0).mean():>10.1%}{(days <= 1).mean():>14.1%}{arima_mae:>11.2f}{ar1_mae:>11.2f}")
+        
+        assert days.mean() <= AR1_MAX_MEAN_GAP_DAYS, (
+            f"AR(1) {days.mean():.2f} days from ARIMA on average at history {length}, "
+            f"above {AR1_MAX_MEAN_GAP_DAYS} days")
+        if length >= AR1_PARITY_MIN_HISTORY:
+            agreement = (days <= AR1_TOLERANCE_DAYS).mean()
+            assert agreement >= AR1_MIN_AGREEMENT, (
+                f"AR(1) within {AR1_TOLERANCE_DAYS} day(s) of ARIMA for {agreement:.1%} of forecasts "
+                f"at history {length}, below {AR1_MIN_AGREEMENT:.0%}")
+        else:
+            assert ar1_mae <= arima_mae, f"AR(1) MAE {ar1_mae:.2f} above ARIMA's {arima_mae:.2f} at history {length}"
+    print("AR(1) is within tolerance of ARIMA")
+
+def benchmark_cycle_updates(history_lengths=(6, 12, 24), num_updates=1000):
+    """
+    Compare logging a cycle by refitting and predicting from the full
+    history against updating the user's serialized CycleState
+    """
+    print("Benchmarking incremental cycle updates...")
+    
+    model = PeriodTrackingModel()
+    df = next(model.iter_synthetic_dataset(1, cycles_per_user=max(history_lengths) + 1))
+    cycles = [{'startDate': row.start_date, 'endDate': row.end_date} for row in df.itertuples()]
+    
+    print(f"\n{'history':>8}{'refit (us)':>12}{'state (us)':>12}{'state size (bytes)':>20}")
+    for length in history_lengths:
+        history, new_cycle = cycles[:length], cycles[length]
+        
+        def refit():
+            user_cycles = history + [new_cycle]
+            fitted = PeriodTrackingModel('ar1')
+            fitted.fit(user_cycles)
+            fitted.predict(user_cycles)
+        
+        stored = CycleState.from_cycles(history).to_bytes()
+        def update():
+            state = CycleState.from_bytes(stored)
+            state.add_cycle(new_cycle['startDate'], new_cycle['endDate'])
+            model.predict_from_state(state)
+            return state.to_bytes()
+        
+        timings = []
+        for fn in (refit, update):
+            start = time.perf_counter()
+            for _ in range(num_updates):
+                fn()
+            timings.append((time.perf_counter() - start) / num_updates * 1e6)
+        print(f"{length:>8}{timings[0]:>12.0f}{timings[1]:>12.0f}{len(update()):>20}")
+
+def benchmark_forecast_cache(num_users=500, polls_per_user=20, max_entries=250):
+    """
+    Latency of polling predictions for the same users with and without a
+    ForecastCache, including a cache too small for every user
+    """
+    print("Benchmarking the forecast cache...")
+    
+    df = next(PeriodTrackingModel().iter_synthetic_dataset(num_users))
+    histories = {
+        user_id: [{'startDate': row.start_date, 'endDate': row.end_date} for row in user_data.itertuples()]
+        for user_id, user_data in df.groupby('user_id')
+    }
+    # Users poll in turn, like screens refreshing
+    polls = [user_id for _ in range(polls_per_user) for user_id in histories]
+    
+    rows = []
+    for name, cache in [('no cache', None),
+                        ('cache', ForecastCache(max_entries=num_users)),
+                        (f'cache ({max_entries} entries)', ForecastCache(max_entries=max_entries))]:
+        model = PeriodTrackingModel('ar1', cache=cache)
+        latencies = _latency_percentiles(lambda user_id: model.predict(histories[user_id], user_id=user_id), polls)
+        stats = cache.stats() if cache is not None else None
+        rows.append((name, latencies, stats))
+    
+    _print_latency_table("predict() polling latency", [(name, latencies) for name, latencies, _ in rows])
+    for name, _, stats in rows:
+        if stats is not None:
+            print(f"{name}: hit rate {stats['hit_rate']:.1%}, {stats['entries']} entries, {stats['evictions']} evictions")
+
+def benchmark_period_service(num_users=2000, worker_counts=(1, 4), estimator='ar1'):
+    """
+    Compare a new PeriodTrackingModel per request against one shared
+    PeriodPredictorService, checking that concurrent predictions match the
+    per-request ones
+    """
+    print("Benchmarking the period predictor service...")
+    
+    df = next(PeriodTrackingModel().iter_synthetic_dataset(num_users))
+    requests = [
+        (user_id, [{'startDate': row.start_date, 'endDate': row.end_date} for row in user_data.itertuples()])
+        for user_id, user_data in df.groupby('user_id')
+    ]
+    
+    start = time.perf_counter()
+    expected = [PeriodTrackingModel(estimator).predict(user_cycles) for _, user_cycles in requests]
+    rows = [('model per request', '-', time.perf_counter() - start)]
+    
+    for max_workers in worker_counts:
+        service = PeriodPredictorService(PeriodTrackingModel(estimator), max_workers=max_workers)
+        start = time.perf_counter()
+        results = service.predict_many(requests)
+        rows.append(('service, fit', max_workers, time.perf_counter() - start))
+        
+        start = time.perf_counter()
+        stored = service.predict_many([(user_id, None) for user_id, _ in requests])
+        rows.append(('service, stored fits', max_workers, time.perf_counter() - start))
+        
+        for result in (results, stored):
+            for got, want in zip(result, expected):
+                assert got['cycle_stats'] == want['cycle_stats']
+                assert [p['cycle_length'] for p in got['predictions']] == [p['cycle_length'] for p in want['predictions']]
+    
+    print(f"\n{'path':<24}{'workers':>8}{'users':>8}{'time (s)':>10}{'users/s':>10}")
+    for name, workers, seconds in rows:
+        print(f"{name:<24}{workers:>8}{num_users:>8}{seconds:>10.2f}{num_users / seconds:>10,.0f}")
+    print("Concurrent predictions match a fresh model per request")
+
+def _legacy_weighted_average(cycle_lengths, n_cycles):
+    """
+    The per-user weighted average fallback before it was vectorized, as the baseline
+    """
+    weights = list(range(1, len(cycle_lengths) + 1))
+    weighted_avg = sum(x * w for x, w in zip(cycle_lengths, weights)) / sum(weights)
+    return [max(21, min(45, int(round(weighted_avg + np.random.normal(0, 1))))) for _ in range(n_cycles)]
+
+def benchmark_weighted_average(user_counts=(1, 1000, 100000), n_cycles=3, min_seconds=0.5):
+    """
+    Compare the per-user weighted average fallback with the vectorized one
+    on histories of 2 to 11 cycle lengths
+    """
+    print("Benchmarking the weighted average forecaster...")
+    
+    rng = np.random.default_rng(42)
+    df = pd.concat(PeriodTrackingModel().iter_synthetic_dataset(max(user_counts)), ignore_index=True)
+    lengths = df['cycle_length'].to_numpy(dtype=np.float64).reshape(max(user_counts), -1)[:, 1:]
+    histories = [row[:size].tolist() for row, size in zip(lengths, rng.integers(2, lengths.shape[1] + 1, len(lengths)))]
+    model = PeriodTrackingModel()
+    
+    def repeat(fn):
+        # Seconds per call, repeating fast calls for at least min_seconds
+        calls, start = 0, time.perf_counter()
+        while True:
+            fn()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_seconds:
+                return elapsed / calls
+    
+    print(f"\n{'users':>8}{'path':>26}{'time (ms)':>12}{'users/s':>14}")
+    for num_users in user_counts:
+        batch = histories[:num_users]
+        paths = [
+            ('per user, legacy', lambda: [_legacy_weighted_average(h, n_cycles) for h in batch]),
+            ('per user, deterministic', lambda: [model._predict_with_weighted_average(h, n_cycles) for h in batch]),
+            ('batch, deterministic', lambda: weighted_average_forecast(pad_series(batch), n_cycles)),
+            ('batch, seeded', lambda: weighted_average_forecast(pad_series(batch), n_cycles, 42))
+        ]
+        for name, fn in paths:
+            seconds = repeat(fn)
+            print(f"{num_users:>8}{name:>26}{seconds * 1000:>12.3f}{num_users / seconds:>14,.0f}")
+    
+    # The deterministic forecast is the rounded weighted average itself
+    averages = [sum(x * w for x, w in zip(h, range(1, len(h) + 1))) / (len(h) * (len(h) + 1) / 2) for h in histories]
+    expected = np.clip(np.round(averages), 21, 45)
+    assert (weighted_average_forecast(pad_series(histories), n_cycles) == expected[:, np.newaxis]).all()
+    assert (weighted_average_forecast(pad_series(histories), n_cycles, 7) == weighted_average_forecast(pad_series(histories), n_cycles, 7)).all()
+
+def benchmark_period_responses(history_lengths=(12, 60, 240), num_users=200, n_cycles=3):
+    """
+    Compare the size and encoding time of the period prediction response
+    modes, with the standard json module and with orjson when installed
+    """
+    print("Benchmarking period prediction response encoding...")
+    
+    model = PeriodTrackingModel('ar1')
+    df = next(model.iter_synthetic_dataset(num_users, cycles_per_user=max(history_lengths) + 1))
+    histories = [
+        [{'startDate': row.start_date, 'endDate': row.end_date} for row in user_data.itertuples()]
+        for _, user_data in df.groupby('user_id')
+    ]
+    
+    encoders = [('json', lambda payload: json.dumps(payload, separators=(',', ':')).encode())]
+    if orjson is not None:
+        encoders.append(('orjson', orjson.dumps))
+    
+    print(f"\n{'cycles':>8}{'mode':>18}{'bytes/user':>12}{'encoder':>9}{'us/user':>10}")
+    for history_length in history_lengths:
+        fitted = [model.fit_user(cycles[:history_length + 1]) for cycles in histories]
+        for response_mode in RESPONSE_MODES:
+            payload = {
+                'success': True,
+                'results': [model.predict_fitted(f, n_cycles, response_mode) for f in fitted]
+            }
+            for name, encode in encoders:
+                start = time.perf_counter()
+                encoded = encode(payload)
+                seconds = time.perf_counter() - start
+                print(f"{history_length:>8}{response_mode:>18}{len(encoded) / num_users:>12,.0f}{name:>9}"
+                      f"{seconds / num_users * 1e6:>10.1f}")
+            assert json.loads(encoded) == json.loads(json.dumps(payload))
+
+BENCHMARKS = {
+    'recommendation_lookup': benchmark_recommendation_lookup,
+    'neighbor_search': benchmark_neighbor_search,
+    'neighbor_index_scaling': benchmark_neighbor_index_scaling,
+    'detection_inference': benchmark_detection_inference,
+    'detection_search': benchmark_detection_search,
+    'chunked_training': benchmark_chunked_training,
+    'imputation': benchmark_imputation,
+    'synthetic_generation': benchmark_synthetic_generation,
+    'synthetic_cycles': benchmark_synthetic_cycles,
+    'bulk_forecasting': benchmark_bulk_forecasting,
+    'backtest': benchmark_backtest,
+    'cycle_estimators': benchmark_cycle_estimators,
+    'cycle_updates': benchmark_cycle_updates,
+    'forecast_cache': benchmark_forecast_cache,
+    'period_service': benchmark_period_service,
+    'period_responses': benchmark_period_responses,
+    'weighted_average': benchmark_weighted_average
+}
+
+def main():
+    """
+    Run the benchmarks named on the command line, or all of them
+    """
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark '{name}'. Available: {', '.join(BENCHMARKS)}")
+            continue
+        BENCHMARKS[name]()
+
+if __name__ == "__main__":
+    main()
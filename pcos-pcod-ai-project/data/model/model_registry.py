@@ -0,0 +1,158 @@
+import os
+import threading
+import time
+from types import MappingProxyType
+
+class ModelUnavailableError(RuntimeError):
+    """
+    Raised when model artifacts have never been loaded successfully
+    """
+
+class ModelRegistry:
+    """
+    Lazily loads a set of model artifacts, shares them read-only across
+    threads, and reloads them atomically when their files change on disk.
+
+    The loader is called with no arguments and returns a dict of artifacts.
+    Requests always see one complete snapshot. Only the first load makes
+    callers wait. A change on disk is noticed by a request but reloaded on a
+    background thread, while every request keeps serving the previous
+    snapshot, and the reference is swapped in one assignment when the load
+    finishes. A failed load keeps the previous snapshot, records the error
+    and is not retried for retry_backoff seconds, doubling with every
+    consecutive failure up to max_retry_backoff.
+    """
+    def __init__(self, name, paths, loader, check_interval=2.0, retry_backoff=1.0, max_retry_backoff=60.0):
+        self.name = name
+        self.paths = list(paths)
+        self.loader = loader
+        self.check_interval = check_interval
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+
+        self._artifacts = None
+        self._signature = None
+        self._failed_signature = None
+        self._loaded_at = None
+        self._last_error = None
+        self._last_check = 0.0
+        self._failures = 0
+        self._retry_at = 0.0
+        self._reloading = False
+        # _load_lock serializes loads; _lock guards the bookkeeping around them
+        self._load_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+    def _file_signature(self):
+        """
+        Modification time and size of every artifact file; optional files
+        may be missing, and their appearing or disappearing is a change too
+        """
+        signature = []
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                signature.append((path, None, None))
+                continue
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def _load(self):
+        """
+        Load a fresh snapshot and swap it in; must be called with _load_lock held
+        """
+        signature = None
+        try:
+            signature = self._file_signature()
+            artifacts = MappingProxyType(dict(self.loader()))
+        except Exception as e:
+            with self._lock:
+                self._failed_signature = signature
+                self._last_error = f"{type(e).__name__}: {e}"
+                backoff = min(self.retry_backoff * 2 ** self._failures, self.max_retry_backoff)
+                self._failures += 1
+                self._retry_at = time.monotonic() + backoff
+            print(f"Error loading {self.name} artifacts: {self._last_error}; retrying in {backoff:g} s at the earliest")
+            return False
+
+        with self._lock:
+            self._artifacts = artifacts
+            self._signature = signature
+            self._loaded_at = time.time()
+            self._last_error = None
+            self._failures = 0
+            self._retry_at = 0.0
+        source = f" from {', '.join(self.paths)}" if self.paths else ''
+        print(f"Loaded {self.name} artifacts{source}")
+        return True
+
+    def load(self):
+        """
+        Load the artifacts now (e.g. before forking workers); returns whether it succeeded
+        """
+        with self._load_lock:
+            return self._load()
+
+    def get(self):
+        """
+        Return the current artifacts, loading them on first use and starting
+        a background reload when the files on disk have changed
+        """
+        artifacts = self._artifacts
+        if artifacts is None:
+            # First use: every caller waits for the single initial load, and
+            # after a failure fails fast until the backoff has passed
+            with self._load_lock:
+                if self._artifacts is None and (time.monotonic() < self._retry_at or not self._load()):
+                    raise ModelUnavailableError(f"{self.name} artifacts not loaded: {self._last_error}")
+                return self._artifacts
+
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval:
+            self._last_check = now
+            self._reload_if_changed(now)
+        return artifacts
+
+    def _reload_if_changed(self, now):
+        """
+        Start a background reload when the artifact files changed; never waits
+        """
+        if self._reloading or now < self._retry_at:
+            return
+        try:
+            signature = self._file_signature()
+        except OSError as e:
+            self._last_error = f"{type(e).__name__}: {e}"
+            return
+        # Don't retry files that already failed to load until they change again
+        if signature == self._signature or signature == self._failed_signature:
+            return
+
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+        threading.Thread(target=self._reload, name=f"{self.name} reload", daemon=True).start()
+
+    def _reload(self):
+        """
+        Background reload; requests keep the previous snapshot until it is swapped in
+        """
+        try:
+            with self._load_lock:
+                self._load()
+        finally:
+            self._reloading = False
+
+    def status(self):
+        """
+        Describe the loaded snapshot for health checks
+        """
+        return {
+            'name': self.name,
+            'loaded': self._artifacts is not None,
+            'loaded_at': self._loaded_at,
+            'reloading': self._reloading,
+            'last_error': self._last_error
+        }
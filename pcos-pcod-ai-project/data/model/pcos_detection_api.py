@@ -0,0 +1,279 @@
+import os
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+import joblib
+import pandas as pd
+from flask import Flask, request, jsonify
+from flask_cors import CORS
+
+from feature_schema import FeatureSchema, InvalidRecordError
+from frame_cache import file_digest
+from model_registry import ModelRegistry, ModelUnavailableError
+from serving import register_health_endpoints, run_production_server
+from pcos_early_detection_model import (
+    CALIBRATION_PATH,
+    COMPILED_MAX_BATCH_ROWS,
+    COMPILED_MODEL_PATH,
+    FEATURE_SCHEMA_PATH,
+    MODEL_OUTPUT_PATH,
+    apply_probability_calibration,
+    compiled_predict_proba,
+    load_compiled_model
+)
+
+# Seconds between checks of the model file for a newer version
+MODEL_RELOAD_CHECK_INTERVAL = float(os.environ.get('MODEL_RELOAD_CHECK_INTERVAL', 2.0))
+
+# Concurrent requests are scored together in one predict_proba call of up to
+# MICRO_BATCH_MAX_ROWS rows, waiting at most MICRO_BATCH_MAX_WAIT_MS for more
+MICRO_BATCH_MAX_ROWS = int(os.environ.get('MICRO_BATCH_MAX_ROWS', 512))
+MICRO_BATCH_MAX_WAIT_MS = float(os.environ.get('MICRO_BATCH_MAX_WAIT_MS', 5))
+# Seconds a request waits for its micro-batched scores before giving up
+MICRO_BATCH_TIMEOUT = float(os.environ.get('MICRO_BATCH_TIMEOUT', 30))
+
+# Probability at or above which a record is flagged as likely PCOS
+DECISION_THRESHOLD = 0.5
+
+app = Flask(__name__)
+CORS(app)  # Enable CORS for all routes
+
+def load_detection_model():
+    """
+    Load the trained detection pipeline, the feature schema it was trained
+    with and, when present, its compiled version and probability calibration
+    """
+    model = joblib.load(MODEL_OUTPUT_PATH)
+    schema = FeatureSchema.load(FEATURE_SCHEMA_PATH)
+    if schema.features != list(model.feature_names_in_):
+        raise ValueError(f"{FEATURE_SCHEMA_PATH} does not match the model's features; retrain the model")
+    
+    model_digest = file_digest(MODEL_OUTPUT_PATH)
+    
+    # A calibration written for another model file means training is still
+    # saving its artifacts; failing keeps the previous snapshot until it is done
+    calibration = None
+    if os.path.exists(CALIBRATION_PATH):
+        with open(CALIBRATION_PATH, 'r') as f:
+            calibration = json.load(f)
+        if calibration.pop('model_digest', None) != model_digest:
+            raise ValueError(f"{CALIBRATION_PATH} was not fitted for the current {MODEL_OUTPUT_PATH}; retrain the model")
+    
+    # Flat array version of the forest, much faster than the pipeline for
+    # small batches; checked for identical probabilities when it was saved
+    compiled = load_compiled_model(model_digest)
+    if compiled is None:
+        print(f"No {COMPILED_MODEL_PATH}, serving the pipeline directly")
+    
+    return {
+        'model': model,
+        'compiled': compiled,
+        'calibration': calibration,
+        'schema': schema
+    }
+
+# The pipeline is loaded on first use and reloaded when its files change
+registry = ModelRegistry(
+    'PCOS early detection',
+    [MODEL_OUTPUT_PATH, FEATURE_SCHEMA_PATH, COMPILED_MODEL_PATH, CALIBRATION_PATH],
+    load_detection_model,
+    check_interval=MODEL_RELOAD_CHECK_INTERVAL
+)
+
+# /healthz and /readyz for the process manager and load balancer
+register_health_endpoints(app, [registry])
+
+def records_to_frame(records, artifacts):
+    """
+    Build the feature frame the pipeline expects from patient records with
+    the PCOS_infertility.csv or normalized column names, with the feature
+    schema the model was trained with; missing values get its fill values.
+    Raises InvalidRecordError for records with unknown keys or no feature
+    """
+    schema = artifacts['schema']
+    return schema.transform(schema.records_to_frame(records), include_target=False)
+
+def predict_frame_proba(df, artifacts=None):
+    """
+    Calibrated PCOS probability for every row of a prepared feature frame
+    """
+    if artifacts is None:
+        artifacts = registry.get()
+    if artifacts['compiled'] is not None and len(df) <= COMPILED_MAX_BATCH_ROWS:
+        scores = compiled_predict_proba(artifacts['compiled'], df)[:, 1]
+    else:
+        scores = artifacts['model'].predict_proba(df)[:, 1]
+    return apply_probability_calibration(scores, artifacts['calibration'])
+
+def predict_pcos_probability(records):
+    """
+    Calibrated PCOS probability for one record (a dict) or a list of records
+    """
+    artifacts = registry.get()
+    single = isinstance(records, dict)
+    probabilities = predict_frame_proba(records_to_frame([records] if single else records, artifacts), artifacts)
+    return float(probabilities[0]) if single else probabilities.tolist()
+
+class MicroBatcher:
+    """
+    Collects feature frames submitted by concurrent requests and scores them
+    with a single predict_proba call per artifact snapshot.
+    
+    The worker thread takes the first waiting frame, keeps collecting frames
+    until max_rows is reached or max_wait_ms has passed, then scores the
+    frames of each snapshot together with that snapshot (a reload may have
+    happened between requests) and resolves every caller's Future with its
+    own slice of the probabilities. When a combined call fails, the frames
+    are scored one by one so only the offending request gets the error.
+    """
+    def __init__(self, predict_fn, max_rows=MICRO_BATCH_MAX_ROWS, max_wait_ms=MICRO_BATCH_MAX_WAIT_MS):
+        self.predict_fn = predict_fn
+        self.max_rows = max_rows
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker_pid = None
+    
+    def _ensure_worker(self):
+        """
+        Start the worker thread, once per process since threads don't survive a fork
+        """
+        if self._worker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker_pid != os.getpid():
+                self._queue = queue.Queue()
+                threading.Thread(target=self._run, name='pcos-micro-batcher', daemon=True).start()
+                self._worker_pid = os.getpid()
+    
+    def submit(self, df, artifacts):
+        """
+        Queue a feature frame built with an artifact snapshot for scoring
+        with that snapshot, and return a Future of its probabilities
+        """
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((df, artifacts, future))
+        return future
+    
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            rows = len(batch[0][0])
+            deadline = time.monotonic() + self.max_wait
+            
+            while rows < self.max_rows:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                rows += len(item[0])
+            
+            groups = {}
+            for df, artifacts, future in batch:
+                groups.setdefault(id(artifacts), (artifacts, []))[1].append((df, future))
+            for artifacts, items in groups.values():
+                self._score(items, artifacts)
+    
+    def _score(self, items, artifacts):
+        """
+        Score the (frame, Future) pairs of one snapshot in one call, falling
+        back to a call per frame when the combined one fails
+        """
+        try:
+            probabilities = self.predict_fn(pd.concat([df for df, _ in items], ignore_index=True), artifacts)
+        except Exception as e:
+            if len(items) == 1:
+                items[0][1].set_exception(e)
+                return
+            for item in items:
+                self._score([item], artifacts)
+            return
+        
+        start = 0
+        for df, future in items:
+            future.set_result(probabilities[start:start + len(df)])
+            start += len(df)
+
+batcher = MicroBatcher(predict_frame_proba)
+
+def format_prediction(probability):
+    """
+    Shape one probability for the API response
+    """
+    return {
+        'probability': round(float(probability), 4),
+        'prediction': int(probability >= DECISION_THRESHOLD)
+    }
+
+@app.route('/api/pcos-detection', methods=['POST'])
+def detect_pcos():
+    """
+    API endpoint to score PCOS risk.
+    
+    Accepts one patient record, a list of records, or {"records": [...]},
+    using the PCOS_infertility.csv column names. Concurrent requests are
+    micro-batched into one model call.
+    """
+    try:
+        payload = request.get_json()
+        single = isinstance(payload, dict) and 'records' not in payload
+        records = [payload] if single else (payload.get('records') if isinstance(payload, dict) else payload)
+        
+        if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+            return jsonify({
+                'success': False,
+                'error': 'Expected a patient record, a list of records or an object with a "records" list'
+            }), 400
+        
+        artifacts = registry.get()
+        if not records:
+            probabilities = []
+        else:
+            probabilities = batcher.submit(records_to_frame(records, artifacts), artifacts).result(timeout=MICRO_BATCH_TIMEOUT)
+        
+        predictions = [format_prediction(p) for p in probabilities]
+        response = {
+            'success': True,
+            'calibrated': artifacts['calibration'] is not None
+        }
+        if single:
+            response['prediction'] = predictions[0]
+        else:
+            response['predictions'] = predictions
+        return jsonify(response)
+    
+    except InvalidRecordError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except ModelUnavailableError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503
+    except FutureTimeoutError:
+        return jsonify({
+            'success': False,
+            'error': f"Scoring did not finish within {MICRO_BATCH_TIMEOUT:g} s"
+        }), 503
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+if __name__ == '__main__':
+    port = int(os.environ.get('PORT', 5001))
+    if os.environ.get('FLASK_DEBUG') == '1':
+        # Single-process development server with the reloader
+        app.run(host='0.0.0.0', port=port, debug=True)
+    else:
+        run_production_server(app, [registry], default_port=port)
@@ -1,54 +1,122 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, GridSearchCV
+from sklearn.model_selection import train_test_split, GridSearchCV, RandomizedSearchCV, StratifiedKFold, ParameterGrid, cross_val_predict
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (enables HalvingGridSearchCV)
+from sklearn.model_selection import HalvingGridSearchCV
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score, confusion_matrix
 from sklearn.impute import SimpleImputer
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.base import clone
+from scipy.stats import randint
+from joblib import Parallel, delayed
 import joblib
+import json
 import os
+import sys
+import shutil
+import tempfile
+import time
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from frame_cache import FrameCache, file_digest
+from pcos_ml_pipeline import TARGET_COLUMN, fit_feature_schema
+
 # Configuration
 MODEL_OUTPUT_PATH = 'pcos_early_detection_model.joblib'
 RESULTS_PATH = 'model_evaluation_results.txt'
 FEATURE_IMPORTANCE_PATH = 'feature_importance.png'
+CALIBRATION_PATH = 'pcos_detection_calibration.json'
+COMPILED_MODEL_PATH = 'pcos_early_detection_forest.npz'
+# Batches of up to this many rows are faster with the compiled forest,
+# larger ones with the pipeline's own tree code
+COMPILED_MAX_BATCH_ROWS = 512
+FEATURE_SCHEMA_PATH = 'pcos_detection_feature_schema.json'
+
+# Raw dataset, and the version of its preparation in load_and_prepare_data:
+# part of the cache key of the prepared frame, so bump it when that changes
+DATASET_PATH = '../PCOS_infertility.csv'
+PREPROCESSING_VERSION = 2
+PREPARED_FRAME_NAME = 'pcos_detection_prepared'
+
+# Hyperparameter search
+SEARCH_STRATEGIES = ('grid', 'halving', 'random', 'warm_start')
+SEARCH_STRATEGY = 'grid'
+CV_FOLDS = 5
+PARAM_GRID = {
+    'classifier__n_estimators': [100, 200],
+    'classifier__max_depth': [None, 10, 20],
+    'classifier__min_samples_split': [2, 5]
+}
+PARAM_DISTRIBUTIONS = {
+    'classifier__n_estimators': randint(50, 301),
+    'classifier__max_depth': [None, 10, 20, 30],
+    'classifier__min_samples_split': randint(2, 11)
+}
+RANDOM_SEARCH_ITERATIONS = 8
+
+# Out-of-core training (main's 'chunked' mode) for datasets too large to
+# load: rows per chunk, rows the feature schema is fitted on, passes over
+# the training rows, and the share of rows held out for evaluation
+CHUNK_ROWS = 100000
+SCHEMA_SAMPLE_ROWS = 100000
+CHUNKED_EPOCHS = 5
+CHUNKED_TEST_FRACTION = 0.2
+# The held-out rows are scored into a confusion matrix and per-class
+# histograms of their log-odds in this many bins over +-CHUNKED_AUC_LOG_ODDS
+# (probabilities saturate long before), so evaluation memory does not grow
+# with them either; the ROC AUC error is at most the share of
+# positive/negative pairs that fall in the same bin
+CHUNKED_AUC_BINS = 10000
+CHUNKED_AUC_LOG_ODDS = 40.0
+CHUNKED_MODEL_OUTPUT_PATH = 'pcos_early_detection_sgd.joblib'
+CHUNKED_FEATURE_SCHEMA_PATH = 'pcos_detection_sgd_feature_schema.json'
+CHUNKED_RESULTS_PATH = 'chunked_model_evaluation_results.txt'
+
+def build_prepared_data(path=DATASET_PATH, schema_path=FEATURE_SCHEMA_PATH):
+    """
+    Load the raw dataset and prepare it for training, target included, with
+    the PCOS feature schema fitted on it. The schema is saved for serving,
+    which applies exactly the same transform to incoming records.
+    """
+    # Load the CSV file
+    df = pd.read_csv(path)
+    print(f"Loaded {os.path.basename(path)}")
+    
+    # Normalize names, drop IDs, mark missing-value placeholders and fill missing values
+    schema = fit_feature_schema(df)
+    schema.save(schema_path)
+    print(f"Feature schema saved to {schema_path}")
+    
+    return schema.transform(df)
 
-def load_and_prepare_data():
+def load_and_prepare_data(path=DATASET_PATH, cache=None, schema_path=FEATURE_SCHEMA_PATH):
     """
-    Load and prepare the PCOS dataset for model training
+    Load and prepare the PCOS dataset for model training. The prepared
+    frame is cached under a hash of the dataset, so an unchanged dataset
+    is memory-mapped from the frame cache instead of parsed and prepared.
     """
     print("Loading and preparing data...")
     
     try:
-        # Load the CSV file
-        df = pd.read_csv('../PCOS_infertility.csv')
-        print("Loaded PCOS_infertility.csv")
-        
-        # Rename target column for consistency
-        if 'PCOS (Y/N)' in df.columns:
-            df.rename(columns={'PCOS (Y/N)': 'PCOS'}, inplace=True)
-        
-        # Drop ID columns
-        df = df.drop(columns=['Sl. No', 'Patient File No.'], errors='ignore')
-        
-        # Handle missing values in hormone measurements
-        # 1.99 is a placeholder for missing values in this dataset
-        hormone_cols = ['  I   beta-HCG(mIU/mL)', 'II    beta-HCG(mIU/mL)', 'AMH(ng/mL)']
-        for col in hormone_cols:
-            df[col] = df[col].replace(1.99, np.nan)
-        
-        # Fill missing values with median
-        for col in df.columns:
-            if col != 'PCOS' and df[col].dtype in ['float64', 'int64']:
-                df[col] = df[col].fillna(df[col].median())
+        cache = cache if cache is not None else FrameCache()
+        if not os.path.exists(schema_path):
+            # The schema is saved while preparing the frame, so prepare it again
+            cache.invalidate(PREPARED_FRAME_NAME)
+        key = file_digest(path, salt=f"pcos_early_detection_model:{PREPROCESSING_VERSION}")
+        df = cache.get_or_build(PREPARED_FRAME_NAME, key, lambda: build_prepared_data(path, schema_path))
         
         # Separate features and target
-        X = df.drop(columns=['PCOS'])
-        y = df['PCOS']
+        X = df.drop(columns=[TARGET_COLUMN])
+        y = df[TARGET_COLUMN]
         
         print(f"Data loaded successfully. Features: {X.shape}, Target: {y.shape}")
         return X, y
@@ -57,9 +125,12 @@ def load_and_prepare_data():
         print(f"Error loading data: {e}")
         return None, None
 
-def build_model_pipeline(X):
+def build_model_pipeline(X, memory=None):
     """
     Build a machine learning pipeline for PCOS early detection
+    
+    With memory (a cache directory), fitted preprocessing is cached so
+    candidates sharing a CV fold don't refit it.
     """
     # Identify numeric and categorical columns
     numeric_features = X.select_dtypes(include=['int64', 'float64']).columns
@@ -88,11 +159,142 @@ def build_model_pipeline(X):
     pipeline = Pipeline(steps=[
         ('preprocessor', preprocessor),
         ('classifier', RandomForestClassifier(random_state=42))
-    ])
+    ], memory=memory)
     
     return pipeline
 
-def train_and_evaluate_model(X, y):
+def _warm_start_fold_scores(params, X_train, y_train, X_val, y_val, n_estimators):
+    """
+    Validation F1 of one forest configuration on one fold, for every forest
+    size, growing the forest with warm_start instead of refitting it
+    """
+    forest = RandomForestClassifier(random_state=42, warm_start=True, **params)
+    scores = []
+    for size in n_estimators:
+        forest.set_params(n_estimators=size)
+        forest.fit(X_train, y_train)
+        scores.append(f1_score(y_val, forest.predict(X_val)))
+    return scores
+
+def warm_start_search(pipeline, X_train, y_train, param_grid=PARAM_GRID, cv=CV_FOLDS, n_jobs=-1):
+    """
+    Grid search that fits the preprocessing once per fold and grows each
+    forest configuration from the smallest to the largest n_estimators.
+    
+    Warm-started trees draw the same random seeds as a fresh fit, so every
+    candidate gets the same fold scores as GridSearchCV and the same best
+    parameters are chosen. Returns (best_params, best_score).
+    """
+    n_estimators = sorted(param_grid['classifier__n_estimators'])
+    forest_grid = list(ParameterGrid({
+        name.replace('classifier__', ''): values
+        for name, values in param_grid.items() if name != 'classifier__n_estimators'
+    }))
+    
+    jobs = []
+    for train_index, val_index in StratifiedKFold(n_splits=cv).split(X_train, y_train):
+        preprocessor = clone(pipeline.named_steps['preprocessor'])
+        Xt_train = preprocessor.fit_transform(X_train.iloc[train_index])
+        Xt_val = preprocessor.transform(X_train.iloc[val_index])
+        for params in forest_grid:
+            jobs.append(delayed(_warm_start_fold_scores)(
+                params, Xt_train, y_train.iloc[train_index], Xt_val, y_train.iloc[val_index], n_estimators
+            ))
+    fold_scores = np.array(Parallel(n_jobs=n_jobs)(jobs)).reshape(cv, len(forest_grid), len(n_estimators))
+    mean_scores = fold_scores.mean(axis=0)
+    
+    scores = {}
+    for i, params in enumerate(forest_grid):
+        for j, size in enumerate(n_estimators):
+            candidate = {f'classifier__{name}': value for name, value in params.items()}
+            candidate['classifier__n_estimators'] = size
+            scores[tuple(sorted(candidate.items()))] = mean_scores[i, j]
+    
+    # Pick the first best candidate in GridSearchCV's order
+    candidates = list(ParameterGrid(param_grid))
+    candidate_scores = [scores[tuple(sorted(candidate.items()))] for candidate in candidates]
+    best = int(np.argmax(candidate_scores))
+    return candidates[best], candidate_scores[best]
+
+def search_hyperparameters(X_train, y_train, strategy=SEARCH_STRATEGY, n_jobs=-1):
+    """
+    Tune the detection pipeline with one of SEARCH_STRATEGIES:
+    
+    - grid: exhaustive GridSearchCV over PARAM_GRID
+    - halving: successive halving over PARAM_GRID, giving more trees only
+      to the candidates that survive each round
+    - random: RandomizedSearchCV over PARAM_DISTRIBUTIONS
+    - warm_start: PARAM_GRID, growing forests incrementally
+    
+    Fitted preprocessing is cached per fold in a temporary directory.
+    Returns the best pipeline refitted on the training data, its parameters
+    and its mean CV F1 score.
+    """
+    if strategy not in SEARCH_STRATEGIES:
+        raise ValueError(f"Unknown search strategy '{strategy}'. Available: {', '.join(SEARCH_STRATEGIES)}")
+    
+    cache_dir = tempfile.mkdtemp(prefix='pcos_pipeline_cache_')
+    try:
+        pipeline = build_model_pipeline(X_train, memory=cache_dir)
+        
+        if strategy == 'warm_start':
+            best_params, best_score = warm_start_search(pipeline, X_train, y_train, n_jobs=n_jobs)
+            best_model = pipeline.set_params(**best_params).fit(X_train, y_train)
+        else:
+            if strategy == 'grid':
+                search = GridSearchCV(pipeline, PARAM_GRID, cv=CV_FOLDS, scoring='f1', n_jobs=n_jobs)
+            elif strategy == 'halving':
+                # Forest size is the budget: every candidate starts small and
+                # only the better half is grown further each round
+                n_estimators = PARAM_GRID['classifier__n_estimators']
+                param_grid = {name: values for name, values in PARAM_GRID.items() if name != 'classifier__n_estimators'}
+                search = HalvingGridSearchCV(pipeline, param_grid, cv=CV_FOLDS, scoring='f1', factor=2,
+                                             resource='classifier__n_estimators', min_resources=min(n_estimators) // 2,
+                                             max_resources=max(n_estimators), random_state=42, n_jobs=n_jobs)
+            else:
+                search = RandomizedSearchCV(pipeline, PARAM_DISTRIBUTIONS, n_iter=RANDOM_SEARCH_ITERATIONS,
+                                            cv=CV_FOLDS, scoring='f1', random_state=42, n_jobs=n_jobs)
+            search.fit(X_train, y_train)
+            best_model, best_params, best_score = search.best_estimator_, search.best_params_, search.best_score_
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    
+    # The cache directory is gone; don't save a reference to it with the model
+    best_model.set_params(memory=None)
+    return best_model, best_params, best_score
+
+def peak_memory_mb():
+    """
+    Peak resident memory of this process so far in MB, or None where the
+    resource module is not available
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+def profile_search(X_train, y_train, strategy=SEARCH_STRATEGY, n_jobs=-1):
+    """
+    Run a hyperparameter search and report its wall-clock time and the
+    process's peak resident memory. Memory of worker processes (n_jobs != 1)
+    is not included.
+    """
+    start = time.perf_counter()
+    best_model, best_params, best_score = search_hyperparameters(X_train, y_train, strategy, n_jobs)
+    
+    stats = {
+        'strategy': strategy,
+        'seconds': time.perf_counter() - start,
+        'peak_memory_mb': peak_memory_mb(),
+        'best_params': best_params,
+        'best_score': best_score
+    }
+    memory = f"{stats['peak_memory_mb']:.0f} MB" if stats['peak_memory_mb'] is not None else 'n/a'
+    print(f"Search '{strategy}': {stats['seconds']:.1f} s wall-clock, peak memory {memory}, CV F1 {best_score:.4f}")
+    return best_model, stats
+
+def train_and_evaluate_model(X, y, search_strategy=SEARCH_STRATEGY):
     """
     Train and evaluate the PCOS early detection model
     """
@@ -102,24 +304,13 @@ def train_and_evaluate_model(X, y):
     print(f"Training data shape: {X_train.shape}")
     print(f"Testing data shape: {X_test.shape}")
     
-    # Build the pipeline
-    pipeline = build_model_pipeline(X)
-    
-    # Define hyperparameters for grid search
-    param_grid = {
-        'classifier__n_estimators': [100, 200],
-        'classifier__max_depth': [None, 10, 20],
-        'classifier__min_samples_split': [2, 5]
-    }
-    
-    # Perform grid search
-    print("Performing grid search for hyperparameter tuning...")
-    grid_search = GridSearchCV(pipeline, param_grid, cv=5, scoring='f1', n_jobs=-1)
-    grid_search.fit(X_train, y_train)
+    # Tune hyperparameters
+    print(f"Performing {search_strategy} search for hyperparameter tuning...")
+    best_model, search_stats = profile_search(X_train, y_train, search_strategy)
+    print(f"Best parameters: {search_stats['best_params']}")
     
-    # Get the best model
-    best_model = grid_search.best_estimator_
-    print(f"Best parameters: {grid_search.best_params_}")
+    # Fit probability calibration on out-of-fold predictions
+    calibration = fit_probability_calibration(best_model, X_train, y_train)
     
     # Make predictions
     y_pred = best_model.predict(X_test)
@@ -146,8 +337,8 @@ def train_and_evaluate_model(X, y):
     Confusion Matrix:
     {conf_matrix}
     
-    Best Model Parameters:
-    {grid_search.best_params_}
+    Best Model Parameters ({search_stats['strategy']} search, {search_stats['seconds']:.1f} s):
+    {search_stats['best_params']}
     """
     
     print(results)
@@ -197,14 +388,471 @@ def train_and_evaluate_model(X, y):
         else:
             print(f"Warning: Feature names ({len(feature_names)}) and importances ({len(importances)}) length mismatch")
     
-    return best_model
+    return best_model, calibration
+
+def fit_probability_calibration(model, X_train, y_train, cv=5):
+    """
+    Fit Platt scaling for the model's PCOS probability.
+    
+    Random forest scores are not calibrated probabilities, so a logistic
+    curve is fitted on out-of-fold scores from the best configuration and
+    applied on top of predict_proba at serving time.
+    """
+    print("Fitting probability calibration...")
+    
+    oof_scores = cross_val_predict(clone(model), X_train, y_train, cv=cv, method='predict_proba')[:, 1]
+    calibrator = LogisticRegression(C=1e6)
+    calibrator.fit(oof_scores.reshape(-1, 1), y_train)
+    
+    return {
+        'method': 'sigmoid',
+        'slope': float(calibrator.coef_[0, 0]),
+        'intercept': float(calibrator.intercept_[0])
+    }
+
+def apply_probability_calibration(scores, calibration):
+    """
+    Map raw positive-class scores to calibrated probabilities
+    """
+    if calibration is None:
+        return scores
+    return 1.0 / (1.0 + np.exp(-(calibration['slope'] * scores + calibration['intercept'])))
+
+def compile_model(model):
+    """
+    Flatten a fitted detection pipeline into plain NumPy arrays.
+    
+    The numeric imputer and scaler become per-column fill, mean and scale
+    vectors and the one-hot encoder a list of known categories per column,
+    so a record is encoded as its scaled numbers followed by one category
+    code per categorical column (0 for unknown).
+    
+    All trees of the forest share one set of contiguous node arrays with a
+    root offset per tree. A node picks its next node from branch_table:
+    numeric splits branch on x > threshold, while a run of splits on the
+    one-hot columns of one categorical feature (the forest peels categories
+    off one at a time) is resolved ahead of time into a single lookup by
+    category code. Leaves point back to themselves.
+    """
+    preprocessor = model.named_steps['preprocessor']
+    forest = model.named_steps['classifier']
+    
+    if not isinstance(forest, RandomForestClassifier):
+        raise ValueError("Compiled inference expects a RandomForestClassifier")
+    
+    compiled = {
+        'categorical_columns': np.array([], dtype=str),
+        'categorical_fill': np.array([], dtype=str),
+        'category_values': np.array([], dtype=str),
+        'category_offsets': np.array([0])
+    }
+    for name, transformer, columns in preprocessor.transformers_:
+        if len(columns) == 0 or transformer == 'drop':
+            continue
+        if name == 'num':
+            imputer = transformer.named_steps['imputer']
+            scaler = transformer.named_steps['scaler']
+            compiled['numeric_columns'] = np.array(columns, dtype=str)
+            compiled['numeric_fill'] = imputer.statistics_.astype(np.float64)
+            compiled['numeric_mean'] = scaler.mean_
+            compiled['numeric_scale'] = scaler.scale_
+        elif name == 'cat':
+            imputer = transformer.named_steps['imputer']
+            encoder = transformer.named_steps['onehot']
+            # Categories are looked up by binary search, so they must be the sorted 'auto' ones
+            if encoder.handle_unknown != 'ignore' or encoder.drop is not None or encoder.categories != 'auto':
+                raise ValueError("Compiled inference expects OneHotEncoder(handle_unknown='ignore')")
+            compiled['categorical_columns'] = np.array(columns, dtype=str)
+            compiled['categorical_fill'] = np.array(imputer.statistics_, dtype=str)
+            compiled['category_values'] = np.concatenate([np.array(c, dtype=str) for c in encoder.categories_])
+            compiled['category_offsets'] = np.cumsum([0] + [len(c) for c in encoder.categories_])
+        else:
+            raise ValueError(f"Unexpected preprocessing step '{name}'")
+    
+    # Numeric features come first in the transformed matrix, then one-hot columns
+    if 'numeric_columns' not in compiled or list(preprocessor.transformers_[0][2]) != list(compiled['numeric_columns']):
+        raise ValueError("Compiled inference expects the numeric features first")
+    n_numeric = len(compiled['numeric_columns'])
+    category_offsets = compiled['category_offsets']
+    n_categories = np.diff(category_offsets)
+    
+    # Categorical feature and category code behind every one-hot column
+    n_transformed = n_numeric + category_offsets[-1]
+    onehot_feature = np.full(n_transformed, -1)
+    onehot_code = np.zeros(n_transformed, dtype=np.intp)
+    for c, (start, end) in enumerate(zip(category_offsets[:-1], category_offsets[1:])):
+        onehot_feature[n_numeric + start:n_numeric + end] = c
+        onehot_code[n_numeric + start:n_numeric + end] = np.arange(1, end - start + 1)
+    
+    trees = [estimator.tree_ for estimator in forest.estimators_]
+    node_counts = np.array([tree.node_count for tree in trees])
+    roots = np.concatenate([[0], np.cumsum(node_counts)[:-1]])
+    
+    left = np.concatenate([tree.children_left + root for tree, root in zip(trees, roots)])
+    right = np.concatenate([tree.children_right + root for tree, root in zip(trees, roots)])
+    feature = np.concatenate([tree.feature for tree in trees])
+    threshold = np.concatenate([tree.threshold for tree in trees])
+    is_leaf = np.concatenate([tree.children_left == -1 for tree in trees])
+    nodes = np.arange(len(feature))
+    internal = nodes[~is_leaf]
+    
+    # Categorical feature tested by each node (-1 for numeric splits and leaves)
+    tested = np.full(len(feature), -1)
+    tested[internal] = onehot_feature[feature[internal]]
+    parent = np.full(len(feature), -1)
+    parent[left[internal]] = internal
+    parent[right[internal]] = internal
+    parent_tested = np.where(parent >= 0, tested[np.maximum(parent, 0)], -1)
+    numeric_split = ~is_leaf & (tested < 0)
+    # A run of categorical splits is entered from a node testing something else
+    run_entry = (tested >= 0) & (parent_tested != tested)
+    
+    # Leaves and nodes inside a run (never visited) branch to themselves
+    widths = np.ones(len(feature), dtype=np.intp)
+    widths[numeric_split] = 2
+    widths[run_entry] = n_categories[tested[run_entry]] + 1
+    table_offset = np.concatenate([[0], np.cumsum(widths)[:-1]])
+    branch_table = np.repeat(nodes, widths)
+    branch_table[table_offset[numeric_split] + 1] = right[numeric_split]
+    branch_table[table_offset[numeric_split]] = left[numeric_split]
+    
+    # Follow each run for every category code of its feature, making the
+    # same comparisons the trees make on the 0/1 one-hot values
+    for c in range(len(n_categories)):
+        entries = nodes[run_entry & (tested == c)]
+        codes = np.arange(n_categories[c] + 1)
+        current = np.repeat(entries[:, np.newaxis], len(codes), axis=1)
+        while True:
+            in_run = tested[current] == c
+            if not in_run.any():
+                break
+            run_nodes = current[in_run]
+            onehot_value = (onehot_code[feature[run_nodes]] == np.broadcast_to(codes, current.shape)[in_run]).astype(np.float32)
+            current[in_run] = np.where(onehot_value > threshold[run_nodes], right[run_nodes], left[run_nodes])
+        branch_table[table_offset[entries][:, np.newaxis] + codes] = current
+    
+    node_feature = np.zeros(len(feature), dtype=np.intp)
+    node_feature[numeric_split] = feature[numeric_split]
+    node_feature[run_entry] = n_numeric + tested[run_entry]
+    node_threshold = np.where(numeric_split, threshold, np.inf)
+    
+    compiled.update({
+        'classes': forest.classes_,
+        'roots': roots,
+        'node_feature': node_feature,
+        'node_threshold': node_threshold,
+        # 1 where the branch is the category code itself
+        'node_switch': run_entry.astype(np.float32),
+        'node_table_offset': table_offset,
+        'branch_table': branch_table,
+        'is_leaf': is_leaf,
+        # Tree leaves already hold class fractions, which predict_proba averages
+        'value': np.ascontiguousarray(np.concatenate([tree.value[:, 0, :] for tree in trees])),
+        'max_depth': np.array(max(tree.max_depth for tree in trees))
+    })
+    return compiled
+
+def transform_compiled(compiled, X):
+    """
+    Apply the compiled imputers and scaler to a feature frame and encode
+    categories as codes, giving the float32 matrix the trees are walked on.
+    
+    Raises the ValueError the pipeline raises for infinite values and for
+    values too large for float32: the walk would turn them into garbage
+    branch indices.
+    """
+    numeric_columns = compiled['numeric_columns']
+    categorical_columns = compiled['categorical_columns']
+    n_numeric = len(numeric_columns)
+    inputs = np.zeros((len(X), n_numeric + len(categorical_columns)), dtype=np.float32)
+    
+    # Column by column: selecting a sub-frame costs more than a small batch's whole walk
+    numeric = np.column_stack([X[column].to_numpy(dtype=np.float64) for column in numeric_columns])
+    if np.isinf(numeric).any():
+        raise ValueError("Input X contains infinity or a value too large for dtype('float64').")
+    numeric = np.where(np.isnan(numeric), compiled['numeric_fill'], numeric)
+    with np.errstate(over='ignore'):
+        inputs[:, :n_numeric] = (numeric - compiled['numeric_mean']) / compiled['numeric_scale']
+    if not np.isfinite(inputs[:, :n_numeric]).all():
+        raise ValueError("Input X contains infinity or a value too large for dtype('float32').")
+    
+    offsets = compiled['category_offsets']
+    for c, column in enumerate(categorical_columns):
+        # A copy: for object columns to_numpy is a read-only view of the frame
+        values = X[column].to_numpy(dtype=object, copy=True)
+        values[pd.isna(values)] = compiled['categorical_fill'][c]
+        values = values.astype(str)
+        # OneHotEncoder categories are sorted; unknown values keep code 0,
+        # like an all-zero one-hot row
+        categories = compiled['category_values'][offsets[c]:offsets[c + 1]]
+        positions = np.minimum(np.searchsorted(categories, values), len(categories) - 1)
+        inputs[:, n_numeric + c] = np.where(categories[positions] == values, positions + 1, 0)
+    
+    return inputs
 
-def save_model(model):
+def compiled_predict_proba(compiled, X):
     """
-    Save the trained model to disk
+    Class probabilities from a compiled model, identical to the pipeline's
+    predict_proba.
+    
+    All trees are walked together for the whole batch, one step per tree
+    level, dropping (row, tree) pairs as they reach a leaf; then the leaf
+    probabilities are summed in tree order and averaged as the forest does.
+    """
+    inputs = transform_compiled(compiled, X)
+    n_samples, n_inputs = inputs.shape
+    flat_inputs = inputs.ravel()
+    
+    node_feature = compiled['node_feature']
+    node_threshold = compiled['node_threshold']
+    node_switch = compiled['node_switch']
+    node_table_offset = compiled['node_table_offset']
+    branch_table = compiled['branch_table']
+    is_leaf = compiled['is_leaf']
+    n_trees = len(compiled['roots'])
+    
+    # One entry per (row, tree) pair, row-major
+    nodes = np.tile(compiled['roots'], n_samples)
+    active = np.arange(len(nodes))
+    current = nodes.copy()
+    row_offsets = (active // n_trees) * n_inputs
+    
+    for _ in range(int(compiled['max_depth'])):
+        if len(active) == 0:
+            break
+        x = flat_inputs[row_offsets + node_feature[current]]
+        # 0/1 for numeric splits, the category code for categorical runs
+        branch = (x > node_threshold[current]) + (x * node_switch[current]).astype(np.intp)
+        current = branch_table[node_table_offset[current] + branch]
+        
+        # Leaves loop to themselves, so finished pairs are only dropped once
+        # enough of them have piled up to pay for the copy
+        done = is_leaf[current]
+        finished = np.count_nonzero(done)
+        if finished == len(active) or finished > len(active) // 4:
+            nodes[active] = current
+            remaining = np.flatnonzero(~done)
+            active, current, row_offsets = active[remaining], current[remaining], row_offsets[remaining]
+    
+    # Sum the leaf probabilities tree after tree, like predict_proba's
+    # accumulation, then average
+    proba = np.cumsum(compiled['value'][nodes.reshape(n_samples, n_trees).T], axis=0)[-1]
+    proba /= n_trees
+    return proba
+
+def verify_compiled_parity(model, compiled, X):
+    """
+    Check that the compiled model reproduces the pipeline's probabilities
+    exactly, for the whole batch and row by row
+    """
+    print("Verifying compiled model against the pipeline...")
+    
+    batch_match = np.array_equal(compiled_predict_proba(compiled, X), model.predict_proba(X))
+    sample = X.sample(min(len(X), 50), random_state=0)
+    row_matches = sum(
+        np.array_equal(compiled_predict_proba(compiled, sample.iloc[[i]]), model.predict_proba(sample.iloc[[i]]))
+        for i in range(len(sample))
+    )
+    
+    print(f"Compiled parity: batch {'matches' if batch_match else 'differs'}, {row_matches}/{len(sample)} single rows match")
+    return batch_match and row_matches == len(sample)
+
+def load_compiled_model(model_digest, path=COMPILED_MODEL_PATH):
+    """
+    Load the compiled model that save_model exported for the model file with
+    the given file_digest, or None when there is none. It was checked
+    against the pipeline with verify_compiled_parity before it was saved.
+    """
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        compiled = {name: data[name] for name in data.files}
+    
+    if str(compiled.pop('model_digest', '')) != model_digest:
+        raise ValueError(f"{path} was not compiled from the current {MODEL_OUTPUT_PATH}; retrain the model")
+    return compiled
+
+def save_model(model, calibration=None, compiled=None):
+    """
+    Save the trained model to disk. The compiled model and the calibration
+    are stamped with the digest of the model file, so they are never served
+    with another model.
     """
     joblib.dump(model, MODEL_OUTPUT_PATH)
     print(f"Model saved to {MODEL_OUTPUT_PATH}")
+    model_digest = file_digest(MODEL_OUTPUT_PATH)
+    
+    if compiled is not None:
+        np.savez(COMPILED_MODEL_PATH, model_digest=model_digest, **compiled)
+        print(f"Compiled model saved to {COMPILED_MODEL_PATH}")
+    elif os.path.exists(COMPILED_MODEL_PATH):
+        # Don't leave the compiled version of an older model behind
+        os.remove(COMPILED_MODEL_PATH)
+    
+    if calibration is not None:
+        with open(CALIBRATION_PATH, 'w') as f:
+            json.dump({**calibration, 'model_digest': model_digest}, f, indent=2)
+        print(f"Probability calibration saved to {CALIBRATION_PATH}")
+    elif os.path.exists(CALIBRATION_PATH):
+        os.remove(CALIBRATION_PATH)
+
+def iter_prepared_chunks(path, schema, chunk_rows=CHUNK_ROWS, test_fraction=CHUNKED_TEST_FRACTION):
+    """
+    Stream the raw dataset in chunks of chunk_rows rows, reading only the
+    schema's columns, and yield each chunk transformed with the feature
+    schema and split into (X_train, y_train, X_test, y_test).
+    
+    A row is held out by a hash of its position in the file, so it lands on
+    the same side of the split in every pass and for any chunk size.
+    """
+    raw_columns = [raw for raw, column in schema.column_mapping.items() if column in schema.columns]
+    start = 0
+    for chunk in pd.read_csv(path, usecols=raw_columns, chunksize=chunk_rows):
+        df = schema.transform(chunk)
+        positions = np.arange(start, start + len(df), dtype=np.uint64)
+        is_test = pd.util.hash_array(positions) / 2.0 ** 64 < test_fraction
+        start += len(df)
+        
+        X = df[schema.features]
+        y = df[schema.target].to_numpy()
+        yield X[~is_test], y[~is_test], X[is_test], y[is_test]
+
+def binned_roc_auc(positive_counts, negative_counts):
+    """
+    ROC AUC from histograms of the positive and negative rows' scores over
+    the same ascending bins; pairs within one bin count as ties
+    """
+    positives, negatives = positive_counts.sum(), negative_counts.sum()
+    if positives == 0 or negatives == 0:
+        return float('nan')
+    negatives_below = np.cumsum(negative_counts) - negative_counts
+    return float((positive_counts * (negatives_below + 0.5 * negative_counts)).sum() / (positives * negatives))
+
+def train_chunked_model(path=DATASET_PATH, chunk_rows=CHUNK_ROWS, epochs=CHUNKED_EPOCHS,
+                        schema_path=CHUNKED_FEATURE_SCHEMA_PATH):
+    """
+    Train a detection model without loading the dataset into memory.
+    
+    The feature schema is fitted on the first SCHEMA_SAMPLE_ROWS rows, so
+    its fill values are sample medians. The file is then streamed in
+    chunks: one pass fits a StandardScaler with partial_fit, epochs passes
+    train a logistic-loss SGDClassifier with partial_fit on the shuffled
+    training rows of each chunk, and a last pass scores the held-out rows
+    into a confusion matrix and binned score histograms (see
+    CHUNKED_AUC_BINS). Memory is bounded by the chunk size, not the
+    dataset size.
+    
+    Returns the scaler and classifier as a fitted Pipeline, and stats with
+    the evaluation metrics, the throughput of a training pass in training
+    rows/s (held-out rows are not trained on, so they are not counted),
+    the total wall-clock time and the process's peak resident memory.
+    """
+    print(f"Training out of core on {os.path.basename(path)} in chunks of {chunk_rows} rows...")
+    start = time.perf_counter()
+    
+    schema = fit_feature_schema(pd.read_csv(path, nrows=SCHEMA_SAMPLE_ROWS))
+    schema.save(schema_path)
+    print(f"Feature schema fitted on the first {SCHEMA_SAMPLE_ROWS} rows and saved to {schema_path}")
+    
+    scaler = StandardScaler()
+    classifier = SGDClassifier(loss='log_loss', random_state=42)
+    rng = np.random.default_rng(42)
+    n_rows = 0
+    n_train_rows = 0
+    
+    # Feature means and variances over the training rows
+    for X_train, _, X_test, _ in iter_prepared_chunks(path, schema, chunk_rows):
+        scaler.partial_fit(X_train)
+        n_rows += len(X_train) + len(X_test)
+        n_train_rows += len(X_train)
+    
+    train_start = time.perf_counter()
+    for epoch in range(epochs):
+        for X_train, y_train, _, _ in iter_prepared_chunks(path, schema, chunk_rows):
+            if len(X_train) == 0:
+                continue
+            order = rng.permutation(len(X_train))
+            classifier.partial_fit(scaler.transform(X_train)[order], y_train[order], classes=np.array([0, 1]))
+        print(f"Epoch {epoch + 1}/{epochs} done, {n_train_rows * (epoch + 1) / (time.perf_counter() - train_start):,.0f} training rows/s")
+    rows_per_second = n_train_rows * epochs / (time.perf_counter() - train_start) if epochs else float('nan')
+    
+    model = Pipeline(steps=[
+        ('scaler', scaler),
+        ('classifier', classifier)
+    ])
+    
+    # Score the held-out rows into fixed-size counts: the confusion matrix
+    # ([[tn, fp], [fn, tp]]) and a histogram of log-odds per class
+    confusion = np.zeros((2, 2), dtype=np.int64)
+    score_counts = np.zeros((2, CHUNKED_AUC_BINS), dtype=np.int64)
+    for _, _, X_test, y_chunk in iter_prepared_chunks(path, schema, chunk_rows):
+        if len(X_test) == 0:
+            continue
+        # Log-odds of PCOS: the probability is at least 0.5 from 0 on
+        log_odds = model.decision_function(X_test)
+        y_pred = (log_odds >= 0).astype(int)
+        confusion += np.bincount(y_chunk * 2 + y_pred, minlength=4).reshape(2, 2)
+        bins = np.clip((log_odds + CHUNKED_AUC_LOG_ODDS) * (CHUNKED_AUC_BINS / (2 * CHUNKED_AUC_LOG_ODDS)),
+                       0, CHUNKED_AUC_BINS - 1).astype(np.int64)
+        for label in (0, 1):
+            score_counts[label] += np.bincount(bins[y_chunk == label], minlength=CHUNKED_AUC_BINS)
+    (tn, fp), (fn, tp) = confusion
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    
+    seconds = time.perf_counter() - start
+    stats = {
+        'rows': n_rows,
+        'train_rows': n_train_rows,
+        'test_rows': int(confusion.sum()),
+        'chunk_rows': chunk_rows,
+        'epochs': epochs,
+        'seconds': seconds,
+        'rows_per_second': rows_per_second,
+        'peak_memory_mb': peak_memory_mb(),
+        'accuracy': (tn + tp) / confusion.sum() if confusion.sum() else float('nan'),
+        'precision': precision,
+        'recall': recall,
+        'f1': 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+        'roc_auc': binned_roc_auc(score_counts[1], score_counts[0]),
+        'confusion_matrix': confusion
+    }
+    memory = f"{stats['peak_memory_mb']:.0f} MB" if stats['peak_memory_mb'] is not None else 'n/a'
+    print(f"Chunked training: {n_rows} rows ({n_train_rows} trained on), {seconds:.1f} s wall-clock, "
+          f"{stats['rows_per_second']:,.0f} training rows/s per pass, peak memory {memory}")
+    return model, stats
+
+def run_chunked_training(path=DATASET_PATH, chunk_rows=CHUNK_ROWS):
+    """
+    Train the out-of-core detection model, then save it and its evaluation results
+    """
+    model, stats = train_chunked_model(path, chunk_rows)
+    memory = f"{stats['peak_memory_mb']:.0f} MB" if stats['peak_memory_mb'] is not None else 'n/a'
+    
+    results = f"""
+    PCOS Early Detection Model Evaluation Results (chunked SGD):
+    -----------------------------------------------------------
+    Accuracy: {stats['accuracy']:.4f}
+    Precision: {stats['precision']:.4f}
+    Recall: {stats['recall']:.4f}
+    F1 Score: {stats['f1']:.4f}
+    ROC AUC: {stats['roc_auc']:.4f}
+    
+    Confusion Matrix:
+    {stats['confusion_matrix']}
+    
+    Training: {stats['rows']} rows ({stats['test_rows']} held out) in chunks of {stats['chunk_rows']}, {stats['epochs']} epochs
+    {stats['seconds']:.1f} s, {stats['rows_per_second']:,.0f} training rows/s per pass, peak memory {memory}
+    """
+    
+    print(results)
+    
+    with open(CHUNKED_RESULTS_PATH, 'w') as f:
+        f.write(results)
+    
+    joblib.dump(model, CHUNKED_MODEL_OUTPUT_PATH)
+    print(f"Model saved to {CHUNKED_MODEL_OUTPUT_PATH}")
+    return model, stats
 
 def main():
     """
@@ -212,17 +860,30 @@ def main():
     """
     print("Starting PCOS Early Detection Model Development")
     
+    # 'chunked' trains out of core on the dataset given next (or the default one)
+    if len(sys.argv) > 1 and sys.argv[1] == 'chunked':
+        run_chunked_training(sys.argv[2] if len(sys.argv) > 2 else DATASET_PATH)
+        print("PCOS Early Detection Model Development Complete")
+        return
+    
     # Load and prepare data
     X, y = load_and_prepare_data()
     if X is None or y is None:
         print("Failed to load or prepare data. Exiting.")
         return
     
-    # Train and evaluate model
-    model = train_and_evaluate_model(X, y)
+    # Train and evaluate model, with the search strategy optionally given on the command line
+    search_strategy = sys.argv[1] if len(sys.argv) > 1 else SEARCH_STRATEGY
+    model, calibration = train_and_evaluate_model(X, y, search_strategy)
+    
+    # Export the flat array version of the model for fast inference
+    compiled = compile_model(model)
+    if not verify_compiled_parity(model, compiled, X):
+        print("Warning: compiled model does not match the pipeline; not exporting it")
+        compiled = None
     
     # Save the model
-    save_model(model)
+    save_model(model, calibration, compiled)
     
     print("PCOS Early Detection Model Development Complete")
 
@@ -5,6 +5,9 @@ from sklearn.ensemble import RandomForestClassifier
 from joblib import dump
 import os
 
+from feature_schema import FeatureSchema
+from frame_cache import FrameCache, file_digest
+
 # %% [markdown]
 # # Configuration and File Paths
 # Defines the input and output file paths for the datasets and generated files.
@@ -22,91 +25,118 @@ TRAIN_DATA_PATH = 'pcos_train_data.csv'
 TEST_DATA_PATH = 'pcos_test_data.csv'
 SELECTED_FEATURES_PATH = 'selected_features.txt'
 
+# Version of clean_data and feature_engineering_and_eda: part of the cache
+# key of the engineered frame, so bump it whenever either changes
+PREPROCESSING_VERSION = 3
+ENGINEERED_FRAME_NAME = 'pcos_engineered'
+
+# Preprocessing rules, in normalized column names (see normalize_column_name)
+TARGET_COLUMN = 'PCOS'
+TARGET_RENAMES = {'PCOS_YN': TARGET_COLUMN}
+ID_COLUMNS = ['Sl_No', 'Patient_File_No']
+# Known missing value indicators: 1.99 in the hormone measurements, BMI=0
+SENTINEL_VALUES = {
+    **{col: [1.99] for col in ['I_betaHCGmIUmL', 'II_betaHCGmIUmL', 'AMHngmL', 'FSHmIUmL', 'LHmIUmL',
+                               'FSHLH', 'TSH_mIUL', 'PRLngmL', 'Vit_D3_ngmL', 'PRGngmL']},
+    'BMI': [0]
+}
+# Composite features: total follicle count (PCOM indicator) and average follicle size
+ENGINEERED_FEATURES = {
+    'Follicle_No_Total': {'operation': 'sum', 'columns': ['Follicle_No_L', 'Follicle_No_R']},
+    'Avg_F_size_Mean': {'operation': 'mean', 'columns': ['Avg_F_size_L_mm', 'Avg_F_size_R_mm']}
+}
+# Nominal (not 0/1 binary) features, encoded as text
+CATEGORICAL_COLUMNS = ['Blood_Group']
+
+# Imputation: median for continuous variables, mode for categorical/binary features
+MEDIAN_IMPUTATION_COLUMNS = [
+    'Age_yrs', 'Weight_Kg', 'HeightCm', 'BMI', 'Pulse_ratebpm', 'RR_breathsmin',
+    'Hb_gdl', 'Cycle_lengthdays', 'Marraige_Status_Yrs', 'I_betaHCGmIUmL',
+    'II_betaHCGmIUmL', 'FSHmIUmL', 'LHmIUmL', 'FSHLH', 'TSH_mIUL', 'AMHngmL', 
+    'PRLngmL', 'Vit_D3_ngmL', 'PRGngmL', 'RBSmgdl', 'BP_Systolic_mmHg', 
+    'BP_Diastolic_mmHg', 'Follicle_No_L', 'Follicle_No_R', 
+    'Avg_F_size_L_mm', 'Avg_F_size_R_mm', 'Endometrium_mm'
+]
+MODE_IMPUTATION_COLUMNS = ['Blood_Group', 'Cycle_RI', 'PregnantYN', 'Weight_gainYN', 
+                           'hair_growthYN', 'Skin_darkening_YN', 'Hair_lossYN', 
+                           'PimplesYN', 'Fast_food_YN', 'Reg_ExerciseYN']
+
 # %% [markdown]
 # # 1. Data Cleaning and Missing Value Imputation
 # Standardizes column names, handles known missing value indicators (like 1.99), 
 # and imputes remaining NaNs using median (for continuous) or mode (for categorical).
 
 # %%
-def clean_data(df):
+def fit_feature_schema(df):
+    """
+    Fits the feature schema of a raw PCOS dataset: normalized column names,
+    explicit dtypes, sentinel rules and the median/mode fill values, computed
+    in one pass each. The schema is shared by this pipeline, the detection
+    model trainer and serving, so they all preprocess records the same way.
+    """
+    return FeatureSchema.fit(
+        df,
+        target=TARGET_COLUMN,
+        renames=TARGET_RENAMES,
+        drop_columns=ID_COLUMNS,
+        sentinels=SENTINEL_VALUES,
+        median_columns=MEDIAN_IMPUTATION_COLUMNS,
+        mode_columns=MODE_IMPUTATION_COLUMNS,
+        engineered_features=ENGINEERED_FEATURES,
+        categorical_columns=CATEGORICAL_COLUMNS
+    )
+
+def clean_data(df, schema=None):
     """
     Cleans the PCOS dataset by standardizing column names, handling missing 
     values, and ensuring correct data types.
+    
+    The rules come from the feature schema: a saved one when given (e.g. at
+    inference), else one fitted on this data. Returns the cleaned data and
+    the schema.
     """
     print("--- Starting Data Cleaning ---")
     
-    # Standardize Column Names
-    df.columns = df.columns.str.strip()
-    df.columns = df.columns.str.replace(r'[^\w\s]', '', regex=True)
-    df.columns = df.columns.str.replace(r'\s+', '_', regex=True)
-    df.rename(columns={'PCOS_YN': 'PCOS'}, inplace=True)
-
-    # Handle known data peculiarities (1.99 as NaN, BMI=0 as NaN)
-    cols_to_check = [
-        'I_betaHCGmIUmL', 'II_betaHCGmIUmL', 'AMHngmL', 'FSHmIUmL', 'LHmIUmL', 
-        'FSHLH', 'TSHmIUL', 'PRLngmL', 'Vit_D3_ngmL', 'PRGngmL'
-    ]
-    df[cols_to_check] = df[cols_to_check].replace(1.99, np.nan)
-    df['BMI'] = df['BMI'].replace(0, np.nan) 
+    if schema is None:
+        schema = fit_feature_schema(df)
+    
+    # Standardize column names, drop irrelevant columns, make every column numeric and
+    # handle known data peculiarities (1.99 as NaN, BMI=0 as NaN)
+    df = schema.prepare(df)
 
     # Handle Missing Values (Imputation)
-    print(f"Initial missing value count:\n{df.isnull().sum()[df.isnull().sum() > 0]}")
-
-    # Median imputation for continuous variables
-    imputation_cols_median = [
-        'Age_yrs', 'Weight_Kg', 'HeightCm', 'BMI', 'Pulse_ratebpm', 'RR_breathsmin',
-        'Hb_gdl', 'Cycle_lengthdays', 'Marraige_Status_Yrs', 'I_betaHCGmIUmL',
-        'II_betaHCGmIUmL', 'FSHmIUmL', 'LHmIUmL', 'FSHLH', 'TSHmIUL', 'AMHngmL', 
-        'PRLngmL', 'Vit_D3_ngmL', 'PRGngmL', 'RBSmgdl', 'BP_Systolic_mmHg', 
-        'BP_Diastolic_mmHg', 'Follicle_No_L', 'Follicle_No_R', 
-        'Avg_F_size_L_mm', 'Avg_F_size_R_mm', 'Endometrium_mm'
-    ]
-    for col in imputation_cols_median:
-        if col in df.columns:
-            df[col].fillna(df[col].median(), inplace=True)
-
-    # Mode imputation for categorical/binary features
-    categorical_cols_mode = ['Blood_Group', 'Cycle_RI', 'PregnantYN', 'Weight_gainYN', 
-                        'hair_growthYN', 'Skin_darkening_YN', 'Hair_lossYN', 
-                        'PimplesYN', 'Fast_food_YN', 'Reg_ExerciseYN']
-    for col in categorical_cols_mode:
-        if col in df.columns:
-            df[col].fillna(df[col].mode()[0], inplace=True)
-            
-    # Drop Irrelevant Columns
-    cols_to_drop = ['Sl_No', 'Patient_File_No'] 
-    df.drop(columns=cols_to_drop, inplace=True, errors='ignore')
+    missing = df.isnull().sum()
+    print(f"Initial missing value count:\n{missing[missing > 0]}")
+
+    # Median imputation for continuous variables, mode imputation for categorical/binary features
+    df = schema.fill_missing(df)
     
     # Type conversion
-    df['PCOS'] = df['PCOS'].astype(int)
+    df[TARGET_COLUMN] = df[TARGET_COLUMN].astype(int)
 
-    print(f"\nMissing value count after cleaning:\n{df.isnull().sum()[df.isnull().sum() > 0]}")
+    missing = df.isnull().sum()
+    print(f"\nMissing value count after cleaning:\n{missing[missing > 0]}")
     print(f"\nCleaned data shape: {df.shape}")
     print("--- Data Cleaning Complete ---")
-    return df
+    return df, schema
 
 # %% [markdown]
 # # 2. Feature Engineering and Exploratory Data Analysis (EDA)
 # Creates composite features and calculates correlation with the target variable (`PCOS`).
 
 # %%
-def feature_engineering_and_eda(X, y):
+def feature_engineering_and_eda(X, y, schema):
     """
     Performs feature engineering and prints feature correlation for EDA.
     Returns the dataframe with new engineered features.
     """
     print("\n--- Feature Engineering ---")
     
-    # 1. Create Total Follicle Count (PCOM indicator)
-    X['Follicle_No_Total'] = X['Follicle_No_L'] + X['Follicle_No_R']
-    
-    # 2. Create Average Follicle Size
-    X['Avg_F_size_Mean'] = (X['Avg_F_size_L_mm'] + X['Avg_F_size_R_mm']) / 2
-    
-    # Prepare 'Blood_Group' for later encoding (It's not 0/1 binary)
-    X['Blood_Group'] = X['Blood_Group'].astype(str) 
+    # Create the schema's composite features (total follicle count, average follicle size)
+    # and prepare 'Blood_Group' for later encoding (It's not 0/1 binary)
+    X = schema.engineer(X)
 
-    print("New features created: 'Follicle_No_Total', 'Avg_F_size_Mean'")
+    print(f"New features created: {', '.join(repr(name) for name in schema.engineered_features)}")
 
     # --- EDA: Correlation Check ---
     print("\n--- Exploratory Data Analysis: Correlation with PCOS ---")
@@ -125,6 +155,37 @@ def feature_engineering_and_eda(X, y):
     
     return X
 
+# %% [markdown]
+# # Cached Preprocessing
+# Cleaning and feature engineering depend only on the raw dataset, so the engineered frame
+# is cached in columnar form under a hash of the dataset's contents. A rerun on unchanged
+# input memory-maps the cached frame and skips both steps.
+
+# %%
+def build_engineered_data(path=DATASET_PATH):
+    """
+    Load, clean and engineer the raw dataset into one frame, target included
+    """
+    df = pd.read_csv(path)
+    print(f"Successfully loaded dataset from: {path}")
+    print(f"Original shape: {df.shape}")
+
+    cleaned_df, schema = clean_data(df)
+    y = cleaned_df[TARGET_COLUMN]
+    X_engineered = feature_engineering_and_eda(cleaned_df.drop(columns=[TARGET_COLUMN]), y, schema)
+    X_engineered[TARGET_COLUMN] = y
+    return X_engineered
+
+def load_engineered_data(path=DATASET_PATH, cache=None):
+    """
+    The engineered features (X) and target (y) of the dataset at path, from
+    the frame cache when the dataset is unchanged
+    """
+    cache = cache if cache is not None else FrameCache()
+    key = file_digest(path, salt=f"pcos_ml_pipeline:{PREPROCESSING_VERSION}")
+    df = cache.get_or_build(ENGINEERED_FRAME_NAME, key, lambda: build_engineered_data(path))
+    return df.drop(columns=[TARGET_COLUMN]), df[TARGET_COLUMN]
+
 # %% [markdown]
 # # 3. Feature Selection
 # Uses a Random Forest Classifier to determine feature importance and selects the top features.
@@ -203,20 +264,8 @@ def split_data(df, target_col='PCOS', test_size=0.2, random_state=42):
 # %%
 if __name__ == '__main__':
     try:
-        # 1. Load the primary dataset
-        df = pd.read_csv(DATASET_PATH)
-        print(f"Successfully loaded dataset from: {DATASET_PATH}")
-        print(f"Original shape: {df.shape}")
-
-        # 2. Clean the data
-        cleaned_df = clean_data(df.copy())
-        
-        # 3. Separate features (X) and target (y)
-        X_full = cleaned_df.drop(columns=['PCOS'])
-        y = cleaned_df['PCOS']
-
-        # 4. Feature Engineering and EDA
-        X_engineered = feature_engineering_and_eda(X_full, y)
+        # 1-4. Load, clean and engineer the primary dataset (cached while it is unchanged)
+        X_engineered, y = load_engineered_data(DATASET_PATH)
         
         # 5. Feature Selection
         selected_features = select_features_by_importance(X_engineered, y)
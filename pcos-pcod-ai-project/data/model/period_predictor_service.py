@@ -0,0 +1,193 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from period_tracking_model import NOT_ENOUGH_CYCLES_MESSAGE, PeriodTrackingModel, cycle_history_digest
+
+# Threads forecasting users concurrently in predict_many
+PREDICTOR_WORKERS = int(os.environ.get('PERIOD_PREDICTOR_WORKERS', 4))
+
+# Most users whose fits are kept (least recently used evicted first), and
+# seconds a fit is kept after it was last used
+STATE_MAX_USERS = int(os.environ.get('PERIOD_STATE_MAX_USERS', 100000))
+STATE_TTL = float(os.environ.get('PERIOD_STATE_TTL', 86400.0))
+
+class PeriodPredictorService:
+    """
+    Serves period predictions for any number of users from one process.
+
+    The PeriodTrackingModel is only used for its stateless fit_user and
+    predict_fitted, so concurrent requests never see another user's fit.
+    Each user's FittedCycles is kept in a keyed store together with the
+    digest of the history it was fitted on. Entries are immutable and are
+    replaced whole. The store keeps at most max_users users, evicting the
+    least recently used, and drops a fit ttl seconds after its last use. A
+    history that differs from the stored one is refitted on the next
+    prediction. predict_many forecasts a batch of users on a pool of worker
+    threads.
+
+    User ids are opaque, hashable keys; callers that serve more than one
+    client must scope them (the HTTP API pairs them with a state token).
+    The store lives in this process's memory.
+    """
+    def __init__(self, model=None, max_workers=PREDICTOR_WORKERS, max_users=STATE_MAX_USERS, ttl=STATE_TTL):
+        self.model = model if model is not None else PeriodTrackingModel()
+        self.max_workers = max_workers
+        self.max_users = max_users
+        self.ttl = ttl
+
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+        self._pool = None
+        self._pool_pid = None
+
+    def fit(self, user_id, user_cycles):
+        """
+        Fit and store a user's cycle history; returns the FittedCycles, or
+        None when there are too few cycles
+        """
+        fitted = self.model.fit_user(user_cycles)
+        if fitted is None:
+            return None
+
+        with self._lock:
+            self._states[user_id] = (time.monotonic() + self.ttl, cycle_history_digest(user_cycles), fitted)
+            self._states.move_to_end(user_id)
+            while len(self._states) > self.max_users:
+                evicted, _ = self._states.popitem(last=False)
+                self.evictions += 1
+                if self.model.cache is not None:
+                    self.model.cache.invalidate(evicted)
+        if self.model.cache is not None:
+            self.model.cache.invalidate(user_id)
+        return fitted
+
+    def _get_entry(self, user_id):
+        """
+        The stored (digest, FittedCycles) of a user, or None when it is
+        missing or expired; a hit counts as a use
+        """
+        with self._lock:
+            entry = self._states.get(user_id)
+            if entry is None:
+                return None
+            if time.monotonic() >= entry[0]:
+                del self._states[user_id]
+                self.expirations += 1
+                return None
+            self._states[user_id] = (time.monotonic() + self.ttl,) + entry[1:]
+            self._states.move_to_end(user_id)
+            return entry[1:]
+
+    def get_fitted(self, user_id):
+        """
+        The stored FittedCycles of a user, or None
+        """
+        entry = self._get_entry(user_id)
+        return entry[1] if entry is not None else None
+
+    def forget(self, user_id):
+        """
+        Drop a user's stored fit and cached forecasts
+        """
+        with self._lock:
+            self._states.pop(user_id, None)
+        if self.model.cache is not None:
+            self.model.cache.invalidate(user_id)
+
+    def predict(self, user_id, user_cycles=None, n_cycles=3, response_mode='full'):
+        """
+        Predict a user's next n cycles from their stored fit, shaped by one
+        of the model's RESPONSE_MODES. When user_cycles is given and differs
+        from the stored history it is fitted and stored first. Without a
+        user_id the history is only predicted, not stored.
+        """
+        if user_id is None:
+            if user_cycles is None:
+                raise ValueError("Predicting needs a user id or cycle data")
+            return self.model.predict(user_cycles, n_cycles, response_mode=response_mode)
+
+        entry = self._get_entry(user_id)
+        if user_cycles is not None:
+            digest = cycle_history_digest(user_cycles)
+            if entry is None or entry[0] != digest:
+                fitted = self.fit(user_id, user_cycles)
+                if fitted is None:
+                    return {
+                        'success': False,
+                        'message': NOT_ENOUGH_CYCLES_MESSAGE
+                    }
+                entry = (digest, fitted)
+        elif entry is None:
+            return {
+                'success': False,
+                'message': 'No stored cycle data for this user; send its cycles'
+            }
+
+        digest, fitted = entry
+        cache = self.model.cache
+        if cache is None:
+            return self.model.predict_fitted(fitted, n_cycles, response_mode)
+
+        cache_key = self.model.forecast_cache_key(digest, n_cycles, response_mode)
+        result = cache.get(user_id, cache_key)
+        if result is None:
+            result = self.model.predict_fitted(fitted, n_cycles, response_mode)
+            cache.put(user_id, cache_key, result)
+        return result
+
+    def stats(self):
+        """
+        Size and eviction counters of the stored fits, for monitoring
+        """
+        with self._lock:
+            return {
+                'users': len(self._states),
+                'max_users': self.max_users,
+                'ttl': self.ttl,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+    def _get_pool(self):
+        """
+        Start the worker pool, once per process since threads don't survive a fork
+        """
+        if self._pool_pid != os.getpid():
+            with self._lock:
+                if self._pool_pid != os.getpid():
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='period-predictor')
+                    self._pool_pid = os.getpid()
+        return self._pool
+
+    def _predict_or_report(self, user_id, user_cycles, n_cycles, response_mode):
+        """
+        predict(), reporting malformed cycle data as a failed result
+        """
+        try:
+            return self.predict(user_id, user_cycles, n_cycles, response_mode)
+        except (KeyError, TypeError, ValueError) as e:
+            return {
+                'success': False,
+                'message': f"Invalid cycle data: {type(e).__name__}: {e}"
+            }
+
+    def predict_many(self, requests, n_cycles=3, response_mode='full'):
+        """
+        Predict for a batch of (user_id, user_cycles) pairs concurrently;
+        user_cycles may be None to use the stored fit. Results come back in
+        request order, a request with malformed cycle data failing on its own.
+        """
+        requests = list(requests)
+        if len(requests) <= 1 or self.max_workers <= 1:
+            return [self._predict_or_report(user_id, user_cycles, n_cycles, response_mode) for user_id, user_cycles in requests]
+
+        pool = self._get_pool()
+        futures = [pool.submit(self._predict_or_report, user_id, user_cycles, n_cycles, response_mode)
+                   for user_id, user_cycles in requests]
+        return [future.result() for future in futures]
@@ -0,0 +1,267 @@
+import os
+import secrets
+from flask import Flask, Response, request, jsonify
+from flask_cors import CORS
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from forecast_cache import ForecastCache
+from model_registry import ModelRegistry, ModelUnavailableError
+from period_predictor_service import PREDICTOR_WORKERS, PeriodPredictorService
+from period_tracking_model import (
+    CHART_DATASET_STYLES,
+    ESTIMATOR,
+    FORECAST_CACHE_MAX_ENTRIES,
+    FORECAST_CACHE_TTL,
+    RESPONSE_MODES,
+    PeriodTrackingModel
+)
+from serving import register_health_endpoints, run_production_server
+
+# Cycle length estimator used for every user ('arima', or the faster opt-in 'ar1')
+PERIOD_ESTIMATOR = os.environ.get('PERIOD_ESTIMATOR', ESTIMATOR)
+
+# Most cycles a request may ask to predict, and the most users in one batch
+MAX_PREDICTED_CYCLES = 12
+MAX_BATCH_USERS = int(os.environ.get('PERIOD_MAX_BATCH_USERS', 1000))
+
+# Users' fits live in the memory of the process that stored them, so a later
+# request must reach the same process: the service runs one worker process
+# (with WEB_THREADS threads) whatever WEB_CONCURRENCY says
+SERVER_MAX_WORKERS = 1
+
+app = Flask(__name__)
+CORS(app)  # Enable CORS for all routes
+
+def load_predictor_service():
+    """
+    Build the predictor service: the users' fitted states and cached
+    forecasts live in it for the life of the worker process
+    """
+    cache = ForecastCache(max_entries=FORECAST_CACHE_MAX_ENTRIES, ttl=FORECAST_CACHE_TTL)
+    model = PeriodTrackingModel(PERIOD_ESTIMATOR, cache=cache)
+    return {
+        'service': PeriodPredictorService(model, max_workers=PREDICTOR_WORKERS),
+        'cache': cache
+    }
+
+# The service has no artifact files; the registry builds it once per
+# process and reports it to the health checks
+registry = ModelRegistry('period prediction', [], load_predictor_service)
+
+# /healthz and /readyz for the process manager and load balancer
+register_health_endpoints(app, [registry])
+
+def json_response(payload, status=200):
+    """
+    Serialize a response with orjson when it is installed, else with Flask's encoder
+    """
+    if orjson is None:
+        return jsonify(payload), status
+    return Response(orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY), status=status, mimetype='application/json')
+
+def _request_options(payload):
+    """
+    Read the number of cycles to predict and the response mode from the
+    query string or the request body. The mode defaults to
+    'predictions_only'; ?chart=1 (or "includeChart": true) asks for 'full'.
+    """
+    body = payload if isinstance(payload, dict) else {}
+    
+    n_cycles = request.args.get('n_cycles', type=int)
+    if n_cycles is None:
+        n_cycles = body.get('nCycles', 3)
+    # bool is a subclass of int, but "nCycles": true is not a count
+    if type(n_cycles) is not int or not 1 <= n_cycles <= MAX_PREDICTED_CYCLES:
+        raise ValueError(f"nCycles must be a whole number from 1 to {MAX_PREDICTED_CYCLES}")
+    
+    response_mode = request.args.get('mode') or body.get('mode')
+    if response_mode is None:
+        include_chart = request.args.get('chart', '').lower() in ('1', 'true', 'yes') or body.get('includeChart')
+        response_mode = 'full' if include_chart else 'predictions_only'
+    if response_mode not in RESPONSE_MODES:
+        raise ValueError(f"Unknown response mode '{response_mode}', expected one of {', '.join(RESPONSE_MODES)}")
+    return n_cycles, response_mode
+
+def _parse_user(payload):
+    """
+    Pull the state key, cycle list and state token out of one user's
+    payload: either {"userId": ..., "stateToken": ..., "cycles": [...]} or
+    just the list of cycles.
+    
+    Stored cycles are kept under the userId together with a state token, so
+    only the client holding the token can read or replace them. Sending
+    cycles with a userId and no token stores them under a new token, which
+    comes back as "stateToken" in the result.
+    """
+    if isinstance(payload, list):
+        return None, payload, None
+    if not isinstance(payload, dict):
+        raise TypeError("User payload must be a JSON object or a list of cycles")
+    
+    user_id = payload.get('userId')
+    state_token = payload.get('stateToken')
+    cycles = payload.get('cycles')
+    if cycles is not None and not isinstance(cycles, list):
+        raise TypeError('"cycles" must be a list of {"startDate", "endDate"} objects')
+    if user_id is None:
+        if cycles is None:
+            raise ValueError('Expected "cycles", or the "userId" and "stateToken" of a user with stored cycle data')
+        return None, cycles, None
+    if isinstance(user_id, bool) or not isinstance(user_id, (str, int)):
+        raise TypeError('"userId" must be a string or an integer')
+    
+    if state_token is None:
+        if cycles is None:
+            raise ValueError('"stateToken" is required to predict from stored cycle data')
+        state_token = secrets.token_urlsafe(16)
+    elif not isinstance(state_token, str):
+        raise TypeError('"stateToken" must be a string')
+    return (user_id, state_token), cycles, state_token
+
+def format_result(result, state_token=None):
+    """
+    Shape one prediction result for the API, failures under 'error', with
+    the state token of a user's stored cycles. Results may be shared with
+    the forecast cache, so they are never modified.
+    """
+    if not result['success']:
+        return {'success': False, 'error': result['message']}
+    if state_token is not None:
+        return {**result, 'stateToken': state_token}
+    return result
+
+@app.route('/api/period-predictions', methods=['POST'])
+def predict_periods():
+    """
+    API endpoint to predict a user's next cycles.
+    
+    Accepts {"userId": ..., "cycles": [{"startDate": "YYYY-MM-DD",
+    "endDate": ...}, ...], "nCycles": 3} or just the list of cycles. With a
+    userId the fit is kept, and later requests with the returned stateToken
+    can leave out unchanged cycles. Pass ?mode= (or "mode") 'full' for Chart.js datasets,
+    'columnar' for the chart as plain arrays styled by
+    /api/period-predictions/chart-config, or 'predictions_only' (the default).
+    """
+    try:
+        payload = request.get_json()
+        n_cycles, response_mode = _request_options(payload)
+        state_key, cycles, state_token = _parse_user(payload)
+    except (TypeError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    try:
+        service = registry.get()['service']
+        result = service.predict_many([(state_key, cycles)], n_cycles, response_mode)[0]
+        return json_response(format_result(result, state_token), 200 if result['success'] else 400)
+    
+    except ModelUnavailableError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/period-predictions/batch', methods=['POST'])
+def predict_periods_batch():
+    """
+    API endpoint to predict the next cycles of many users in one request.
+    
+    Accepts a JSON list of user payloads (or {"users": [...]}) in the
+    single-user format; the users are forecast concurrently and results come
+    back in input order, each with its own success flag.
+    """
+    try:
+        payload = request.get_json()
+        n_cycles, response_mode = _request_options(payload)
+        users = payload.get('users') if isinstance(payload, dict) else payload
+        if not isinstance(users, list):
+            raise TypeError('Expected a JSON list of users or an object with a "users" list')
+        if len(users) > MAX_BATCH_USERS:
+            raise ValueError(f"At most {MAX_BATCH_USERS} users per batch")
+    except (TypeError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    try:
+        service = registry.get()['service']
+        
+        results = [None] * len(users)
+        positions = []
+        requests = []
+        state_tokens = []
+        for i, user in enumerate(users):
+            try:
+                state_key, cycles, state_token = _parse_user(user)
+            except (TypeError, ValueError) as e:
+                results[i] = {'success': False, 'error': str(e)}
+                continue
+            requests.append((state_key, cycles))
+            state_tokens.append(state_token)
+            positions.append(i)
+        
+        predictions = service.predict_many(requests, n_cycles, response_mode)
+        for i, result, state_token in zip(positions, predictions, state_tokens):
+            results[i] = format_result(result, state_token)
+        
+        return json_response({
+            'success': True,
+            'results': results
+        })
+    
+    except ModelUnavailableError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/period-predictions/chart-config', methods=['GET'])
+def chart_config():
+    """
+    Chart.js dataset styling for 'columnar' responses, fetched once by the client
+    """
+    return jsonify({
+        'datasets': CHART_DATASET_STYLES
+    })
+
+@app.route('/api/period-predictions/cache', methods=['GET'])
+def forecast_cache_stats():
+    """
+    Forecast cache hit/miss counters and stored fit counts of this worker process
+    """
+    try:
+        artifacts = registry.get()
+        return jsonify({
+            **artifacts['cache'].stats(),
+            'states': artifacts['service'].stats()
+        })
+    except ModelUnavailableError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503
+
+if __name__ == '__main__':
+    port = int(os.environ.get('PORT', 5002))
+    if os.environ.get('FLASK_DEBUG') == '1':
+        # Single-process development server with the reloader
+        app.run(host='0.0.0.0', port=port, debug=True)
+    else:
+        run_production_server(app, [registry], default_port=port, max_workers=SERVER_MAX_WORKERS)
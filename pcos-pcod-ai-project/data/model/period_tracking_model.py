@@ -1,22 +1,452 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from statsmodels.tsa.arima.model import ARIMA
-from sklearn.metrics import mean_absolute_error
 import matplotlib.pyplot as plt
 import joblib
+from joblib import Parallel, delayed
+import hashlib
 import json
+import math
 import os
+import struct
+import time
+import warnings
+from collections import namedtuple
+from types import MappingProxyType
 
 # Configuration
 MODEL_OUTPUT_PATH = 'period_tracking_model.joblib'
-RESULTS_PATH = 'period_model_evaluation_results.txt'
+RESULTS_PATH = 'period_model_evaluation_results.csv'
+BACKTEST_RESULTS_PATH = 'period_model_backtest.parquet'
+
+# Synthetic data: cycle length patterns (days between a period's end and the
+# next start) and period length patterns
+CYCLE_PATTERNS = {
+    'regular': {'mean': 28, 'std': 2},
+    'slightly_irregular': {'mean': 30, 'std': 4},
+    'irregular': {'mean': 32, 'std': 7},
+    'pcos_like': {'mean': 38, 'std': 10}
+}
+PERIOD_PATTERNS = {
+    'short': {'mean': 3, 'std': 1},
+    'medium': {'mean': 5, 'std': 1},
+    'long': {'mean': 7, 'std': 2}
+}
+SYMPTOM_OPTIONS = ['cramps', 'bloating', 'headache', 'fatigue', 'mood swings']
+MOOD_OPTIONS = ['irritable', 'tired', 'emotional', 'normal', 'energetic']
+SYNTHETIC_START_DATE = '2022-01-01'
+
+# Users generated at a time by the streaming synthetic cycle generator
+SYNTHETIC_USERS_PER_CHUNK = 25000
+
+# Cycle length estimators: statsmodels ARIMA(1,0,0), or the same AR(1) model
+# fitted in closed form (Yule-Walker), vectorized over many users. ARIMA is
+# the default; 'ar1' is opt-in.
+ESTIMATORS = ('arima', 'ar1')
+ESTIMATOR = 'arima'
+
+# Tolerance of 'ar1' against ARIMA on the whole-day forecasts, checked by
+# tests/test_period_estimators.py (2-12 cycle histories) and
+# benchmark_cycle_estimators:
+# - below 3 cycles neither estimator is fitted and both forecast the weighted
+#   average, so the forecasts are identical
+# - for every history length, the mean absolute gap is at most
+#   AR1_MAX_MEAN_GAP_DAYS days; on synthetic data it peaks at about 1.3
+#   days at 3 cycles and drops under 0.5 days from 8 cycles on
+# - from AR1_PARITY_MIN_HISTORY cycles on, at least AR1_MIN_AGREEMENT of
+#   the forecasts are within AR1_TOLERANCE_DAYS days of ARIMA's (about 92-97%
+#   on synthetic data)
+# - on shorter histories ARIMA's likelihood fit often fails to converge and
+#   single forecasts can differ by 10 days or more, so there AR(1) must
+#   instead be at least as accurate as ARIMA
+AR1_TOLERANCE_DAYS = 1
+AR1_MIN_AGREEMENT = 0.9
+AR1_PARITY_MIN_HISTORY = 8
+AR1_MAX_MEAN_GAP_DAYS = 1.5
+
+# Standard deviation in days of the variation added to weighted average
+# forecasts when a random_state is given
+WEIGHTED_AVERAGE_NOISE_STD = 1.0
+
+# Period length assumed for a cycle logged without an end date
+DEFAULT_PERIOD_LENGTH = 5
+
+NOT_ENOUGH_CYCLES_MESSAGE = 'Not enough cycle data. Need at least 2 cycles.'
+
+# Serialized CycleState format version, and the number of recent cycle
+# lengths a state keeps for the chart
+CYCLE_STATE_VERSION = 1
+CYCLE_STATE_HISTORY = 12
+
+# Prediction responses: 'full' with Chart.js datasets of {x, y} points and
+# their styling, 'columnar' with the chart as plain arrays (styling in
+# CHART_DATASET_STYLES, sent once), or 'predictions_only' without a chart
+RESPONSE_MODES = ('full', 'columnar', 'predictions_only')
+
+# Chart.js styling of the actual and predicted cycle length datasets
+CHART_DATASET_STYLES = {
+    'actual': {
+        'label': 'Actual Cycle Length',
+        'borderColor': '#8A2BE2',
+        'backgroundColor': 'rgba(138, 43, 226, 0.2)',
+        'pointBackgroundColor': '#8A2BE2',
+        'tension': 0.4
+    },
+    'predicted': {
+        'label': 'Predicted Cycle Length',
+        'borderColor': '#FF6384',
+        'backgroundColor': 'rgba(255, 99, 132, 0.2)',
+        'pointBackgroundColor': '#FF6384',
+        'borderDash': [5, 5],
+        'tension': 0.4
+    }
+}
+
+# Forecast cache size (entries) and lifetime of an entry in seconds
+FORECAST_CACHE_MAX_ENTRIES = 10000
+FORECAST_CACHE_TTL = 3600.0
+
+# Users fitted and forecast per task by the bulk forecaster
+FORECAST_USERS_PER_CHUNK = 250
+
+# Columns of the bulk forecast frame taken from each predict_next_cycles prediction
+FORECAST_PREDICTION_COLUMNS = [
+    'cycle_number', 'start_date', 'end_date', 'cycle_length', 'period_length',
+    'fertile_window_start', 'fertile_window_end', 'confidence'
+]
+
+# Rolling-origin backtest: fewest cycle lengths a forecast is made from, and
+# the number of following cycles each forecast is scored on
+BACKTEST_MIN_TRAIN_CYCLES = 3
+BACKTEST_HORIZON = 3
+BACKTEST_COLUMNS = ['user_id', 'train_cycles', 'step', 'actual', 'predicted', 'method', 'fit_seconds', 'fit_amortized']
+
+def pad_series(series_list):
+    """
+    Stack variable-length series into a 2-D float array, one row per
+    series, padded with NaN at the end
+    """
+    lengths = np.fromiter(map(len, series_list), dtype=np.int64, count=len(series_list))
+    padded = np.full((len(series_list), lengths.max(initial=0)), np.nan)
+    if len(series_list):
+        padded[np.arange(padded.shape[1]) < lengths[:, np.newaxis]] = np.concatenate(series_list)
+    return padded
+
+def fit_ar1(series):
+    """
+    Fit an AR(1) model with a constant to every row of a NaN-padded 2-D
+    array (see pad_series) with the Yule-Walker estimates: the row mean and
+    the lag-1 autocorrelation. Every row needs at least one value.
+    
+    Returns (mean, phi, last) arrays, last being each row's final value.
+    """
+    valid = ~np.isnan(series)
+    counts = valid.sum(axis=1)
+    mean = np.where(valid, series, 0).sum(axis=1) / counts
+    
+    # Padding contributes zeros, so the lag products only cover real pairs
+    centered = np.where(valid, series - mean[:, np.newaxis], 0)
+    variance = (centered ** 2).sum(axis=1)
+    autocovariance = (centered[:, 1:] * centered[:, :-1]).sum(axis=1)
+    phi = np.divide(autocovariance, variance, out=np.zeros_like(variance), where=variance > 0)
+    
+    last = series[np.arange(len(series)), counts - 1]
+    return mean, phi, last
+
+def forecast_ar1(mean, phi, last, steps):
+    """
+    Forecast the next steps values of AR(1) fits, one row per fit: the last
+    value decays towards the mean by phi every step
+    """
+    mean, phi, last = (np.asarray(a, dtype=np.float64)[..., np.newaxis] for a in (mean, phi, last))
+    return mean + phi ** np.arange(1, steps + 1) * (last - mean)
+
+def weighted_cycle_average(series):
+    """
+    Average of every row of a NaN-padded 2-D array (see pad_series) giving
+    the i-th value weight i, so recent cycles count most; one matrix
+    product for all rows. Every row needs at least one value.
+    """
+    counts = (~np.isnan(series)).sum(axis=1)
+    if (counts == 0).any():
+        raise ValueError(f"Rows {np.flatnonzero(counts == 0).tolist()} have no cycle lengths to average")
+    weights = np.arange(1, series.shape[1] + 1, dtype=np.float64)
+    return np.nan_to_num(series) @ weights / (counts * (counts + 1) / 2)
+
+def forecast_around_average(averages, n_cycles, random_state=None, noise_std=WEIGHTED_AVERAGE_NOISE_STD):
+    """
+    Forecast n_cycles cycle lengths at each average, rounded to whole days
+    in [21, 45]. With a random_state (seed or numpy Generator) each
+    forecast varies by normal noise of noise_std days, independently for
+    every average; pass a Generator to draw fresh noise on every call.
+    Without one the forecast is deterministic.
+    """
+    forecast = np.repeat(np.asarray(averages, dtype=np.float64)[:, np.newaxis], n_cycles, axis=1)
+    if random_state is not None:
+        forecast += np.random.default_rng(random_state).normal(0, noise_std, forecast.shape)
+    return np.clip(np.round(forecast), 21, 45).astype(np.int64)
+
+def weighted_average_forecast(series, n_cycles, random_state=None):
+    """
+    Weighted average forecasts (the fallback of predict_next_cycles) for
+    every row of a NaN-padded 2-D array
+    """
+    return forecast_around_average(weighted_cycle_average(series), n_cycles, random_state)
+
+class AR1Fit:
+    """
+    AR(1) fit of one user's cycle lengths, with the forecast() interface of
+    a fitted statsmodels ARIMA
+    """
+    def __init__(self, mean, phi, last):
+        self.mean = float(mean)
+        self.phi = float(phi)
+        self.last = float(last)
+    
+    def forecast(self, steps=1):
+        return forecast_ar1(self.mean, self.phi, self.last, steps)
+
+# One user's fitted cycle history: cycle lengths (a tuple), read-only cycle
+# and period statistics, regularity score and the fitted cycle length model
+FittedCycles = namedtuple('FittedCycles', ['cycle_lengths', 'cycle_stats', 'period_stats', 'regularity_score', 'model'])
+
+def cycle_history_digest(user_cycles):
+    """
+    Hash of the start and end dates of a cycle history, the only fields
+    forecasts depend on
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for cycle in user_cycles:
+        digest.update(f"{cycle['startDate']}/{cycle.get('endDate') or ''};".encode())
+    return digest.hexdigest()
+
+class CycleState:
+    """
+    Running summary of one user's logged cycles, updated in O(1) when a
+    cycle is logged instead of re-parsing and refitting the whole history.
+    
+    Keeps the count, mean, sum of squared deviations (Welford), min and max
+    of the cycle lengths (days between consecutive starts) and period
+    lengths, the recency-weighted sum behind the weighted average, and the
+    lag-1 products behind the AR(1) estimates. The statistics match
+    fit() on the same cycles up to floating point rounding. The last CYCLE_STATE_HISTORY cycle lengths
+    are kept for the chart. to_bytes() packs a state into about 110 bytes
+    to store next to the user record.
+    """
+    _HEADER = struct.Struct('<BIii' + 'ddiiddii' + 'ddii' + 'B')
+    
+    def __init__(self):
+        self.num_cycles = 0
+        # Latest cycle, as proleptic Gregorian ordinals
+        self.last_start = None
+        self.last_end = None
+        
+        # Cycle lengths
+        self.cycle_mean = 0.0
+        self.cycle_m2 = 0.0
+        self.cycle_min = 0
+        self.cycle_max = 0
+        self.cycle_weighted_sum = 0.0
+        self.cycle_lag_product_sum = 0.0
+        self.first_cycle_length = 0
+        self.last_cycle_length = 0
+        self.recent_cycle_lengths = []
+        
+        # Period lengths of every cycle before the latest one
+        self.period_mean = 0.0
+        self.period_m2 = 0.0
+        self.period_min = 0
+        self.period_max = 0
+    
+    @classmethod
+    def from_cycles(cls, user_cycles):
+        """
+        Build the state of a user's cycle history, in the format fit() takes
+        """
+        state = cls()
+        for cycle in user_cycles:
+            state.add_cycle(cycle['startDate'], cycle.get('endDate'))
+        return state
+    
+    @property
+    def cycle_count(self):
+        return max(self.num_cycles - 1, 0)
+    
+    def add_cycle(self, start_date, end_date=None):
+        """
+        Log a new cycle ('%Y-%m-%d' dates); cycles must be logged in order
+        """
+        start = datetime.strptime(start_date, '%Y-%m-%d').toordinal()
+        end = datetime.strptime(end_date, '%Y-%m-%d').toordinal() if end_date else None
+        
+        if self.last_start is not None:
+            if start <= self.last_start:
+                raise ValueError("Cycles must be logged in order of their start dates")
+            # The previous cycle's period length is final now
+            period_length = self.last_end - self.last_start if self.last_end is not None else DEFAULT_PERIOD_LENGTH
+            self._add_period_length(period_length)
+            self._add_cycle_length(start - self.last_start)
+        
+        self.num_cycles += 1
+        self.last_start = start
+        self.last_end = end
+    
+    def set_end_date(self, end_date):
+        """
+        Log the end date of the latest cycle
+        """
+        if self.last_start is None:
+            raise ValueError("No cycle logged yet")
+        self.last_end = datetime.strptime(end_date, '%Y-%m-%d').toordinal()
+    
+    def _add_cycle_length(self, length):
+        # Called before num_cycles counts the new cycle, so this is the
+        # number of cycle lengths including this one
+        n = self.num_cycles
+        if n == 1:
+            self.first_cycle_length = self.cycle_min = self.cycle_max = length
+        else:
+            self.cycle_min = min(self.cycle_min, length)
+            self.cycle_max = max(self.cycle_max, length)
+            self.cycle_lag_product_sum += length * self.last_cycle_length
+        
+        delta = length - self.cycle_mean
+        self.cycle_mean += delta / n
+        self.cycle_m2 += delta * (length - self.cycle_mean)
+        # The i-th cycle length gets weight i
+        self.cycle_weighted_sum += n * length
+        self.last_cycle_length = length
+        
+        self.recent_cycle_lengths.append(length)
+        del self.recent_cycle_lengths[:-CYCLE_STATE_HISTORY]
+    
+    def _add_period_length(self, length):
+        n = self.num_cycles
+        if n == 1:
+            self.period_min = self.period_max = length
+        else:
+            self.period_min = min(self.period_min, length)
+            self.period_max = max(self.period_max, length)
+        
+        delta = length - self.period_mean
+        self.period_mean += delta / n
+        self.period_m2 += delta * (length - self.period_mean)
+    
+    def cycle_stats(self):
+        """
+        Cycle length statistics, as computed by fit()
+        """
+        n = self.cycle_count
+        return {
+            'min': self.cycle_min,
+            'max': self.cycle_max,
+            'avg': self.cycle_mean,
+            'stdDev': math.sqrt(self.cycle_m2 / n)
+        }
+    
+    def period_stats(self):
+        """
+        Period length statistics, as computed by fit(): every earlier
+        cycle, plus the latest one once its end date is logged
+        """
+        n, mean, m2 = self.cycle_count, self.period_mean, self.period_m2
+        lowest, highest = self.period_min, self.period_max
+        if self.last_end is not None:
+            length = self.last_end - self.last_start
+            n += 1
+            delta = length - mean
+            mean += delta / n
+            m2 += delta * (length - mean)
+            lowest, highest = (length, length) if n == 1 else (min(lowest, length), max(highest, length))
+        return {
+            'min': lowest,
+            'max': highest,
+            'avg': mean,
+            'stdDev': math.sqrt(m2 / n)
+        }
+    
+    def regularity_score(self):
+        """
+        Regularity score (0-100), as computed by fit()
+        """
+        # Rounded so the running sums' last-bit errors can't move the
+        # score across a whole number (9.500000000000002 for 9.5)
+        cycle_std_dev = round(self.cycle_stats()['stdDev'], 9)
+        return int(100 - (min(cycle_std_dev, 10) * 10))
+    
+    def weighted_average(self):
+        """
+        Cycle length average giving the i-th cycle weight i
+        """
+        n = self.cycle_count
+        return self.cycle_weighted_sum / (n * (n + 1) / 2)
+    
+    def ar1_fit(self):
+        """
+        Yule-Walker AR(1) fit of the cycle lengths, equal to fit_ar1 on the
+        full history; None with fewer than 3 cycle lengths, like train_model
+        """
+        n = self.cycle_count
+        if n < 3:
+            return None
+        
+        # Lag-1 products around the mean, expanded so they only need running sums
+        total = self.cycle_mean * n
+        autocovariance = (self.cycle_lag_product_sum
+                          - self.cycle_mean * (2 * total - self.first_cycle_length - self.last_cycle_length)
+                          + (n - 1) * self.cycle_mean ** 2)
+        phi = autocovariance / self.cycle_m2 if self.cycle_m2 > 0 else 0.0
+        return AR1Fit(self.cycle_mean, phi, self.last_cycle_length)
+    
+    def to_bytes(self):
+        """
+        Pack the state into a compact binary record
+        """
+        header = self._HEADER.pack(
+            CYCLE_STATE_VERSION, self.num_cycles, self.last_start or 0, self.last_end or 0,
+            self.cycle_mean, self.cycle_m2, self.cycle_min, self.cycle_max,
+            self.cycle_weighted_sum, self.cycle_lag_product_sum, self.first_cycle_length, self.last_cycle_length,
+            self.period_mean, self.period_m2, self.period_min, self.period_max,
+            len(self.recent_cycle_lengths)
+        )
+        return header + struct.pack(f'<{len(self.recent_cycle_lengths)}H', *self.recent_cycle_lengths)
+    
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Unpack a state packed by to_bytes
+        """
+        fields = cls._HEADER.unpack_from(data)
+        if fields[0] != CYCLE_STATE_VERSION:
+            raise ValueError(f"Unsupported cycle state version {fields[0]}")
+        
+        state = cls()
+        (_, state.num_cycles, last_start, last_end,
+         state.cycle_mean, state.cycle_m2, state.cycle_min, state.cycle_max,
+         state.cycle_weighted_sum, state.cycle_lag_product_sum, state.first_cycle_length, state.last_cycle_length,
+         state.period_mean, state.period_m2, state.period_min, state.period_max,
+         num_recent) = fields
+        # Ordinals start at 1, so 0 means no date
+        state.last_start = last_start or None
+        state.last_end = last_end or None
+        state.recent_cycle_lengths = list(struct.unpack_from(f'<{num_recent}H', data, cls._HEADER.size))
+        return state
 
 class PeriodTrackingModel:
     """
     Time Series Forecasting model for predicting menstrual cycles
     """
-    def __init__(self):
+    def __init__(self, estimator=ESTIMATOR, cache=None, random_state=None):
+        if estimator not in ESTIMATORS:
+            raise ValueError(f"Unknown estimator '{estimator}'. Available: {', '.join(ESTIMATORS)}")
+        self.estimator = estimator
+        # Optional ForecastCache of predict() results by user
+        self.cache = cache
+        # Variation of weighted average forecasts: None for none, else a seed
+        # or numpy Generator; every forecast draws fresh noise from rng
+        self.random_state = random_state
+        self.rng = np.random.default_rng(random_state) if random_state is not None else None
         self.model = None
         self.cycle_stats = None
         self.period_stats = None
@@ -30,20 +460,8 @@ class PeriodTrackingModel:
         
         np.random.seed(42)
         
-        # Define possible cycle patterns
-        cycle_patterns = {
-            'regular': {'mean': 28, 'std': 2},
-            'slightly_irregular': {'mean': 30, 'std': 4},
-            'irregular': {'mean': 32, 'std': 7},
-            'pcos_like': {'mean': 38, 'std': 10}
-        }
-        
-        # Define possible period length patterns
-        period_patterns = {
-            'short': {'mean': 3, 'std': 1},
-            'medium': {'mean': 5, 'std': 1},
-            'long': {'mean': 7, 'std': 2}
-        }
+        cycle_patterns = CYCLE_PATTERNS
+        period_patterns = PERIOD_PATTERNS
         
         # Generate data for multiple users
         all_data = []
@@ -57,7 +475,7 @@ class PeriodTrackingModel:
             period_params = period_patterns[period_type]
             
             # Generate cycle data
-            start_date = datetime(2022, 1, 1) + timedelta(days=np.random.randint(0, 28))
+            start_date = datetime.strptime(SYNTHETIC_START_DATE, '%Y-%m-%d') + timedelta(days=np.random.randint(0, 28))
             
             user_cycles = []
             
@@ -93,7 +511,7 @@ class PeriodTrackingModel:
                 
                 # Add symptoms (more likely during irregular cycles)
                 symptoms = []
-                symptom_options = ['cramps', 'bloating', 'headache', 'fatigue', 'mood swings']
+                symptom_options = SYMPTOM_OPTIONS
                 symptom_count = np.random.randint(0, 4)
                 if pattern_type in ['irregular', 'pcos_like']:
                     symptom_count += 1  # More symptoms for irregular cycles
@@ -102,7 +520,7 @@ class PeriodTrackingModel:
                     symptoms = np.random.choice(symptom_options, symptom_count, replace=False).tolist()
                 
                 # Add mood
-                mood_options = ['irritable', 'tired', 'emotional', 'normal', 'energetic']
+                mood_options = MOOD_OPTIONS
                 mood = np.random.choice(mood_options)
                 
                 user_cycles.append({
@@ -129,6 +547,122 @@ class PeriodTrackingModel:
         print(f"Synthetic dataset created with {len(df)} cycle records for {num_users} users")
         return df
     
+    def iter_synthetic_dataset(self, num_users, cycles_per_user=12, users_per_chunk=SYNTHETIC_USERS_PER_CHUNK, seed=42):
+        """
+        Generate synthetic cycles for any number of users as DataFrames with
+        the create_synthetic_dataset schema, one block of users at a time so
+        memory stays bounded.
+        
+        Every draw for a block is a single array operation and start dates
+        are a cumulative sum of day offsets from SYNTHETIC_START_DATE. The data follows the same
+        distributions as create_synthetic_dataset but not its exact draws;
+        it is reproducible for a given seed and users_per_chunk.
+        """
+        pattern_names = list(CYCLE_PATTERNS)
+        period_names = list(PERIOD_PATTERNS)
+        cycle_mean = np.array([CYCLE_PATTERNS[p]['mean'] for p in pattern_names], dtype=np.float64)
+        cycle_std = np.array([CYCLE_PATTERNS[p]['std'] for p in pattern_names], dtype=np.float64)
+        period_mean = np.array([PERIOD_PATTERNS[p]['mean'] for p in period_names], dtype=np.float64)
+        period_std = np.array([PERIOD_PATTERNS[p]['std'] for p in period_names], dtype=np.float64)
+        irregular = np.isin(pattern_names, ['irregular', 'pcos_like'])
+        seasonal_patterns = np.array(pattern_names) != 'regular'
+        
+        # Seasonal variation by cycle index; the first cycle has no length
+        cycle_index = np.arange(cycles_per_user)
+        seasonal_effect = np.where(cycle_index > 0, np.sin(cycle_index / 3) * 3, 0)
+        
+        # Every ordered selection of symptoms, indexed by its digits in base
+        # num_symptoms + 1 (symptom index + 1 per position, 0 past the end)
+        num_symptoms = len(SYMPTOM_OPTIONS)
+        symptom_code_weights = (num_symptoms + 1) ** np.arange(num_symptoms)
+        symptom_selections = np.empty((num_symptoms + 1) ** num_symptoms, dtype=object)
+        for code in range(len(symptom_selections)):
+            digits = [code // weight % (num_symptoms + 1) for weight in symptom_code_weights]
+            symptom_selections[code] = tuple(SYMPTOM_OPTIONS[d - 1] for d in digits if d > 0)
+        # Object arrays of names convert to string columns faster than numpy unicode
+        mood_names = np.array(MOOD_OPTIONS, dtype=object)
+        pattern_labels = np.array(pattern_names, dtype=object)
+        base_date = np.datetime64(SYNTHETIC_START_DATE, 'D')
+        
+        seeds = np.random.SeedSequence(seed)
+        for first_user in range(0, num_users, users_per_chunk):
+            num_block_users = min(users_per_chunk, num_users - first_user)
+            rng = np.random.default_rng(seeds.spawn(1)[0])
+            shape = (num_block_users, cycles_per_user)
+            
+            # Per-user pattern assignment and start offset
+            pattern = rng.integers(0, len(pattern_names), num_block_users)
+            period_type = rng.integers(0, len(period_names), num_block_users)
+            start_offset = rng.integers(0, 28, num_block_users)
+            
+            # Cycle and period lengths, truncated to whole days like int()
+            seasonal = np.where(seasonal_patterns[pattern][:, np.newaxis], seasonal_effect, 0)
+            cycle_length = np.maximum(21, np.trunc(rng.normal(cycle_mean[pattern][:, np.newaxis] + seasonal,
+                                                               cycle_std[pattern][:, np.newaxis], shape)))
+            cycle_length[:, 0] = 0
+            period_length = np.maximum(2, np.trunc(rng.normal(period_mean[period_type][:, np.newaxis],
+                                                               period_std[period_type][:, np.newaxis], shape))).astype(np.int64)
+            
+            # Each cycle starts cycle_length days after the previous period ended
+            days_after_previous_start = cycle_length.astype(np.int64)
+            days_after_previous_start[:, 1:] += period_length[:, :-1]
+            start_days = start_offset[:, np.newaxis] + np.cumsum(days_after_previous_start, axis=1)
+            end_days = start_days + period_length
+            # Format each calendar day once and look the strings up by day offset
+            date_strings = np.datetime_as_string(base_date + np.arange(end_days.max() + 1), unit='D').astype(object)
+            
+            # Symptoms: the first symptom_count of a random permutation, more
+            # for irregular cycles; each ordered selection is looked up by code
+            symptom_count = rng.integers(0, 4, shape) + irregular[pattern][:, np.newaxis]
+            symptom_order = np.argsort(rng.random(shape + (num_symptoms,)), axis=-1)
+            selected = np.arange(num_symptoms) < symptom_count[..., np.newaxis]
+            selection_code = ((symptom_order + 1) * selected * symptom_code_weights).sum(axis=-1)
+            symptoms = list(map(list, symptom_selections[selection_code.ravel()]))
+            
+            mood = rng.integers(0, len(MOOD_OPTIONS), shape)
+            cycle_lengths = cycle_length.ravel()
+            cycle_lengths[::cycles_per_user] = np.nan
+            
+            yield pd.DataFrame({
+                'user_id': np.repeat(np.arange(first_user + 1, first_user + num_block_users + 1), cycles_per_user),
+                'cycle_number': np.tile(cycle_index + 1, num_block_users),
+                'start_date': date_strings[start_days.ravel()],
+                'end_date': date_strings[end_days.ravel()],
+                'cycle_length': cycle_lengths,
+                'period_length': period_length.ravel(),
+                'symptoms': symptoms,
+                'mood': mood_names[mood.ravel()],
+                'pattern_type': np.repeat(pattern_labels[pattern], cycles_per_user)
+            })
+    
+    def write_synthetic_dataset(self, path, num_users, cycles_per_user=12, users_per_chunk=SYNTHETIC_USERS_PER_CHUNK, seed=42):
+        """
+        Stream synthetic cycles for load tests to a Parquet file, one block
+        of users at a time
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Writing Parquet needs pyarrow installed")
+        
+        print(f"Writing synthetic cycles for {num_users} users to {path}...")
+        
+        writer = None
+        num_rows = 0
+        try:
+            for df in self.iter_synthetic_dataset(num_users, cycles_per_user, users_per_chunk, seed):
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+                num_rows += len(df)
+        finally:
+            if writer is not None:
+                writer.close()
+        
+        print(f"Synthetic dataset written to {path} with {num_rows} cycle records")
+    
     def prepare_data_for_user(self, df, user_id):
         """
         Prepare time series data for a specific user
@@ -166,11 +700,16 @@ class PeriodTrackingModel:
     
     def train_model(self, cycle_lengths, order=(1,0,0)):
         """
-        Train an ARIMA model on cycle length data
+        Train the cycle length model: the closed-form AR(1) fit, or an ARIMA
+        of the given order
         """
         if len(cycle_lengths) < 3:
             return None
         
+        if self.estimator == 'ar1':
+            mean, phi, last = fit_ar1(np.asarray([cycle_lengths], dtype=np.float64))
+            return AR1Fit(mean[0], phi[0], last[0])
+        
         try:
             # Fit ARIMA model
             model = ARIMA(cycle_lengths, order=order)
@@ -180,36 +719,61 @@ class PeriodTrackingModel:
             # Fallback to simpler model if ARIMA fails
             return None
     
-    def predict_next_cycles(self, model, cycle_lengths, period_stats, n_cycles=3):
+    def forecast_cycle_lengths(self, model, cycle_lengths, n_cycles=3):
         """
-        Predict the next n cycles using the trained model or fallback method
+        Forecast the next n cycle lengths in whole days using the trained
+        model or the weighted average fallback
+        """
+        return self.forecast_cycle_lengths_with_method(model, cycle_lengths, n_cycles)[0]
+    
+    def forecast_cycle_lengths_with_method(self, model, cycle_lengths, n_cycles=3):
+        """
+        forecast_cycle_lengths, plus the method that produced the forecast:
+        the estimator, or 'weighted_average' when there is no trained model
+        or its forecast failed
         """
-        last_cycle_length = cycle_lengths[-1]
-        last_cycle_date = datetime.now() - timedelta(days=last_cycle_length)
-        
-        predictions = []
-        
         if model is not None:
             # Use ARIMA model for predictions
             try:
                 forecast = model.forecast(steps=n_cycles)
-                predicted_lengths = [max(21, min(45, int(round(x)))) for x in forecast]
+                return [max(21, min(45, int(round(x)))) for x in forecast], self.estimator
             except:
                 # Fallback to weighted average if prediction fails
-                predicted_lengths = self._predict_with_weighted_average(cycle_lengths, n_cycles)
-        else:
-            # Use weighted average method
-            predicted_lengths = self._predict_with_weighted_average(cycle_lengths, n_cycles)
+                pass
         
+        # Use weighted average method
+        return self._predict_with_weighted_average(cycle_lengths, n_cycles), 'weighted_average'
+    
+    def predict_next_cycles(self, model, cycle_lengths, period_stats, n_cycles=3):
+        """
+        Predict the next n cycles using the trained model or fallback method
+        """
+        predicted_lengths = self.forecast_cycle_lengths(model, cycle_lengths, n_cycles)
+        return self._predictions_from_lengths(cycle_lengths, predicted_lengths, period_stats)
+    
+    def _predictions_from_lengths(self, cycle_lengths, predicted_lengths, period_stats):
+        """
+        Predicted cycles from forecast cycle lengths, scored by the
+        regularity of the logged ones
+        """
         # Calculate regularity score based on cycle lengths
         cycle_std_dev = np.std(cycle_lengths)
         normalized_std_dev = min(cycle_std_dev, 10)
         regularity_score = int(100 - (normalized_std_dev * 10))
         
+        return self._build_predictions(cycle_lengths[-1], predicted_lengths, regularity_score, period_stats)
+    
+    def _build_predictions(self, last_cycle_length, predicted_lengths, regularity_score, period_stats):
+        """
+        Dates, fertile windows and confidence of the predicted cycles
+        """
+        last_cycle_date = datetime.now() - timedelta(days=last_cycle_length)
+        
+        predictions = []
+        
         # Generate prediction dates
         current_date = last_cycle_date
-        for i in range(n_cycles):
-            cycle_length = predicted_lengths[i]
+        for i, cycle_length in enumerate(predicted_lengths):
             next_date = current_date + timedelta(days=cycle_length)
             period_length = max(2, int(round(period_stats['avg'])))
             end_date = next_date + timedelta(days=period_length)
@@ -241,95 +805,186 @@ class PeriodTrackingModel:
         """
         Predict cycle lengths using weighted average (fallback method)
         """
-        # Use weighted average, giving more weight to recent cycles
-        weights = list(range(1, len(cycle_lengths) + 1))
-        weighted_avg = sum(x * w for x, w in zip(cycle_lengths, weights)) / sum(weights)
+        # Same result as weighted_average_forecast, without array overhead for one user
+        n = len(cycle_lengths)
+        weighted_avg = sum(i * x for i, x in enumerate(cycle_lengths, 1)) / (n * (n + 1) / 2)
+        if self.rng is None:
+            return [max(21, min(45, int(round(weighted_avg))))] * n_cycles
+        return forecast_around_average([weighted_avg], n_cycles, self.rng)[0].tolist()
+    
+    def forecast_users(self, df, n_cycles=3, users_per_chunk=FORECAST_USERS_PER_CHUNK, n_jobs=-1):
+        """
+        Fit and forecast the next n_cycles for every user of a long-format
+        cycle frame (the create_synthetic_dataset schema), spreading chunks
+        of users_per_chunk users over a pool of n_jobs processes.
+        
+        Each user is handled like prepare_data_for_user and
+        predict_next_cycles; users with fewer than 2 cycle lengths are
+        skipped. Returns one frame with n_cycles rows per user: the
+        predictions, the user's regularity score, whether the estimator or
+        the weighted average produced them, and the user's fit and predict
+        times in seconds. This instance's own fitted state is not used or
+        changed; with a random_state every chunk draws its noise from its
+        own stream spawned from rng.
+        """
+        df, user_ids, boundaries = self._group_users(df)
+        cycle_lengths = df['cycle_length'].to_numpy(dtype=np.float64)
+        period_lengths = df['period_length'].to_numpy()
+        num_users = len(user_ids)
+        print(f"Forecasting {n_cycles} cycles for {num_users} users in chunks of {users_per_chunk}...")
         
-        # Add some small random variation for each prediction
-        return [max(21, min(45, int(round(weighted_avg + np.random.normal(0, 1))))) for _ in range(n_cycles)]
+        # Each task gets only its own users' cycle and period lengths, and its
+        # own random stream: a Generator pickled into every task would make
+        # all chunks draw the same noise
+        firsts = range(0, num_users, users_per_chunk)
+        rngs = self.rng.spawn(len(firsts)) if self.rng is not None else [None] * len(firsts)
+        jobs = []
+        for first, rng in zip(firsts, rngs):
+            last = min(first + users_per_chunk, num_users)
+            rows = slice(boundaries[first], boundaries[last])
+            jobs.append(delayed(_forecast_user_chunk)(
+                user_ids[first:last], boundaries[first:last + 1] - boundaries[first],
+                cycle_lengths[rows], period_lengths[rows], n_cycles, self.estimator, rng
+            ))
+        
+        start = time.perf_counter()
+        chunks = Parallel(n_jobs=n_jobs)(jobs)
+        seconds = time.perf_counter() - start
+        
+        skipped = [user_id for chunk in chunks for user_id in chunk.pop('skipped')]
+        forecast = pd.DataFrame({
+            name: [value for chunk in chunks for value in chunk[name]]
+            for name in chunks[0]
+        }) if chunks else pd.DataFrame()
+        
+        print(f"Forecast {num_users - len(skipped)} users in {seconds:.2f}s "
+              f"({(num_users - len(skipped)) / seconds:,.0f} users/s), skipped {len(skipped)} with too few cycles")
+        return forecast
     
-    def evaluate_model(self, df):
+    def _group_users(self, df):
         """
-        Evaluate the model on multiple users
+        Sort a long-format cycle frame by user and cycle number, once.
+        Returns the sorted frame, the user ids and the row boundaries of
+        the users, user i's cycles being rows boundaries[i]:boundaries[i + 1].
         """
-        print("Evaluating period tracking model...")
+        df = df.sort_values(['user_id', 'cycle_number'], kind='stable')
+        user_column = df['user_id'].to_numpy()
         
-        results = []
+        # Row where each user's cycles start, plus the end of the frame
+        starts = np.flatnonzero(np.r_[True, user_column[1:] != user_column[:-1]])
+        boundaries = np.r_[starts, len(df)]
+        return df, user_column[starts].tolist(), boundaries
+    
+    def backtest(self, df, min_train_cycles=BACKTEST_MIN_TRAIN_CYCLES, horizon=BACKTEST_HORIZON,
+                 users_per_chunk=FORECAST_USERS_PER_CHUNK, n_jobs=-1):
+        """
+        Rolling-origin backtest of every user of a long-format cycle frame:
+        for each k from min_train_cycles on, fit the user's first k cycle
+        lengths and forecast the next horizon cycles, while the user has
+        that many left. Chunks of users_per_chunk users run on a pool of
+        n_jobs processes.
         
-        # Select a subset of users for evaluation
-        user_ids = df['user_id'].unique()
-        eval_users = np.random.choice(user_ids, min(5, len(user_ids)), replace=False)
+        Returns one row per forecast cycle: the user, their pattern type
+        (when the frame has one), the number of training cycles, the
+        forecast step, the actual and predicted lengths, the method that
+        made the forecast and the user's fit time in seconds. fit_amortized
+        marks fit times that are an equal share of one fit of many users
+        rather than the time of the user's own fit.
+        """
+        df, user_ids, boundaries = self._group_users(df)
+        cycle_lengths = df['cycle_length'].to_numpy(dtype=np.float64)
+        num_users = len(user_ids)
+        print(f"Backtesting {num_users} users, forecasting {horizon} cycles from every {min_train_cycles}+ cycle history...")
         
-        for user_id in eval_users:
-            user_data = df[df['user_id'] == user_id].sort_values('cycle_number')
-            
-            if len(user_data) < 6:  # Need at least 6 cycles for train/test
-                continue
-            
-            # Split into train/test
-            train_data = user_data.iloc[:-3]
-            test_data = user_data.iloc[-3:]
-            
-            # Prepare training data
-            cycle_lengths = train_data['cycle_length'].dropna().tolist()
-            
-            if len(cycle_lengths) < 3:
-                continue
-                
-            # Calculate statistics
-            cycle_stats, period_stats, regularity_score = self._calculate_stats(cycle_lengths, train_data['period_length'].tolist())
-            
-            # Train model
-            model = self.train_model(cycle_lengths)
-            
-            # Make predictions
-            predictions = self.predict_next_cycles(model, cycle_lengths, period_stats, n_cycles=3)
-            
-            # Compare with actual data
-            actual_cycles = test_data['cycle_length'].tolist()
-            predicted_cycles = [p['cycle_length'] for p in predictions]
-            
-            # Calculate error metrics
-            if len(actual_cycles) > 0 and len(predicted_cycles) > 0:
-                mae = mean_absolute_error(actual_cycles[:len(predicted_cycles)], predicted_cycles[:len(actual_cycles)])
-            else:
-                mae = None
-            
-            results.append({
-                'user_id': int(user_id),
-                'pattern_type': user_data['pattern_type'].iloc[0],
-                'num_training_cycles': len(cycle_lengths),
-                'regularity_score': regularity_score,
-                'actual_cycles': actual_cycles,
-                'predicted_cycles': predicted_cycles,
-                'mae': mae
-            })
+        jobs = []
+        for first in range(0, num_users, users_per_chunk):
+            last = min(first + users_per_chunk, num_users)
+            rows = slice(boundaries[first], boundaries[last])
+            jobs.append(delayed(_backtest_user_chunk)(
+                user_ids[first:last], boundaries[first:last + 1] - boundaries[first],
+                cycle_lengths[rows], min_train_cycles, horizon, self.estimator
+            ))
         
-        # Save evaluation results
-        with open(RESULTS_PATH, 'w') as f:
-            f.write("Period Tracking Model Evaluation\n")
-            f.write("===============================\n\n")
-            
-            for result in results:
-                f.write(f"User ID: {result['user_id']}\n")
-                f.write(f"Pattern Type: {result['pattern_type']}\n")
-                f.write(f"Number of Training Cycles: {result['num_training_cycles']}\n")
-                f.write(f"Regularity Score: {result['regularity_score']}\n")
-                f.write(f"Actual Cycles: {result['actual_cycles']}\n")
-                f.write(f"Predicted Cycles: {result['predicted_cycles']}\n")
-                if result['mae'] is not None:
-                    f.write(f"Mean Absolute Error: {result['mae']:.2f} days\n")
-                f.write("\n")
-            
-            # Calculate overall metrics
-            valid_maes = [r['mae'] for r in results if r['mae'] is not None]
-            if valid_maes:
-                avg_mae = sum(valid_maes) / len(valid_maes)
-                f.write(f"Overall Mean Absolute Error: {avg_mae:.2f} days\n")
+        start = time.perf_counter()
+        chunks = Parallel(n_jobs=n_jobs)(jobs)
+        seconds = time.perf_counter() - start
         
-        print(f"Evaluation results saved to {RESULTS_PATH}")
+        results = pd.DataFrame({
+            name: np.concatenate([chunk[name] for chunk in chunks])
+            for name in BACKTEST_COLUMNS
+        }) if chunks else pd.DataFrame(columns=BACKTEST_COLUMNS)
+        if 'pattern_type' in df:
+            pattern_types = pd.Series(df['pattern_type'].to_numpy()[boundaries[:-1]], index=user_ids)
+            results.insert(1, 'pattern_type', results['user_id'].map(pattern_types))
+        
+        num_forecasts = len(results) // horizon
+        print(f"Backtested {num_forecasts} forecasts in {seconds:.2f}s ({num_forecasts / seconds:,.0f} forecasts/s)")
         return results
     
+    def summarize_backtest(self, results):
+        """
+        Mean absolute error of backtest results (see backtest) by pattern
+        type, overall and per forecast step, with the bias and the fit times.
+        
+        fit_us_median and fit_us_p95 are the latency of fitting one user on
+        its own; fit_us_amortized is the mean cost per user of the fits
+        done for many users at once (the 'ar1' estimator and the weighted
+        average), i.e. the inverse of their throughput. Either is NaN when
+        no forecast was fitted that way.
+        """
+        results = results.assign(
+            abs_error=(results['predicted'] - results['actual']).abs(),
+            error=results['predicted'] - results['actual'],
+            fit_us=results['fit_seconds'] * 1e6
+        )
+        if 'pattern_type' not in results:
+            results['pattern_type'] = 'all'
+        
+        def summarize(group):
+            row = {
+                'users': group['user_id'].nunique(),
+                'forecasts': int((group['step'] == 1).sum()),
+                'mae': group['abs_error'].mean(),
+                'bias': group['error'].mean()
+            }
+            for step, step_errors in group.groupby('step')['abs_error']:
+                row[f'mae_step_{step}'] = step_errors.mean()
+            single = group.loc[~group['fit_amortized'], 'fit_us']
+            row['fit_us_median'] = single.median()
+            row['fit_us_p95'] = single.quantile(0.95)
+            row['fit_us_amortized'] = group.loc[group['fit_amortized'], 'fit_us'].mean()
+            return row
+        
+        rows = {pattern_type: summarize(group) for pattern_type, group in results.groupby('pattern_type', sort=True)}
+        if len(rows) > 1:
+            rows['all'] = summarize(results)
+        summary = pd.DataFrame.from_dict(rows, orient='index')
+        summary.index.name = 'pattern_type'
+        return summary
+    
+    def evaluate_model(self, df, min_train_cycles=BACKTEST_MIN_TRAIN_CYCLES, horizon=BACKTEST_HORIZON, n_jobs=-1):
+        """
+        Evaluate the model on every user with a rolling-origin backtest,
+        saving the MAE by pattern type as a table, and the per-forecast
+        results when pyarrow is installed
+        """
+        print("Evaluating period tracking model...")
+        
+        results = self.backtest(df, min_train_cycles, horizon, n_jobs=n_jobs)
+        summary = self.summarize_backtest(results)
+        
+        summary.to_csv(RESULTS_PATH, float_format='%.4f')
+        print(f"\n{summary.round(2).to_string()}\n")
+        print(f"Evaluation results saved to {RESULTS_PATH}")
+        
+        try:
+            results.to_parquet(BACKTEST_RESULTS_PATH, index=False)
+            print(f"Backtest forecasts saved to {BACKTEST_RESULTS_PATH}")
+        except ImportError:
+            print("Install pyarrow to save the per-forecast backtest results")
+        
+        return summary
+    
     def _calculate_stats(self, cycle_lengths, period_lengths):
         """
         Calculate statistics for cycle and period lengths
@@ -338,14 +993,14 @@ class PeriodTrackingModel:
             'min': min(cycle_lengths),
             'max': max(cycle_lengths),
             'avg': sum(cycle_lengths) / len(cycle_lengths),
-            'stdDev': np.std(cycle_lengths)
+            'stdDev': float(np.std(cycle_lengths))
         }
         
         period_stats = {
             'min': min(period_lengths),
             'max': max(period_lengths),
             'avg': sum(period_lengths) / len(period_lengths),
-            'stdDev': np.std(period_lengths)
+            'stdDev': float(np.std(period_lengths))
         }
         
         # Calculate regularity score
@@ -354,15 +1009,13 @@ class PeriodTrackingModel:
         
         return cycle_stats, period_stats, regularity_score
     
-    def fit(self, user_cycles):
+    def fit_user(self, user_cycles):
         """
-        Fit the model to a user's cycle data
+        Fit one user's cycle history without touching this instance's state.
+        Returns an immutable FittedCycles, or None with fewer than 2 cycles.
         """
         if len(user_cycles) < 2:
-            return {
-                'success': False,
-                'message': 'Not enough cycle data. Need at least 2 cycles.'
-            }
+            return None
         
         # Extract cycle lengths
         cycle_lengths = []
@@ -380,7 +1033,7 @@ class PeriodTrackingModel:
                 period_lengths.append(period_length)
             else:
                 # Default period length if not available
-                period_lengths.append(5)
+                period_lengths.append(DEFAULT_PERIOD_LENGTH)
         
         # Add the most recent period length
         if len(user_cycles) > 0 and 'endDate' in user_cycles[-1] and user_cycles[-1]['endDate']:
@@ -389,10 +1042,39 @@ class PeriodTrackingModel:
             period_lengths.append((end_date - start_date).days)
         
         # Calculate statistics
-        self.cycle_stats, self.period_stats, self.regularity_score = self._calculate_stats(cycle_lengths, period_lengths)
+        cycle_stats, period_stats, regularity_score = self._calculate_stats(cycle_lengths, period_lengths)
         
-        # Train model
-        self.model = self.train_model(cycle_lengths)
+        return FittedCycles(
+            tuple(cycle_lengths),
+            MappingProxyType(cycle_stats),
+            MappingProxyType(period_stats),
+            regularity_score,
+            self.train_model(cycle_lengths)
+        )
+    
+    def fit(self, user_cycles, user_id=None):
+        """
+        Fit the model to a user's cycle data, keeping it on this instance
+        for save_model. Cached forecasts of user_id, or of every user when
+        no user_id is given, are invalidated.
+        """
+        if self.cache is not None:
+            if user_id is not None:
+                self.cache.invalidate(user_id)
+            else:
+                self.cache.clear()
+        
+        fitted = self.fit_user(user_cycles)
+        if fitted is None:
+            return {
+                'success': False,
+                'message': NOT_ENOUGH_CYCLES_MESSAGE
+            }
+        
+        self.cycle_stats = dict(fitted.cycle_stats)
+        self.period_stats = dict(fitted.period_stats)
+        self.regularity_score = fitted.regularity_score
+        self.model = fitted.model
         
         return {
             'success': True,
@@ -401,40 +1083,79 @@ class PeriodTrackingModel:
             'regularity_score': self.regularity_score
         }
     
-    def predict(self, user_cycles, n_cycles=3):
+    def forecast_cache_key(self, history_digest, n_cycles, response_mode='full'):
         """
-        Predict the next n cycles
+        Cache key of a forecast: the estimator, n_cycles, response mode,
+        today's date (the predicted dates count from today) and the cycle
+        history digest
         """
-        if not self.cycle_stats:
-            result = self.fit(user_cycles)
-            if not result['success']:
-                return {
-                    'success': False,
-                    'message': result['message']
-                }
-        
-        # Extract cycle lengths for prediction
-        cycle_lengths = []
-        for i in range(1, len(user_cycles)):
-            start_date1 = datetime.strptime(user_cycles[i-1]['startDate'], '%Y-%m-%d')
-            start_date2 = datetime.strptime(user_cycles[i]['startDate'], '%Y-%m-%d')
-            cycle_length = (start_date2 - start_date1).days
-            cycle_lengths.append(cycle_length)
+        return (self.estimator, n_cycles, response_mode, date.today().toordinal(), history_digest)
+    
+    def predict_fitted(self, fitted, n_cycles=3, response_mode='full'):
+        """
+        Predict the next n cycles from a user's FittedCycles, as a response
+        in one of RESPONSE_MODES
+        """
+        cycle_lengths = list(fitted.cycle_lengths)
         
         # Make predictions
-        predictions = self.predict_next_cycles(self.model, cycle_lengths, self.period_stats, n_cycles)
+        predictions = self.predict_next_cycles(fitted.model, cycle_lengths, fitted.period_stats, n_cycles)
         
-        # Generate chart data
-        chart_data = self._generate_chart_data(cycle_lengths, predictions)
+        return self._build_response(predictions, cycle_lengths, dict(fitted.cycle_stats), dict(fitted.period_stats),
+                                    fitted.regularity_score, response_mode)
+    
+    def predict(self, user_cycles, n_cycles=3, user_id=None, response_mode='full'):
+        """
+        Predict the next n cycles of the given cycle history. Every call
+        fits the history it is given, so one instance can serve any number
+        of users. With a cache and a user_id, the result is cached under
+        forecast_cache_key until fit() is called.
+        """
+        cache_key = None
+        if self.cache is not None and user_id is not None:
+            cache_key = self.forecast_cache_key(cycle_history_digest(user_cycles), n_cycles, response_mode)
+            cached = self.cache.get(user_id, cache_key)
+            if cached is not None:
+                return cached
         
-        return {
-            'success': True,
-            'predictions': predictions,
-            'cycle_stats': self.cycle_stats,
-            'period_stats': self.period_stats,
-            'regularity_score': self.regularity_score,
-            'chart_data': chart_data
-        }
+        fitted = self.fit_user(user_cycles)
+        if fitted is None:
+            return {
+                'success': False,
+                'message': NOT_ENOUGH_CYCLES_MESSAGE
+            }
+        
+        result = self.predict_fitted(fitted, n_cycles, response_mode)
+        if cache_key is not None:
+            self.cache.put(user_id, cache_key, result)
+        return result
+    
+    def predict_from_state(self, state, n_cycles=3, response_mode='full'):
+        """
+        Predict the next n cycles from a user's CycleState, without the
+        cycle history. The state keeps AR(1) statistics, so this uses the
+        closed-form AR(1) forecast whatever this model's estimator is.
+        """
+        if state.num_cycles < 2:
+            return {
+                'success': False,
+                'message': NOT_ENOUGH_CYCLES_MESSAGE
+            }
+        
+        cycle_stats = state.cycle_stats()
+        period_stats = state.period_stats()
+        regularity_score = state.regularity_score()
+        
+        fitted = state.ar1_fit()
+        if fitted is not None:
+            predicted_lengths = [max(21, min(45, int(round(x)))) for x in fitted.forecast(n_cycles)]
+        else:
+            predicted_lengths = forecast_around_average([state.weighted_average()], n_cycles, self.rng)[0].tolist()
+        
+        predictions = self._build_predictions(state.last_cycle_length, predicted_lengths, regularity_score, period_stats)
+        
+        return self._build_response(predictions, list(state.recent_cycle_lengths), cycle_stats, period_stats,
+                                    regularity_score, response_mode)
     
     def _generate_chart_data(self, cycle_lengths, predictions):
         """
@@ -458,31 +1179,48 @@ class PeriodTrackingModel:
         return {
             'labels': labels,
             'datasets': [
-                {
-                    'label': 'Actual Cycle Length',
-                    'data': actual_data,
-                    'borderColor': '#8A2BE2',
-                    'backgroundColor': 'rgba(138, 43, 226, 0.2)',
-                    'pointBackgroundColor': '#8A2BE2',
-                    'tension': 0.4
-                },
-                {
-                    'label': 'Predicted Cycle Length',
-                    'data': predicted_data,
-                    'borderColor': '#FF6384',
-                    'backgroundColor': 'rgba(255, 99, 132, 0.2)',
-                    'pointBackgroundColor': '#FF6384',
-                    'borderDash': [5, 5],
-                    'tension': 0.4
-                }
+                {**CHART_DATASET_STYLES['actual'], 'data': actual_data},
+                {**CHART_DATASET_STYLES['predicted'], 'data': predicted_data}
             ]
         }
     
+    def _generate_chart_columns(self, cycle_lengths, predictions):
+        """
+        Chart data as plain arrays: the actual cycle lengths, then the
+        predicted ones, which continue right after them on the labels axis
+        """
+        predicted_lengths = [p['cycle_length'] for p in predictions]
+        return {
+            'labels': [f"Cycle {i+1}" for i in range(len(cycle_lengths) + len(predicted_lengths))],
+            'actual': list(cycle_lengths),
+            'predicted': predicted_lengths
+        }
+    
+    def _build_response(self, predictions, cycle_lengths, cycle_stats, period_stats, regularity_score, response_mode):
+        """
+        Assemble a prediction response in one of RESPONSE_MODES
+        """
+        response = {
+            'success': True,
+            'predictions': predictions,
+            'cycle_stats': cycle_stats,
+            'period_stats': period_stats,
+            'regularity_score': regularity_score
+        }
+        if response_mode == 'full':
+            response['chart_data'] = self._generate_chart_data(cycle_lengths, predictions)
+        elif response_mode == 'columnar':
+            response['chart'] = self._generate_chart_columns(cycle_lengths, predictions)
+        elif response_mode != 'predictions_only':
+            raise ValueError(f"Unknown response mode '{response_mode}'. Available: {', '.join(RESPONSE_MODES)}")
+        return response
+    
     def save_model(self):
         """
         Save the trained model to disk
         """
         model_data = {
+            'estimator': self.estimator,
             'model': self.model,
             'cycle_stats': self.cycle_stats,
             'period_stats': self.period_stats,
@@ -492,6 +1230,140 @@ class PeriodTrackingModel:
         joblib.dump(model_data, MODEL_OUTPUT_PATH)
         print(f"Model saved to {MODEL_OUTPUT_PATH}")
 
+def _forecast_user_chunk(user_ids, boundaries, cycle_lengths, period_lengths, n_cycles, estimator=ESTIMATOR, random_state=None):
+    """
+    Fit and forecast every user of one chunk of the bulk forecaster.
+    
+    The chunk's cycles are sorted by user, user i's rows being
+    boundaries[i]:boundaries[i + 1]. With the 'ar1' estimator every user of
+    the chunk is fitted in one fit_ar1 call, each user being charged an
+    equal share of its time. Returns the forecast as a dict of columns,
+    n_cycles rows per forecast user, with the users that have too few
+    cycles listed under 'skipped'.
+    """
+    model = PeriodTrackingModel(estimator, random_state=random_state)
+    columns = {name: [] for name in ['user_id'] + FORECAST_PREDICTION_COLUMNS + ['regularity_score', 'method', 'fit_seconds', 'predict_seconds']}
+    skipped = []
+    
+    user_cycle_lengths = []
+    for i in range(len(user_ids)):
+        lengths = cycle_lengths[boundaries[i]:boundaries[i + 1]]
+        user_cycle_lengths.append(lengths[~np.isnan(lengths)])
+    
+    fits = None
+    if estimator == 'ar1':
+        start = time.perf_counter()
+        fits = [None] * len(user_ids)
+        fitted_users = [i for i, lengths in enumerate(user_cycle_lengths) if len(lengths) >= 3]
+        if fitted_users:
+            mean, phi, last = fit_ar1(pad_series([user_cycle_lengths[i] for i in fitted_users]))
+            for j, i in enumerate(fitted_users):
+                fits[i] = AR1Fit(mean[j], phi[j], last[j])
+        shared_fit_seconds = (time.perf_counter() - start) / max(len(user_ids), 1)
+    
+    with warnings.catch_warnings():
+        # ARIMA warns about convergence on short, noisy series; the fallback covers failures
+        warnings.simplefilter('ignore')
+        for i, user_id in enumerate(user_ids):
+            lengths = user_cycle_lengths[i].tolist()
+            if len(lengths) < 2:
+                skipped.append(user_id)
+                continue
+            
+            start = time.perf_counter()
+            cycle_stats, period_stats, regularity_score = model._calculate_stats(
+                lengths, period_lengths[boundaries[i]:boundaries[i + 1]].tolist()
+            )
+            if fits is not None:
+                fitted = fits[i]
+                fit_seconds = time.perf_counter() - start + shared_fit_seconds
+            else:
+                fitted = model.train_model(lengths)
+                fit_seconds = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            predicted_lengths, method = model.forecast_cycle_lengths_with_method(fitted, lengths, n_cycles)
+            predictions = model._predictions_from_lengths(lengths, predicted_lengths, period_stats)
+            predict_seconds = time.perf_counter() - start
+            
+            for prediction in predictions:
+                for name in FORECAST_PREDICTION_COLUMNS:
+                    columns[name].append(prediction[name])
+            columns['user_id'].extend([user_id] * n_cycles)
+            columns['regularity_score'].extend([regularity_score] * n_cycles)
+            columns['method'].extend([method] * n_cycles)
+            columns['fit_seconds'].extend([fit_seconds] * n_cycles)
+            columns['predict_seconds'].extend([predict_seconds] * n_cycles)
+    
+    columns['skipped'] = skipped
+    return columns
+
+def _backtest_user_chunk(user_ids, boundaries, cycle_lengths, min_train_cycles, horizon, estimator=ESTIMATOR):
+    """
+    Rolling-origin backtest of one chunk of users (see backtest), laid out
+    like _forecast_user_chunk. Training windows of the same length are
+    stacked, so with the 'ar1' estimator every user of an origin is fitted
+    in one fit_ar1 call, each user being charged an equal share of its
+    time (flagged by fit_amortized). Windows too short for the estimator
+    get the weighted average, as predict_next_cycles would. Returns a dict
+    of BACKTEST_COLUMNS arrays.
+    """
+    model = PeriodTrackingModel(estimator)
+    user_ids = np.asarray(user_ids)
+    
+    user_cycle_lengths = []
+    for i in range(len(user_ids)):
+        lengths = cycle_lengths[boundaries[i]:boundaries[i + 1]]
+        user_cycle_lengths.append(lengths[~np.isnan(lengths)])
+    num_lengths = np.fromiter(map(len, user_cycle_lengths), dtype=np.int64, count=len(user_cycle_lengths))
+    
+    columns = {name: [] for name in BACKTEST_COLUMNS}
+    with warnings.catch_warnings():
+        # ARIMA warns about convergence on short, noisy series; the fallback covers failures
+        warnings.simplefilter('ignore')
+        for k in range(max(min_train_cycles, 2), num_lengths.max(initial=0) - horizon + 1):
+            users = np.flatnonzero(num_lengths >= k + horizon)
+            windows = np.stack([user_cycle_lengths[i][:k + horizon] for i in users])
+            train, actual = windows[:, :k], windows[:, k:]
+            
+            start = time.perf_counter()
+            if k < 3:
+                # train_model needs 3 cycle lengths
+                predicted = weighted_average_forecast(train, horizon)
+                fit_seconds = np.full(len(users), (time.perf_counter() - start) / len(users))
+                methods = np.full(len(users), 'weighted_average', dtype=object)
+                amortized = True
+            elif estimator == 'ar1':
+                predicted = np.clip(np.round(forecast_ar1(*fit_ar1(train), horizon)), 21, 45)
+                fit_seconds = np.full(len(users), (time.perf_counter() - start) / len(users))
+                methods = np.full(len(users), 'ar1', dtype=object)
+                amortized = True
+            else:
+                predicted = np.empty_like(actual)
+                fit_seconds = np.empty(len(users))
+                methods = np.empty(len(users), dtype=object)
+                amortized = False
+                for j, lengths in enumerate(train.tolist()):
+                    start = time.perf_counter()
+                    fitted = model.train_model(lengths)
+                    predicted[j], methods[j] = model.forecast_cycle_lengths_with_method(fitted, lengths, horizon)
+                    fit_seconds[j] = time.perf_counter() - start
+            
+            columns['user_id'].append(np.repeat(user_ids[users], horizon))
+            columns['train_cycles'].append(np.full(actual.size, k))
+            columns['step'].append(np.tile(np.arange(1, horizon + 1), len(users)))
+            columns['actual'].append(actual.ravel())
+            columns['predicted'].append(predicted.ravel())
+            columns['method'].append(np.repeat(methods, horizon))
+            columns['fit_seconds'].append(np.repeat(fit_seconds, horizon))
+            columns['fit_amortized'].append(np.full(actual.size, amortized))
+    
+    empty_dtypes = {'method': object, 'fit_amortized': bool}
+    return {
+        name: np.concatenate(arrays) if arrays else np.empty(0, dtype=empty_dtypes.get(name, np.float64))
+        for name, arrays in columns.items()
+    }
+
 def main():
     """
     Main function to execute the period tracking model pipeline
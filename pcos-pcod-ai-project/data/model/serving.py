@@ -0,0 +1,130 @@
+import gc
+import importlib
+import multiprocessing
+import os
+import sys
+
+from flask import jsonify
+
+from model_registry import ModelUnavailableError
+
+# Services that can be started with `python serving.py <name>`, and their default ports
+SERVICES = {
+    'lifestyle': ('lifestyle_recommendation_api', 5000),
+    'detection': ('pcos_detection_api', 5001),
+    'period': ('period_tracking_api', 5002)
+}
+
+def serving_config(default_port=5000):
+    """
+    Production server settings, overridable through environment variables
+    """
+    return {
+        'host': os.environ.get('HOST', '0.0.0.0'),
+        'port': int(os.environ.get('PORT', default_port)),
+        # Number of worker processes
+        'workers': int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count())),
+        # Threads per worker process
+        'threads': int(os.environ.get('WEB_THREADS', 4)),
+        # 'gthread' by default; 'gevent' for an async worker when gevent is installed
+        'worker_class': os.environ.get('WEB_WORKER_CLASS', 'gthread'),
+        # Seconds in-flight requests get to finish after SIGTERM
+        'graceful_timeout': int(os.environ.get('GRACEFUL_TIMEOUT', 30)),
+        'timeout': int(os.environ.get('WORKER_TIMEOUT', 60))
+    }
+
+def register_health_endpoints(app, registries):
+    """
+    Add /healthz (the process is up) and /readyz (all model artifacts are
+    loaded) to a Flask app
+    """
+    @app.route('/healthz', methods=['GET'])
+    def healthz():
+        return jsonify({'status': 'ok'})
+
+    @app.route('/readyz', methods=['GET'])
+    def readyz():
+        ready = True
+        for registry in registries:
+            try:
+                registry.get()
+            except ModelUnavailableError:
+                ready = False
+
+        return jsonify({
+            'ready': ready,
+            'models': [registry.status() for registry in registries]
+        }), 200 if ready else 503
+
+def preload(registries):
+    """
+    Load model artifacts in the parent process so forked workers share them
+    copy-on-write
+    """
+    for registry in registries:
+        registry.load()
+    # Keep the garbage collector from touching (and so copying) the preloaded objects
+    gc.freeze()
+
+def run_production_server(app, registries, default_port=5000, max_workers=None):
+    """
+    Serve a Flask app with preforked gunicorn workers, falling back to
+    waitress (single process, threaded) where gunicorn is not available.
+    max_workers caps the worker processes for services that keep state in
+    process memory.
+    """
+    config = serving_config(default_port)
+    if max_workers is not None and config['workers'] > max_workers:
+        print(f"This service keeps state in process memory; using {max_workers} worker(s) "
+              f"instead of {config['workers']}")
+        config['workers'] = max_workers
+    preload(registries)
+
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        BaseApplication = None
+
+    if BaseApplication is not None:
+        class StandaloneApplication(BaseApplication):
+            def load_config(self):
+                self.cfg.set('bind', f"{config['host']}:{config['port']}")
+                self.cfg.set('workers', config['workers'])
+                self.cfg.set('threads', config['threads'])
+                self.cfg.set('worker_class', config['worker_class'])
+                self.cfg.set('graceful_timeout', config['graceful_timeout'])
+                self.cfg.set('timeout', config['timeout'])
+                self.cfg.set('preload_app', True)
+
+            def load(self):
+                return app
+
+        print(f"Starting gunicorn on {config['host']}:{config['port']} with "
+              f"{config['workers']} workers x {config['threads']} threads")
+        StandaloneApplication().run()
+        return
+
+    try:
+        from waitress import serve
+    except ImportError:
+        raise RuntimeError("Production serving needs gunicorn (Linux/macOS) or waitress installed")
+
+    threads = config['workers'] * config['threads']
+    print(f"gunicorn not available; starting waitress on {config['host']}:{config['port']} with {threads} threads")
+    serve(app, host=config['host'], port=config['port'], threads=threads)
+
+def main():
+    """
+    Start one of the model services in production mode
+    """
+    if len(sys.argv) != 2 or sys.argv[1] not in SERVICES:
+        print(f"Usage: python serving.py <{'|'.join(SERVICES)}>")
+        sys.exit(2)
+
+    module_name, default_port = SERVICES[sys.argv[1]]
+    service = importlib.import_module(module_name)
+    run_production_server(service.app, [service.registry], default_port,
+                          max_workers=getattr(service, 'SERVER_MAX_WORKERS', None))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pcos_early_detection_model import build_model_pipeline, compile_model, compiled_predict_proba
+
+def make_features(num_rows, rng):
+    X = pd.DataFrame({
+        'AMHngmL': rng.gamma(2.0, 3.0, num_rows),
+        'FSHmIUmL': rng.normal(6.0, 2.0, num_rows),
+        'BMI': rng.normal(24.0, 4.0, num_rows),
+        'Blood_Group': pd.Series(rng.choice(['11', '12', '13', '15'], num_rows), dtype=object)
+    })
+    # Missing values in every column
+    for column in X.columns:
+        X.loc[rng.random(num_rows) < 0.05, column] = np.nan
+    return X
+
+@pytest.fixture(scope='module')
+def fitted():
+    rng = np.random.default_rng(0)
+    X = make_features(2000, rng)
+    y = ((X['AMHngmL'].fillna(6) + rng.normal(0, 2, len(X)) > 7) | (X['Blood_Group'] == '15')).astype(int)
+    model = build_model_pipeline(X).set_params(classifier__n_estimators=30, classifier__max_depth=12)
+    model.fit(X, y)
+    compiled = compile_model(model)
+    assert list(compiled['categorical_columns']) == ['Blood_Group']
+    return model, compiled
+
+@pytest.mark.parametrize('batch_size', [1, 64, 10000])
+def test_compiled_predict_proba_matches_pipeline(fitted, batch_size):
+    model, compiled = fitted
+    rng = np.random.default_rng(batch_size)
+    X = make_features(batch_size, rng)
+    # An all-missing row, and unknown categories
+    X.iloc[0] = np.nan
+    X.loc[rng.random(batch_size) < 0.1, 'Blood_Group'] = 'unknown'
+
+    np.testing.assert_array_equal(compiled_predict_proba(compiled, X), model.predict_proba(X))
+
+@pytest.mark.parametrize('value, dtype', [(np.inf, 'float64'), (-np.inf, 'float64'), (1e300, 'float32')])
+@pytest.mark.parametrize('batch_size', [1, 64, 10000])
+def test_compiled_predict_proba_rejects_non_finite_like_pipeline(fitted, batch_size, value, dtype):
+    model, compiled = fitted
+    X = make_features(batch_size, np.random.default_rng(batch_size))
+    X.loc[batch_size - 1, 'FSHmIUmL'] = value
+
+    message = f"Input X contains infinity or a value too large for dtype\\('{dtype}'\\)"
+    with pytest.raises(ValueError, match=message):
+        model.predict_proba(X)
+    with pytest.raises(ValueError, match=message):
+        compiled_predict_proba(compiled, X)
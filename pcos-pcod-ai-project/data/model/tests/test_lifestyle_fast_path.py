@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from lifestyle_recommendation_model import (
+    NUM_FACTOR_COMBINATIONS,
+    build_fast_encoder,
+    build_recommendation_model,
+    create_synthetic_dataset,
+    decode_lifestyle_profile,
+    fast_kneighbors,
+    find_similar_users
+)
+
+@pytest.mark.parametrize('sparse_threshold', [0.0, 1.0], ids=['dense', 'sparse'])
+@pytest.mark.parametrize('num_users', [500, 2000])
+def test_fast_kneighbors_matches_pipeline_for_every_profile(num_users, sparse_threshold):
+    df = create_synthetic_dataset(num_users)
+    model, X = build_recommendation_model(df)
+    model.set_params(preprocessor__sparse_threshold=sparse_threshold).fit(X)
+    fast_encoder = build_fast_encoder(model, X)
+
+    for code in range(NUM_FACTOR_COMBINATIONS):
+        profile = decode_lifestyle_profile(code)
+        pipeline_distances, pipeline_indices = find_similar_users(profile, model)
+        distances, indices = fast_kneighbors(profile, fast_encoder)
+        np.testing.assert_array_equal(indices, pipeline_indices, err_msg=str(profile))
+        np.testing.assert_array_equal(distances, pipeline_distances, err_msg=str(profile))
+
+def test_fast_kneighbors_ignores_unknown_values_like_pipeline():
+    model, X = build_recommendation_model(create_synthetic_dataset(500))
+    fast_encoder = build_fast_encoder(model, X)
+    profile = dict(decode_lifestyle_profile(0), diet='unknown')
+
+    pipeline_distances, pipeline_indices = find_similar_users(profile, model)
+    distances, indices = fast_kneighbors(profile, fast_encoder)
+    np.testing.assert_array_equal(indices, pipeline_indices)
+    np.testing.assert_array_equal(distances, pipeline_distances)
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from lifestyle_recommendation_api import FACTOR_LEVELS, map_lifestyle_factors, map_lifestyle_factors_batch
+
+def boundary_values(factor):
+    """
+    Every bound of a factor, just below and above it, plus non-numeric values
+    """
+    values = [None, '5', float('nan'), True, False, -1e9, 1e9]
+    for bound, _ in FACTOR_LEVELS[factor]:
+        if np.isfinite(bound):
+            values += [bound, bound - 0.01, bound + 0.01, int(bound), int(bound) - 1]
+    return values
+
+PAYLOADS = (
+    [{'lifestyleFactors': {'stress': value}} for value in boundary_values('stress')]
+    + [{'lifestyleFactors': {'sleep': value}} for value in boundary_values('sleep')]
+    + [{'bmi': value} for value in boundary_values('weight_status')]
+    + [{'symptoms': ['symptom'] * count} for count in range(9)]
+    + [
+        {},
+        {'lifestyleFactors': {'exercise': True}},
+        {'lifestyleFactors': ['Sedentary lifestyle', 'High sugar diet']},
+        {'lifestyleFactors': ['Poor dietary habits']}
+    ]
+)
+
+@pytest.mark.parametrize('payload', PAYLOADS, ids=repr)
+def test_batch_mapping_matches_single_mapping(payload):
+    profiles, errors = map_lifestyle_factors_batch([payload])
+
+    try:
+        expected = map_lifestyle_factors(payload)
+    except Exception as e:
+        # Malformed payloads fail the same way in both
+        assert (profiles, errors) == ([None], [str(e)])
+    else:
+        assert (profiles, errors) == ([expected], [None])
+
+def test_levels_at_bounds():
+    def level(factor, payload):
+        return map_lifestyle_factors(payload)[factor]
+
+    assert [level('stress', {'lifestyleFactors': {'stress': v}}) for v in (3.99, 4, 6.99, 7)] == ['low', 'medium', 'medium', 'high']
+    assert [level('weight_status', {'bmi': v}) for v in (18.49, 18.5, 24.99, 25, 29.99, 30)] == \
+        ['underweight', 'normal', 'normal', 'overweight', 'overweight', 'obese']
+    assert [level('pcos_severity', {'symptoms': ['s'] * n}) for n in (2, 3, 5, 6)] == ['mild', 'moderate', 'moderate', 'severe']
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from scipy import sparse
+from sklearn.neighbors import NearestNeighbors
+
+from lifestyle_recommendation_model import LifestyleNeighborIndex
+
+def random_one_hot(rng, num_rows, factor_sizes):
+    """
+    Random rows with exactly one active column per factor
+    """
+    offsets = np.concatenate([[0], np.cumsum(factor_sizes)[:-1]])
+    columns = np.stack([offset + rng.integers(size, size=num_rows) for offset, size in zip(offsets, factor_sizes)], axis=1)
+    rows = np.repeat(np.arange(num_rows), len(factor_sizes))
+    return sparse.csr_matrix((np.ones(columns.size), (rows, columns.ravel())), shape=(num_rows, sum(factor_sizes)))
+
+# 20 columns use the bit-mask group keys, 70 columns the padded column lists
+@pytest.mark.parametrize('factor_sizes', [[4, 5, 5, 6], [10] * 7], ids=['20-columns', '70-columns'])
+def test_neighbor_index_matches_brute_force_cosine(factor_sizes):
+    rng = np.random.default_rng(0)
+    X = random_one_hot(rng, 3000, factor_sizes)
+    queries = sparse.vstack([X[:100], random_one_hot(rng, 100, factor_sizes)]).tocsr()
+    n_neighbors = 10
+
+    distances, indices = LifestyleNeighborIndex(n_neighbors).fit(X).kneighbors(queries)
+    brute_distances, brute_indices = NearestNeighbors(n_neighbors=n_neighbors, metric='cosine',
+                                                      algorithm='brute').fit(X).kneighbors(queries)
+
+    np.testing.assert_allclose(distances, brute_distances, rtol=0, atol=1e-12)
+    # Every row has the same number of active columns, so the distance tiers
+    # are exactly the shared-column counts
+    shared = (queries @ X.T).toarray().round().astype(int)
+    for i in range(queries.shape[0]):
+        # Brute force may break ties differently, but from the same tiers
+        np.testing.assert_array_equal(shared[i, indices[i]], shared[i, brute_indices[i]])
+        # Documented contract: the lowest row indices within a tier
+        expected = np.lexsort((np.arange(X.shape[0]), -shared[i]))[:n_neighbors]
+        np.testing.assert_array_equal(indices[i], expected)
+
+def test_neighbor_index_returns_lowest_rows_among_ties():
+    X = sparse.csr_matrix(np.array([
+        [1, 0, 1, 0],
+        [0, 1, 1, 0],
+        [1, 0, 1, 0],
+        [1, 0, 1, 0],
+        [0, 1, 0, 1]
+    ], dtype=float))
+
+    distances, indices = LifestyleNeighborIndex(n_neighbors=4).fit(X).kneighbors(X[3])
+    np.testing.assert_array_equal(indices, [[0, 2, 3, 1]])
+    np.testing.assert_allclose(distances, [[0.0, 0.0, 0.0, 0.5]], atol=1e-12)
@@ -0,0 +1,47 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from period_tracking_model import (
+    AR1_MAX_MEAN_GAP_DAYS,
+    AR1_MIN_AGREEMENT,
+    AR1_PARITY_MIN_HISTORY,
+    AR1_TOLERANCE_DAYS,
+    PeriodTrackingModel
+)
+
+NUM_USERS = 200
+N_CYCLES = 3
+
+@pytest.fixture(scope='module')
+def histories():
+    df = pd.concat(PeriodTrackingModel().iter_synthetic_dataset(NUM_USERS, cycles_per_user=16), ignore_index=True)
+    return [
+        lengths[~np.isnan(lengths)]
+        for lengths in np.split(df['cycle_length'].to_numpy(dtype=np.float64), NUM_USERS)
+    ]
+
+def forecasts(estimator, series):
+    model = PeriodTrackingModel(estimator)
+    with warnings.catch_warnings():
+        # ARIMA warns about convergence on short, noisy series
+        warnings.simplefilter('ignore')
+        return np.array([model.forecast_cycle_lengths(model.train_model(s), s, N_CYCLES) for s in series])
+
+@pytest.mark.parametrize('length', range(2, 13))
+def test_ar1_forecasts_stay_within_tolerance_of_arima(histories, length):
+    series = [history[:length].tolist() for history in histories]
+    actual = np.array([history[length:length + N_CYCLES] for history in histories])
+    arima_days = forecasts('arima', series)
+    ar1_days = forecasts('ar1', series)
+    gap = np.abs(ar1_days - arima_days)
+
+    if length < 3:
+        np.testing.assert_array_equal(ar1_days, arima_days)
+    assert gap.mean() <= AR1_MAX_MEAN_GAP_DAYS
+    if length >= AR1_PARITY_MIN_HISTORY:
+        assert (gap <= AR1_TOLERANCE_DAYS).mean() >= AR1_MIN_AGREEMENT
+    else:
+        assert np.abs(ar1_days - actual).mean() <= np.abs(arima_days - actual).mean()
@@ -0,0 +1,21 @@
+import pandas as pd
+import pytest
+
+from lifestyle_recommendation_model import SYNTHETIC_BLOCK_SIZE, create_synthetic_dataset, iter_synthetic_dataset
+
+NUM_SAMPLES = 2 * SYNTHETIC_BLOCK_SIZE + 123
+
+@pytest.fixture(scope='module')
+def single_chunk():
+    return create_synthetic_dataset(NUM_SAMPLES, chunk_size=NUM_SAMPLES)
+
+@pytest.mark.parametrize('chunk_size', [1000, SYNTHETIC_BLOCK_SIZE - 1, SYNTHETIC_BLOCK_SIZE, SYNTHETIC_BLOCK_SIZE + 1])
+def test_rows_do_not_depend_on_chunk_size(single_chunk, chunk_size):
+    chunks = list(iter_synthetic_dataset(NUM_SAMPLES, chunk_size))
+
+    assert all(len(chunk) == chunk_size for chunk in chunks[:-1])
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), single_chunk)
+
+def test_seed_changes_rows(single_chunk):
+    other = create_synthetic_dataset(NUM_SAMPLES, seed=7, chunk_size=NUM_SAMPLES)
+    assert not other['symptom_improvement'].equals(single_chunk['symptom_improvement'])
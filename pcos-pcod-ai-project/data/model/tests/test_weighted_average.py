@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from period_tracking_model import PeriodTrackingModel, pad_series, weighted_average_forecast
+
+HISTORIES = [[28.0], [30.0, 26.0], [21.0, 35.0, 29.0, 27.0], [44.0, 45.0, 46.0], [20.0, 20.0]]
+N_CYCLES = 3
+
+def test_deterministic_forecast_matches_per_user_fallback():
+    model = PeriodTrackingModel()
+    forecast = weighted_average_forecast(pad_series(HISTORIES), N_CYCLES)
+
+    assert forecast.dtype == np.int64
+    expected = [model._predict_with_weighted_average(history, N_CYCLES) for history in HISTORIES]
+    np.testing.assert_array_equal(forecast, expected)
+    np.testing.assert_array_equal(forecast[:, 0], [28, 27, 29, 45, 21])
+
+def test_seeded_forecast_is_reproducible_and_bounded():
+    series = pad_series(HISTORIES * 20)
+    forecast = weighted_average_forecast(series, N_CYCLES, 7)
+
+    np.testing.assert_array_equal(forecast, weighted_average_forecast(series, N_CYCLES, 7))
+    assert not (forecast == weighted_average_forecast(series, N_CYCLES)).all()
+    assert forecast.min() >= 21 and forecast.max() <= 45
+
+def test_rows_without_cycles_are_rejected():
+    series = np.array([[28.0, 30.0], [np.nan, np.nan]])
+    with pytest.raises(ValueError, match=r'Rows \[1\]'):
+        weighted_average_forecast(series, N_CYCLES)